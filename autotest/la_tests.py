@@ -3,6 +3,23 @@ import copy
 if not os.path.exists("temp"):
     os.mkdir("temp")
 
+
+def _synthetic_schur_args(npar, nobs, seed):
+    """ names, a random jco and two random forecast vectors, an identity
+    parcov and a generic pst for the synthetic Schur tests
+    """
+    import numpy as np
+    from pyemu import Matrix, Cov, Jco, Pst
+    np.random.seed(seed)
+    pnames = ["p{0}".format(i) for i in range(npar)]
+    onames = ["o{0}".format(i) for i in range(nobs)]
+    jco = Jco(x=np.random.random((nobs, npar)), row_names=onames, col_names=pnames)
+    forecasts = Matrix(x=np.random.random((npar, 2)), row_names=pnames,
+                       col_names=["f0", "f1"])
+    parcov = Cov(x=np.eye(npar), names=pnames)
+    pst = Pst.from_par_obs_names(pnames, onames)
+    return pnames, onames, jco, forecasts, parcov, pst
+
 def schur_test_nonpest():
     import numpy as np
     from pyemu import Matrix, Cov, Schur, Jco
@@ -156,6 +173,99 @@ def errvar_test():
     print(ev.get_errvar_dataframe())
 
 
+def errvar_curves_test():
+    import numpy as np
+    from pyemu import ErrVar, Matrix, Cov
+    np.random.seed(4)
+    npar, nobs = 8, 6
+    pnames = ["p{0}".format(i) for i in range(npar)]
+    onames = ["o{0}".format(i) for i in range(nobs)]
+    jco = Matrix(x=np.random.random((nobs, npar)), row_names=onames, col_names=pnames)
+    a = np.random.random((npar, npar))
+    parcov = Cov(x=np.dot(a, a.T) + np.eye(npar), names=pnames)
+    obscov = Cov(x=np.random.random((nobs, 1)) + 0.5, names=onames, isdiagonal=True)
+    forecasts = Matrix(x=np.random.random((npar, 2)), row_names=pnames,
+                       col_names=["f0", "f1"])
+    e = ErrVar(jco=jco, parcov=parcov, obscov=obscov, forecasts=forecasts,
+               omitted_parameters=["p6", "p7"])
+    svs = [0, 1, 2, 3, 4, 5, 6, 7]
+    df = e.get_errvar_dataframe(svs)
+    for sv in svs:
+        for key, val in e.variance_at(sv).items():
+            assert np.abs(df.loc[sv, key] - val) <= 1.0e-10 * np.abs(val), (sv, key)
+
+
+def la_cache_test():
+    import os
+    import shutil
+    import numpy as np
+    from pyemu import ErrVar, Schur, Matrix, Cov
+    np.random.seed(5)
+    npar, nobs = 8, 6
+    pnames = ["p{0}".format(i) for i in range(npar)]
+    onames = ["o{0}".format(i) for i in range(nobs)]
+    jco = Matrix(x=np.random.random((nobs, npar)), row_names=onames, col_names=pnames)
+    parcov = Cov(x=np.random.random((npar, 1)) + 0.5, names=pnames, isdiagonal=True)
+    obscov = Cov(x=np.random.random((nobs, 1)) + 0.5, names=onames, isdiagonal=True)
+    forecasts = Matrix(x=np.random.random((npar, 2)), row_names=pnames,
+                       col_names=["f0", "f1"])
+    cache_dir = os.path.join("temp", "la_cache")
+    if os.path.exists(cache_dir):
+        shutil.rmtree(cache_dir)
+    base = Schur(jco=jco, parcov=parcov, obscov=obscov, forecasts=forecasts)
+    for _ in range(2):
+        sc = Schur(jco=jco, parcov=parcov, obscov=obscov, forecasts=forecasts,
+                   cache_dir=cache_dir)
+        for f, v in sc.posterior_forecast.items():
+            assert v == base.posterior_forecast[f]
+    assert len(os.listdir(cache_dir)) == 2
+    # the svd is added to the xtqx entry
+    ev_base = ErrVar(jco=jco, parcov=parcov, obscov=obscov, forecasts=forecasts)
+    for _ in range(2):
+        ev = ErrVar(jco=jco, parcov=parcov, obscov=obscov, forecasts=forecasts,
+                    cache_dir=cache_dir)
+        assert np.array_equal(ev.get_errvar_dataframe([0, 1, 2]).values,
+                              ev_base.get_errvar_dataframe([0, 1, 2]).values)
+    assert len(os.listdir(cache_dir)) == 2
+    # changed inputs get new entries
+    parcov2 = Cov(x=parcov.x * 2.0, names=pnames, isdiagonal=True)
+    sc = Schur(jco=jco, parcov=parcov2, obscov=obscov, forecasts=forecasts,
+               cache_dir=cache_dir)
+    sc.posterior_forecast
+    assert len(os.listdir(cache_dir)) == 3
+
+
+def propagate_test():
+    import numpy as np
+    from pyemu import Schur, Matrix, Cov
+    np.random.seed(6)
+    npar, nobs, nfore = 10, 8, 25
+    pnames = ["p{0}".format(i) for i in range(npar)]
+    onames = ["o{0}".format(i) for i in range(nobs)]
+    fnames = ["f{0}".format(i) for i in range(nfore)]
+    jco = Matrix(x=np.random.random((nobs, npar)), row_names=onames, col_names=pnames)
+    a = np.random.random((npar, npar))
+    parcov = Cov(x=np.dot(a, a.T) + np.eye(npar), names=pnames)
+    obscov = Cov(x=np.random.random((nobs, 1)) + 0.5, names=onames, isdiagonal=True)
+    forecasts = Matrix(x=np.random.random((npar, nfore)), row_names=pnames,
+                       col_names=fnames)
+    sc = Schur(jco=jco, parcov=parcov, obscov=obscov, forecasts=forecasts)
+    for cov in [sc.parcov, sc.posterior_parameter,
+                Cov(x=np.random.random((npar, 1)), names=pnames, isdiagonal=True)]:
+        full = forecasts.T * cov * forecasts
+        cov_full = sc.propagate(cov, full=True, chunk_size=7)
+        assert np.abs(cov_full.x - full.x).max() < 1.0e-10 * np.abs(full.x).max()
+        for chunk_size in [None, 1, 7]:
+            var = sc.propagate(cov, chunk_size=chunk_size)
+            assert list(var.keys()) == fnames
+            assert np.allclose([var[f] for f in fnames], np.diag(full.x), rtol=1.0e-10)
+    # streaming a block of reordered forecasts
+    block = forecasts.get(row_names=pnames[::-1], col_names=fnames[3:6])
+    var = sc.propagate(sc.posterior_parameter, predictions=block)
+    for f in fnames[3:6]:
+        assert np.isclose(var[f], sc.posterior_forecast[f], rtol=1.0e-10)
+
+
 def dataworth_test():
     import os
     import numpy as np
@@ -221,6 +331,83 @@ def dataworth_next_test():
     assert next_test.shape[0] == 4
 
 
+def added_obs_importance_lowrank_test():
+    import numpy as np
+    from pyemu import Cov, Schur
+    nobs = 30
+    pnames, onames, jco, forecasts, parcov, pst = _synthetic_schur_args(10, nobs, 0)
+    a = np.random.random((nobs, nobs))
+    for obscov in [Cov(x=np.random.random((nobs, 1)) + 0.5, names=onames, isdiagonal=True),
+                   Cov(x=np.dot(a, a.T) + np.eye(nobs), names=onames)]:
+        sc = Schur(jco=jco, pst=pst, parcov=parcov, obscov=obscov,
+                   forecasts=forecasts)
+        base = onames[2:6]
+        cases = {"c1": onames[6], "c2": onames[7:12], "c3": onames[4:8]}
+        df = sc.get_added_obs_importance(obslist_dict=cases, base_obslist=base)
+        for case, obslist in [("base", base), ("c1", base + [onames[6]]),
+                              ("c2", base + onames[7:12]), ("c3", onames[2:8])]:
+            post = sc.get(par_names=pnames, obs_names=obslist).posterior_forecast
+            for fname, pt in post.items():
+                assert np.abs(df.loc[case, fname] - pt) < 1.0e-10 * pt
+        df = sc.get_added_obs_importance(obslist_dict=cases)
+        for fname, pr in sc.prior_forecast.items():
+            assert np.abs(df.loc["base", fname] - pr) < 1.0e-10 * pr
+
+
+def removed_obs_importance_downdate_test():
+    import numpy as np
+    from pyemu import Cov, Schur
+    nobs = 30
+    pnames, onames, jco, forecasts, parcov, pst = _synthetic_schur_args(10, nobs, 1)
+    obs_var = np.random.random((nobs, 1)) + 0.5
+    # a very precise obs so removing it is poorly conditioned
+    obs_var[0] = 1.0e-6
+    a = np.random.random((nobs, nobs))
+    cases = {"c1": onames[1], "c2": onames[2:12], "c3": onames[:3]}
+    for obscov in [Cov(x=obs_var, names=onames, isdiagonal=True),
+                   Cov(x=np.dot(a, a.T) + np.eye(nobs), names=onames)]:
+        sc = Schur(jco=jco, pst=pst, parcov=parcov, obscov=obscov,
+                   forecasts=forecasts)
+        df = sc.get_removed_obs_importance(obslist_dict=cases, num_workers=2)
+        for case, obslist in cases.items():
+            if not isinstance(obslist, list):
+                obslist = [obslist]
+            diff = [o for o in onames if o not in obslist]
+            post = sc.get(par_names=pnames, obs_names=diff).posterior_forecast
+            for fname, pt in post.items():
+                assert np.abs(df.loc[case, fname] - pt) < 1.0e-6 * pt
+        for fname, pt in sc.posterior_forecast.items():
+            assert df.loc["base", fname] == pt
+
+
+def next_most_important_added_obs_greedy_test():
+    import numpy as np
+    from pyemu import Cov, Schur
+    nobs = 40
+    pnames, onames, jco, forecasts, parcov, pst = _synthetic_schur_args(10, nobs, 2)
+    obscov = Cov(x=np.random.random((nobs, 1)) + 0.5, names=onames, isdiagonal=True)
+    sc = Schur(jco=jco, pst=pst, parcov=parcov, obscov=obscov, forecasts=forecasts)
+    base = onames[:5]
+    # overlapping multi-obs cases and single-obs cases
+    cases = {"g1": onames[5:9], "g2": onames[8:12], "g3": onames[11:20]}
+    cases.update({o: o for o in onames[20:]})
+    df = sc.next_most_important_added_obs(forecast="f1", niter=5,
+                                          obslist_dict=dict(cases),
+                                          base_obslist=base)
+    assert df.shape[0] == 5
+    # repeat the search the brute-force way
+    used = list(base)
+    for best_name, var in zip(df.index, df.loc[:, "f1_variance"]):
+        imp = sc.get_added_obs_importance(obslist_dict=dict(cases), base_obslist=used)
+        imp = imp.loc[imp.index != "base", "f1"]
+        assert imp.idxmin() == best_name
+        assert np.abs(imp.min() - var) < 1.0e-10 * var
+        obslist = cases.pop(best_name)
+        if not isinstance(obslist, list):
+            obslist = [obslist]
+        used.extend([o for o in obslist if o not in used])
+
+
 def par_contrib_speed_test():
     import os
     import numpy as np
@@ -246,6 +433,35 @@ def par_contrib_speed_test():
     sc.get_par_contribution(parlist_dict={par_names[0]:par_names[0]})
 
 
+def par_contrib_conditional_test():
+    import numpy as np
+    from pyemu import Cov, Schur
+    npar, nobs = 12, 30
+    pnames, onames, jco, forecasts, _, pst = _synthetic_schur_args(npar, nobs, 3)
+    # a correlated prior so conditioning isn't just a subset
+    a = np.random.random((npar, npar))
+    parcov = Cov(x=np.dot(a, a.T) + np.eye(npar), names=pnames)
+    obscov = Cov(x=np.random.random((nobs, 1)) + 0.5, names=onames, isdiagonal=True)
+    sc = Schur(jco=jco, pst=pst, parcov=parcov, obscov=obscov, forecasts=forecasts)
+    groups = {"g1": pnames[:3], "g2": pnames[3:4], "g3": pnames[2:9], "p11": "p11"}
+    df = sc.get_par_contribution(dict(groups), include_prior_results=True,
+                                 num_workers=2)
+    for name, par_list in groups.items():
+        la_cond = sc.get_conditional_instance(par_list)
+        for f in ["f0", "f1"]:
+            for arg, d in zip(["prior", "post"],
+                              [la_cond.prior_forecast, la_cond.posterior_forecast]):
+                assert np.abs(df.loc[name, (f, arg)] - d[f]) < 1.0e-10 * d[f]
+    df = sc.next_most_par_contribution(niter=2, forecast="f0", parlist_dict=groups)
+    assert df.shape[0] == 3
+    # the best groups from the search are known perfectly
+    known = []
+    for name in df.index[1:]:
+        known.extend([p for p in groups[name] if p not in known])
+    la_cond = sc.get_conditional_instance(known)
+    assert np.abs(la_cond.posterior_forecast["f0"] - df.iloc[-1, 0]) < 1.0e-10 * df.iloc[-1, 0]
+
+
 def par_contrib_test():
     import os
     import numpy as np
@@ -286,6 +502,58 @@ def forecast_pestpp_load_test():
     print(sc.get_forecast_summary())
 
 
+def css_cso_chunked_test():
+    import numpy as np
+    from pyemu import Schur, Matrix, Pst
+    np.random.seed(7)
+    npar, nobs = 6, 23
+    pnames = ["p{0}".format(i) for i in range(npar)]
+    onames = ["o{0}".format(i) for i in range(nobs)]
+    jco = Matrix(x=np.random.random((nobs, npar)), row_names=onames, col_names=pnames)
+    pst = Pst.from_par_obs_names(pnames, onames)
+    pst.observation_data.loc[:, "weight"] = np.random.random(nobs) + 0.1
+    sc = Schur(jco=jco, pst=pst)
+    wx = jco.x * pst.observation_data.loc[onames, "weight"].values[:, np.newaxis]
+    css = np.linalg.norm(wx, axis=0) / float(pst.nnz_obs)
+    cso = np.linalg.norm(wx, axis=1) / float(pst.npar - 1)
+    for chunk_size in [5, 10000]:
+        df = sc.get_par_css_dataframe(chunk_size=chunk_size)
+        assert np.allclose(df.loc[pnames, "pest_css"].values, css)
+        df = sc.get_cso_dataframe(chunk_size=chunk_size)
+        assert list(df.index) == onames
+        assert np.allclose(df.cso.values, cso)
+
+
+def forecast_loader_test():
+    import numpy as np
+    from pyemu import Schur, Matrix, Pst
+    np.random.seed(11)
+    npar, nobs = 7, 40
+    pnames = ["p{0}".format(i) for i in range(npar)]
+    onames = ["o{0}".format(i) for i in range(nobs)]
+    jco = Matrix(x=np.random.random((nobs, npar)), row_names=onames, col_names=pnames)
+    pst = Pst.from_par_obs_names(pnames, onames)
+    fore_rows = onames[-25:]
+    vec = Matrix(x=np.random.random((npar, 2)), row_names=pnames[::-1],
+                 col_names=["v1", "v2"])
+    arr = np.random.random((3, npar))
+    sc = Schur(jco=jco.copy(), pst=pst, forecasts=[vec, arr] + fore_rows)
+    assert sc.forecast_names == ["v1", "v2", "pred_3", "pred_4", "pred_5"] + fore_rows
+    assert sc.jco.row_names == onames[:-25]
+    assert set(sc.obscov.row_names) == set(onames[:-25])
+    y = np.hstack([vec.get(row_names=pnames).x, arr.T, jco.get(row_names=fore_rows).x.T])
+    assert np.allclose(sc.predictions.x, y)
+
+    post = sc.posterior_parameter
+    full = np.diag(np.dot(y.T, np.dot(post.x, y)))
+    for kwargs in [dict(chunk_size=4, num_workers=3), dict(max_mem_mb=1.0e-4),
+                   dict(max_mem_mb=None)]:
+        var = sc.propagate(post, **kwargs)
+        assert np.allclose([var[n] for n in sc.forecast_names], full)
+    cov = sc.propagate(post, full=True, chunk_size=6, num_workers=2)
+    assert np.allclose(np.diag(cov.x), full)
+
+
 def css_test():
     import os
     import numpy as np
@@ -439,12 +707,21 @@ if __name__ == "__main__":
     #par_contrib_speed_test()
     # schur_test()
     #par_contrib_test()
+    #par_contrib_conditional_test()
     dataworth_test()
     dataworth_next_test()
+    #added_obs_importance_lowrank_test()
+    #removed_obs_importance_downdate_test()
+    #next_most_important_added_obs_greedy_test()
     #schur_test_nonpest()
     #la_test_io()
     #errvar_test_nonpest()
     #errvar_test()
+    #errvar_curves_test()
+    #la_cache_test()
+    #propagate_test()
     #css_test()
+    #css_cso_chunked_test()
+    #forecast_loader_test()
     #inf_test()
     #inf2_test()
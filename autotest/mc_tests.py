@@ -161,6 +161,34 @@ def parfile_test():
 
     pe = ParameterEnsemble.from_parfiles(pst=pst,parfile_names=parfiles,real_names=rnames)
 
+def bulk_parfile_test():
+    import os
+    import numpy as np
+    import pyemu
+
+    pst = pyemu.Pst(os.path.join("pst", "pest.pst"))
+    pe = pyemu.ParameterEnsemble.from_uniform_draw(pst, num_reals=20)
+    pe._transform()
+    prefix = os.path.join("temp", "bulkpar_")
+    pe.to_parfiles(prefix, num_workers=4)
+    assert pe.istransformed
+    parfiles = [prefix + "{0}.par".format(r) for r in pe.index]
+    pe1 = pyemu.ParameterEnsemble.from_parfiles(pst=pst, parfile_names=parfiles,
+                                                real_names=list(pe.index), num_workers=4)
+    pe._back_transform()
+    assert np.allclose(pe1.loc[:, pe.columns].values, pe.values, rtol=1.0e-6)
+
+    df = pyemu.pst_utils.read_parfile(parfiles[0])
+    assert np.allclose(df.parval1.values, pe.iloc[0, :].values, rtol=1.0e-6)
+
+    reals = list(pe.index[:3])
+    prefix = os.path.join("temp", "bulkpar_sub_")
+    pe.to_parfiles(prefix, real_names=reals, num_workers=1)
+    parfiles = [prefix + "{0}.par".format(r) for r in reals]
+    assert all([os.path.exists(f) for f in parfiles])
+    assert not os.path.exists(prefix + "{0}.par".format(pe.index[3]))
+
+
 def scale_offset_test():
     import os
     import pyemu
@@ -242,6 +270,79 @@ def pnulpar_test():
     assert max(diff.max()) < 1.0e-4
 
 
+def project_solution_basis_test():
+    import os
+    import numpy as np
+    import pyemu
+    mc = pyemu.MonteCarlo(jco=os.path.join("pst","pest.jcb"))
+    mc.draw(num_reals=10)
+    pe = mc.parensemble.copy()
+    nsing = 2
+    en1 = mc.project_parensemble(nsing=nsing,inplace=False,enforce_bounds=None)
+    en2 = mc.project_parensemble(nsing=nsing,inplace=False,enforce_bounds=None,
+                                 solution_basis=True)
+    assert not mc.parensemble.istransformed
+    assert np.allclose(mc.parensemble.values,pe.values)
+    assert np.allclose(en1.values,en2.values)
+
+    # check against the per-realization projection
+    proj = mc.get_null_proj(nsing)
+    names = pyemu.mat.mat_handler.get_common_elements(pe.adj_names,proj.row_names)
+    pe._transform()
+    base = pe.mean_values.loc[names].values
+    en1._transform()
+    p = proj.get(names,names).x
+    for real in pe.index:
+        pdiff = np.dot(p,pe.loc[real,names].values - base)
+        assert np.allclose(en1.loc[real,names].values,base + pdiff)
+
+
+def null_space_projector_test():
+    import os
+    import numpy as np
+    import pyemu
+    mc = pyemu.MonteCarlo(jco=os.path.join("pst","pest.jcb"))
+    mc.draw(num_reals=10)
+    nsing = 3
+    projector = mc.get_null_projector(nsing)
+    assert isinstance(projector, pyemu.NullSpaceProjector)
+    assert projector.nsing == nsing
+    assert projector.shape == (mc.jco.shape[1], mc.jco.shape[1])
+    proj = mc.get_null_proj(nsing)
+    assert np.allclose(projector.to_matrix().x, proj.get(projector.row_names,
+                                                         projector.row_names).x)
+    # blocks of realizations and single vectors
+    x = np.random.random((7, projector.shape[0]))
+    assert np.allclose(projector.project(x, chunk=2), np.dot(x, proj.x.T))
+    assert np.allclose(projector.project(x[0]), np.dot(proj.x, x[0]))
+
+    en1 = mc.project_parensemble(nsing=nsing, inplace=False, enforce_bounds=None)
+    en2 = mc.project_parensemble(projector=projector, inplace=False,
+                                 enforce_bounds=None)
+    en3 = mc.parensemble.project(projector, inplace=False, enforce_bounds=None)
+    assert np.allclose(en1.values, en2.values)
+    assert np.allclose(en1.values, en3.values)
+    v2 = mc.xtqx.v[:, nsing:]
+    assert np.allclose(proj.x, (v2 * v2.T).get(proj.row_names, proj.col_names).x)
+
+    # large enough for the rank-limited svd
+    np.random.seed(3)
+    nobs, npar = 150, 300
+    x = np.dot(np.random.randn(nobs, 20) * np.logspace(0, -5, 20),
+               np.random.randn(20, npar))
+    pnames = ["p{0}".format(i) for i in range(npar)]
+    onames = ["o{0}".format(i) for i in range(nobs)]
+    jco = pyemu.Jco(x=x, row_names=onames, col_names=pnames)
+    mc = pyemu.MonteCarlo(jco=jco, pst=pyemu.Pst.from_par_obs_names(pnames, onames))
+    s = np.linalg.svd(x, compute_uv=False) ** 2
+    for epsilon in [1.0e-2, 1.0e-4, 1.0e-8]:
+        assert mc.get_nsing(epsilon=epsilon) == (s / s.max() >= epsilon).sum()
+    nsing = mc.get_nsing()
+    vt = np.linalg.svd(x, full_matrices=False)[2][:nsing, :]
+    v1 = mc.get_solution_basis(nsing).x
+    assert np.allclose(np.dot(v1, v1.T), np.dot(vt.T, vt))
+
+
 def enforce_test():
     import os
     import pyemu
@@ -326,6 +427,57 @@ def pe_to_csv_test():
 
     assert np.allclose(pe1.as_matrix(),pe.as_matrix())
 
+def pe_transform_test():
+    import os
+    import numpy as np
+    import pandas as pd
+    import pyemu
+    pst = pyemu.Pst(os.path.join("pst","pest.pst"))
+    par = pst.parameter_data
+    par.loc[:,"scale"] = 2.0
+    par.loc[:,"offset"] = 1.0
+    pe = pyemu.ParameterEnsemble.from_uniform_draw(pst,num_reals=5)
+    org = pe.values.copy()
+    islog = (par.loc[pe.columns,"partrans"] == "log").values
+
+    pe._transform()
+    assert pe.istransformed
+    vals = (org * 2.0) + 1.0
+    vals[:,islog] = np.log10(vals[:,islog])
+    assert np.allclose(pe.values,vals)
+
+    # writers back transform on the fly without changing self
+    fname = os.path.join("temp","pe_transform.csv")
+    pe.to_csv(fname)
+    assert pe.istransformed
+    assert np.allclose(pe.values,vals)
+    df = pd.read_csv(fname,index_col=0)
+    assert np.allclose(df.values,org)
+    from io import StringIO
+    df = pd.read_csv(StringIO(pe.to_csv()),index_col=0)
+    assert np.allclose(df.values,org)
+
+    # the writers work a block of rows at a time
+    blocks = list(pe._back_transformed_blocks(max_mem_mb=1.0e-4))
+    assert len(blocks) == pe.shape[0]
+    assert np.allclose(np.vstack([b for _,b in blocks]),org)
+    fname = os.path.join("temp","pe_transform.jcb")
+    pe.to_binary(fname)
+    pyemu.Matrix(x=pe._back_transformed_values(),
+                 row_names=[str(r) for r in pe.index],
+                 col_names=list(pe.columns)).to_coo(fname + ".base")
+    assert open(fname,'rb').read() == open(fname + ".base",'rb').read()
+    pe.to_parfiles(os.path.join("temp","pe_transform_"),real_names=[3,1])
+    pv = pyemu.pst_utils.read_parfile(os.path.join("temp","pe_transform_3.par"))
+    assert np.allclose(pv.loc[pe.columns,"parval1"].values,org[3,:])
+
+    pe1 = pe._back_transform(inplace=False)
+    assert np.allclose(pe1.values,org)
+    pe._back_transform()
+    assert not pe.istransformed
+    assert np.allclose(pe.values,org)
+
+
 def diagonal_cov_draw_test():
     import os
     import numpy as np
@@ -365,6 +517,58 @@ def obs_id_draw_test():
     print(oe.head())
 
 
+def obs_block_draw_test():
+    import os
+    import numpy as np
+    import pandas as pd
+    import pyemu
+    pst = pyemu.Pst(os.path.join("pst","pest.pst"))
+    obs = pst.observation_data
+    obs.loc[:,"weight"] = 2.0
+    obs.loc[pst.obs_names[-1],"weight"] = 0.0
+    nz = pst.nnz_obs_names
+    num_reals = 20000
+
+    # block-diagonal cov: one correlated block and independent obs
+    cov = pyemu.Cov.from_observation_data(pst)
+    x = cov.as_2d.copy()
+    x[:3,:3] = np.array([[1.0,0.5,0.25],[0.5,1.0,0.5],[0.25,0.5,1.0]])
+    cov = pyemu.Cov(x=x,names=cov.row_names)
+    oe = pyemu.ObservationEnsemble.from_gaussian_draw(pst,cov=cov,num_reals=num_reals,
+                                                      chunk=3000)
+    assert oe.shape == (num_reals,pst.nobs)
+    noise = oe.loc[:,nz].values - obs.loc[nz,"obsval"].values
+    ecov = np.cov(noise.T)
+    assert np.abs(ecov - cov.get(nz).x).max() < 0.1
+    zname = pst.obs_names[-1]
+    assert np.allclose(oe.loc[:,zname].values,obs.loc[zname,"obsval"])
+
+    # sparse cov and streaming to disk
+    scov = pyemu.SparseMatrix.from_matrix(cov)
+    fname = os.path.join("temp","obs_noise.csv")
+    oe1 = pyemu.ObservationEnsemble.from_gaussian_draw(pst,cov=scov,num_reals=250,
+                                                       filename=fname,chunk=100)
+    assert oe1 is None
+    df = pd.read_csv(fname,index_col=0)
+    assert df.shape == (250,pst.nobs)
+    assert list(df.index) == list(range(250))
+
+    # diagonal from weights
+    oe2 = pyemu.ObservationEnsemble.from_id_gaussian_draw(pst,num_reals=num_reals)
+    std = (oe2.loc[:,nz] - obs.loc[nz,"obsval"]).std()
+    assert np.abs(std - 0.5).max() < 0.05
+
+    # the instance draw goes through the same generator
+    oe3 = pyemu.ObservationEnsemble(pst=pst)
+    np.random.seed(1)
+    oe3.draw(cov,num_reals=10)
+    np.random.seed(1)
+    oe4 = pyemu.ObservationEnsemble.from_gaussian_draw(pst,cov=cov,num_reals=10)
+    assert isinstance(oe3,pyemu.ObservationEnsemble)
+    assert (oe3.dtypes == np.float64).all()
+    assert np.allclose(oe3.values,oe4.values)
+
+
 def par_diagonal_draw_test():
     import os
     import numpy as np
@@ -565,6 +769,45 @@ def ensemble_covariance_test():
     # plt.colorbar(p)
     # plt.show()
 
+def low_rank_covariance_test():
+    import numpy as np
+    import pyemu
+
+    npar = 20
+    pst = pyemu.pst_utils.generic_pst(["p{0:010d}".format(i) for i in range(npar)], ["o1"])
+    pst.parameter_data.loc[:, "partrans"] = "none"
+    cov = pyemu.Cov.from_parameter_data(pst)
+    pe = pyemu.ParameterEnsemble.from_gaussian_draw(pst, cov, num_reals=50)
+
+    ecov = pe.covariance_matrix()
+    lrcov = pe.covariance_matrix(low_rank=True)
+    assert isinstance(lrcov, pyemu.LowRankCov)
+    assert lrcov.shape == ecov.shape
+    assert np.allclose(lrcov.to_cov().x, ecov.x)
+    assert np.allclose(lrcov.get_diagonal_vector().x.flatten(), np.diag(ecov.x))
+
+    p = np.random.random((npar, 3))
+    assert np.allclose(lrcov.matvec(p), np.dot(ecov.x, p))
+    assert np.allclose(lrcov.forecast_variance(p), np.diag(np.dot(p.T, np.dot(ecov.x, p))))
+
+    names = pst.par_names[5:8]
+    assert np.allclose(lrcov.get(names).x, ecov.get(names).x)
+
+    localizer = np.random.random((npar, npar))
+    localizer = 0.5 * (localizer + localizer.T)
+    lcov = pe.covariance_matrix(localizer=localizer)
+    lrcov = pe.covariance_matrix(localizer=localizer, low_rank=True)
+    assert np.allclose(lrcov.matvec(p, chunk=7), np.dot(lcov.x, p))
+    assert np.allclose(lrcov.matvec(p, max_mem_mb=1.0e-3), np.dot(lcov.x, p))
+    assert np.allclose(lrcov.forecast_variance(p), np.diag(np.dot(p.T, np.dot(lcov.x, p))))
+    assert np.allclose(lrcov.get(names, pst.par_names[:2]).x,
+                       lcov.get(names, pst.par_names[:2]).x)
+    assert np.allclose(lrcov.get_diagonal_vector().x.flatten(), np.diag(lcov.x))
+
+    draws = lrcov.draw(num_reals=10)
+    assert draws.shape == (10, npar)
+
+
 def binary_ensemble_dev():
     import os
     from datetime import datetime
@@ -858,22 +1101,28 @@ if __name__ == "__main__":
     # binary_ensemble_dev()
     # to_from_binary_test()
     # ensemble_covariance_test()
+    # low_rank_covariance_test()
     # homegrown_draw_test()
     # change_weights_test()
     # phi_vector_test()
     # par_diagonal_draw_test()
     # obs_id_draw_test()
+    # obs_block_draw_test()
     # diagonal_cov_draw_test()
     # pe_to_csv_test()
+    # pe_transform_test()
     # scale_offset_test()
     # mc_test()
     # fixed_par_test()
     # uniform_draw_test()
     # gaussian_draw_test()
     # parfile_test()
+    # bulk_parfile_test()
     # write_regul_test()
     from_dataframe_test()
     # ensemble_seed_test()
     # pnulpar_test()
+    # project_solution_basis_test()
+    # null_space_projector_test()
     # enforce_test()
     # add_base_test()
\ No newline at end of file
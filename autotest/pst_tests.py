@@ -137,6 +137,376 @@ def load_test():
     if len(exceptions) > 0:
         raise Exception('\n'.join(exceptions))
 
+def load_cache_test():
+    import os
+    import shutil
+    import numpy as np
+    import pyemu
+    temp_dir = "temp"
+    if not os.path.exists(temp_dir):
+        os.mkdir(temp_dir)
+    pst_file = os.path.join(temp_dir, "cache_test.pst")
+    shutil.copy2(os.path.join("pst", "pest.pst"), pst_file)
+    cache_file = pst_file + ".cache"
+    if os.path.exists(cache_file):
+        os.remove(cache_file)
+
+    pst = pyemu.Pst(pst_file)
+    pst1 = pyemu.Pst(pst_file, cache=True)
+    assert os.path.exists(cache_file)
+    pst2 = pyemu.Pst(pst_file, cache=True)
+    for p in [pst1, pst2]:
+        assert p.par_names == pst.par_names
+        assert p.obs_names == pst.obs_names
+        assert np.allclose(p.observation_data.weight.values,
+                           pst.observation_data.weight.values)
+        assert p.model_command == pst.model_command
+        assert p.control_data.noptmax == pst.control_data.noptmax
+
+    # a changed control file invalidates the cache
+    pst.observation_data.loc[:, "weight"] = 2.0
+    pst.write(pst_file)
+    pst3 = pyemu.Pst(pst_file, cache=True)
+    assert np.allclose(pst3.observation_data.weight.values, 2.0)
+
+    # caches from another pyemu or cache layout are not used...
+    key = pyemu.pst_utils.file_cache_key(pst_file)
+    pyemu.pst_utils.write_cache(cache_file, key, {"junk": 1})
+    pst4 = pyemu.Pst(pst_file, cache=True)
+    assert "junk" not in pst4.__dict__
+    assert pst4.par_names == pst.par_names
+    # ...and neither are ones that can't be restored
+    key = (pyemu.pst.pst_handler._pst_cache_key, pyemu.__version__, key)
+    pyemu.pst_utils.write_cache(cache_file, key, {"junk": 1})
+    pst5 = pyemu.Pst(pst_file, cache=True)
+    assert "junk" not in pst5.__dict__
+    assert np.allclose(pst5.observation_data.weight.values, 2.0)
+    with open(cache_file, 'wb') as f:
+        f.write(b"not a pickle")
+    pst6 = pyemu.Pst(pst_file, cache=True)
+    assert pst6.obs_names == pst.obs_names
+
+
+def derived_names_memo_test():
+    import os
+    import pyemu
+    pst = pyemu.Pst(os.path.join("pst", "pest.pst"))
+    nnz = pst.nnz_obs_names
+    assert pst.nnz_obs_names == nnz
+    # returned lists are copies
+    nnz.append("junk")
+    assert "junk" not in pst.nnz_obs_names
+
+    # in-place edits of the frames are picked up
+    name = pst.nnz_obs_names[0]
+    pst.observation_data.loc[name, "weight"] = 0.0
+    assert name not in pst.nnz_obs_names
+    assert pst.nnz_obs == len(nnz) - 2
+    assert pst.npar_adj > 0
+    pst.parameter_data.loc[:, "partrans"] = "fixed"
+    assert len(pst.adj_par_names) == 0
+    assert pst.npar_adj == 0
+
+    # so are reassignments
+    pst.parameter_data = pst.parameter_data.copy()
+    pst.parameter_data.loc[:, "partrans"] = "log"
+    assert pst.adj_par_names == pst.par_names
+
+    # and writes that don't go through pandas setitem
+    pst.observation_data.weight.values[:] = 1.0
+    assert pst.nnz_obs == pst.nobs
+    pst.observation_data.weight.values[:3] = 0.0
+    assert pst.nnz_obs == pst.nobs - 3
+    pst.parameter_data.partrans.values[0] = "fixed"
+    assert pst.npar_adj == pst.npar - 1
+    pst.observation_data.loc[:, "weight"] = 1.0
+    pst.observation_data.loc[pst.obs_names[0], "obgnme"] = "newgroup"
+    assert "newgroup" in pst.obs_groups
+
+    # pyemu's own edits bump the version
+    version = pst._data_version
+    pst._set_values("observation_data", pst.obs_names[:2], "weight", 0.0)
+    assert pst._data_version == version + 1
+    assert pst.nnz_obs == pst.nobs - 2
+
+
+def get_view_test():
+    import os
+    import numpy as np
+    import pandas as pd
+    import pyemu
+    pst = pyemu.Pst(os.path.join("pst", "pest.pst"))
+    par_names = pst.par_names[::2]
+    obs_names = pst.obs_names[1::3]
+    new = pst.get(par_names, obs_names)
+    view = pst.get_view(par_names, obs_names)
+    assert isinstance(view, pyemu.PstView)
+    for attr in ["npar", "nobs", "par_names", "obs_names", "adj_par_names",
+                 "npar_adj", "nnz_obs_names", "nnz_obs", "zero_weight_obs_names"]:
+        assert getattr(new, attr) == getattr(view, attr), attr
+    assert np.array_equal(pst.observation_data.obsnme.values[view.obs_idx],
+                          np.array(obs_names))
+    # the frames are real, independent data frames
+    assert type(view.parameter_data) is pd.DataFrame
+    assert type(view.observation_data) is pd.DataFrame
+    pname = par_names[0]
+    parval1 = view.parameter_data.loc[pname, "parval1"]
+    pst.parameter_data.loc[pname, "parval1"] = 999.
+    assert view.parameter_data.loc[pname, "parval1"] == parval1
+    pst.parameter_data.loc[pname, "parval1"] = parval1
+    # the prior information is a rectified private copy
+    assert view.prior_information.equals(new.prior_information)
+    view.prior_information.loc[:, "obgnme"] = "view_only"
+    assert "view_only" not in pst.prior_information.obgnme.values
+    assert new.parameter_data.equals(view.parameter_data)
+    assert new.observation_data.equals(view.observation_data)
+    assert new.parameter_groups.equals(view.parameter_groups)
+
+    # edits to the view do not reach the parent
+    nnz = pst.nnz_obs
+    view.observation_data.loc[:, "weight"] = 0.0
+    view.control_data.noptmax = -2
+    assert view.nnz_obs == 0
+    assert pst.nnz_obs == nnz
+    assert pst.control_data.noptmax != -2
+    view.write(os.path.join("temp", "view.pst"))
+
+
+def phi_components_test():
+    import os
+    import numpy as np
+    import pandas as pd
+    import pyemu
+    pst = pyemu.Pst(os.path.join("pst", "pest.pst"))
+    res = pst.res.set_index("name").residual
+    obs = pst.observation_data
+    comps = pst.phi_components
+    for grp, onames in obs.groupby("obgnme").groups.items():
+        phi = ((res.loc[onames] * obs.loc[onames, "weight"]) ** 2).sum()
+        assert np.isclose(comps[grp], phi), grp
+    assert np.isclose(pst.phi, sum(comps.values()))
+
+    # many residual vectors in one call
+    np.random.seed(0)
+    resid = pd.DataFrame(np.random.randn(5, pst.nobs), columns=pst.obs_names)
+    phi_df = pst.get_phi_components(resid)
+    assert phi_df.shape[0] == 5
+    assert set(pst.obs_groups).issubset(set(phi_df.columns))
+    for i in range(resid.shape[0]):
+        pv = pst.get_phi_components(resid.iloc[i, :])
+        assert np.allclose(pv.values, phi_df.iloc[i, :].values)
+        assert np.isclose(pv.sum(), ((resid.iloc[i, :].values *
+                                      obs.weight.values) ** 2).sum())
+
+    # reweighting by phi components
+    pst.adjust_weights_resfile(original_ceiling=False)
+    nnz = obs.loc[obs.weight > 0].groupby("obgnme").size()
+    comps = pst.phi_components
+    for grp, n in nnz.items():
+        if comps[grp] > 0.0:
+            assert np.isclose(comps[grp], n), grp
+
+
+def instruction_engine_test():
+    import os
+    import numpy as np
+    import pyemu
+    out_file = os.path.join("temp", "engine.out")
+    ins_file = out_file + ".ins"
+    with open(out_file, 'w') as f:
+        f.write("header line\n")
+        f.write("MODEL RESULTS: time = 1.0\n")
+        f.write("  h1   1.5   2.5e+00   3.0D+00\n")
+        f.write("  flux out,  4.25,  x\n")
+        f.write("abcd 12.50 99 xyz\n")
+        f.write("  last 8.0\n")
+    with open(ins_file, 'w') as f:
+        f.write("pif ~\n")
+        f.write("~RESULTS~ ~time =~ !t1!\n")
+        f.write("l1 w w !h1! !h2! !h3!\n")
+        f.write("l1 ~out,~ !fo! ~,~\n")
+        f.write("l1 [fx]6:10\n")
+        f.write("& (sx)12:12 ~xyz~\n")
+        f.write("l1 t3 !dum! !last!\n")
+    sim = pyemu.pst_utils.read_output_file(ins_file, out_file)
+    expected = {"t1": 1.0, "h1": 1.5, "h2": 2.5, "h3": 3.0, "fo": 4.25,
+                "fx": 12.5, "sx": 99.0, "last": 8.0}
+    assert list(sim.index) == list(expected.keys())
+    assert np.allclose(sim.values, list(expected.values()))
+    # the compiled instructions are cached
+    ins = pyemu.pst_utils.compile_instructions(ins_file)
+    assert pyemu.pst_utils.compile_instructions(ins_file) is ins
+
+    pst = pyemu.pst_utils.generic_pst(obs_names=["extra"] + list(expected.keys()))
+    pst.instruction_files = [ins_file]
+    pst.output_files = [out_file]
+    sim = pst.process_output_files()
+    assert list(sim.index) == pst.obs_names
+    assert np.isnan(sim.loc["extra"])
+    assert np.allclose(sim.loc[list(expected.keys())].values, list(expected.values()))
+
+    with open(out_file, 'w') as f:
+        f.write("header line\n")
+    try:
+        pyemu.pst_utils.read_output_file(ins_file, out_file)
+    except Exception:
+        pass
+    else:
+        raise Exception("should have failed")
+
+
+def parse_io_files_cache_test():
+    import os
+    import pyemu
+    cache_file = os.path.join("temp", "io_names.cache")
+    if os.path.exists(cache_file):
+        os.remove(cache_file)
+    tpl_files = []
+    for i in range(3):
+        tpl_file = os.path.join("temp", "cache_{0}.dat.tpl".format(i))
+        with open(tpl_file, 'w') as f:
+            f.write("ptf ~\n")
+            f.write("~  p{0}a  ~ ~ p{0}b   ~\n".format(i))
+        tpl_files.append(tpl_file)
+    names = pyemu.pst_utils.parse_tpl_files(tpl_files, cache_file=cache_file)
+    assert [sorted(n) for n in names] == [["p{0}a".format(i), "p{0}b".format(i)]
+                                          for i in range(3)]
+    assert os.path.exists(cache_file)
+
+    # only the edited file is parsed again
+    with open(tpl_files[1], 'w') as f:
+        f.write("ptf ~\n")
+        f.write("~  new  ~\n")
+    pyemu.pst_utils._io_names.clear()
+    names = pyemu.pst_utils.parse_tpl_files(tpl_files, cache_file=cache_file)
+    assert names[1] == ["new"]
+    assert sorted(names[2]) == ["p2a", "p2b"]
+    # a pool of processes only when asked for
+    pyemu.pst_utils._io_names.clear()
+    pnames = pyemu.pst_utils.parse_tpl_files(tpl_files, num_workers=2,
+                                             processes=True)
+    assert [sorted(n) for n in pnames] == [sorted(n) for n in names]
+
+    ins_file = os.path.join("temp", "cache.out.ins")
+    with open(ins_file, 'w') as f:
+        f.write("pif ~\n")
+        f.write("l1 w !o1!\n")
+        f.write("l1 w !o2!\n")
+    names = pyemu.pst_utils.parse_ins_files([ins_file], num_workers=1,
+                                            cache_file=cache_file)
+    assert names == [["o1", "o2"]]
+    # tpl entries are kept in the shared cache file
+    stored = pyemu.pst_utils.read_cache(cache_file, pyemu.pst_utils._io_cache_key)
+    assert len(stored) == 4
+
+
+def read_resfile_cache_test():
+    import os
+    import shutil
+    import numpy as np
+    import pyemu
+    res_file = os.path.join("temp", "pest.rei")
+    shutil.copy2(os.path.join("pst", "pest.rei"), res_file)
+    cache_file = res_file + ".cache"
+    if os.path.exists(cache_file):
+        os.remove(cache_file)
+    res = pyemu.pst_utils.read_resfile(res_file, cache=True)
+    assert os.path.exists(cache_file)
+    assert res.group.dtype == object
+    res.loc[res.name[:2], "group"] = "newgrp"
+    assert (res.group.iloc[:2] == "newgrp").all()
+    res = pyemu.pst_utils.read_resfile(res_file, cache=True)
+    assert res.weight.dtype == np.float64
+    assert res.name.str.islower().all()
+    cached = pyemu.pst_utils.read_resfile(res_file, cache=True)
+    assert cached.equals(res)
+
+    pst = pyemu.Pst(os.path.join("pst", "pest.pst"))
+    pst.set_res(res_file)
+    assert np.allclose(pst.res.loc[pst.obs_names, "residual"].values,
+                       res.loc[pst.obs_names, "residual"].values)
+
+
+def prior_information_arrays_test():
+    import os
+    import numpy as np
+    import pyemu
+    pst = pyemu.Pst(os.path.join("pst", "pest.pst"))
+    loaded = pst.prior_arrays
+    assert loaded.nprior == pst.nprior
+    assert loaded.coef.shape == (pst.nprior, len(loaded.par_names))
+
+    pyemu.helpers.zero_order_tikhonov(pst)
+    assert "_prior_arrays" in pst.__dict__
+    assert pst.nprior == pst.npar_adj
+    names = pst.adj_par_names[:3]
+    pst.add_pi_equation(names, pilbl="test_pi", rhs=2.5,
+                        coef_dict={names[1]: -1.0})
+    assert pst.nprior == pst.npar_adj + 1
+    pst.write(os.path.join("temp", "pi_arrays.pst"))
+    pst2 = pyemu.Pst(os.path.join("temp", "pi_arrays.pst"))
+    pa1, pa2 = pst.prior_arrays, pst2.prior_arrays
+    assert list(pa1.pilbl) == list(pa2.pilbl)
+    assert np.allclose(pa1.rhs, pa2.rhs)
+    assert np.allclose(pa1.weight, pa2.weight)
+    a1 = pa1.to_sparse_matrix(pst.par_names).x.toarray()
+    a2 = pa2.to_sparse_matrix(pst.par_names).x.toarray()
+    assert np.allclose(a1, a2)
+    assert np.allclose(a1[-1, :3], [1.0, -1.0, 1.0])
+
+    # the rendered frame matches the pending arrays
+    assert pst.prior_information.shape[0] == pst2.nprior
+    assert "_prior_arrays" not in pst.__dict__
+
+    # rectify drops the equations with fixed pars
+    pst.parameter_data.loc[names[0], "partrans"] = "fixed"
+    pst.rectify_pi()
+    assert pst.nprior == pst2.nprior - 2
+
+    # reweighting a copy leaves the parent alone
+    pyemu.helpers.zero_order_tikhonov(pst)
+    org_weight = pst.prior_arrays.weight.copy()
+    p2 = pst.get()
+    p2.parameter_data.loc[:, "parubnd"] *= 10.0
+    pyemu.helpers.regweight_from_parbound(p2)
+    assert not np.allclose(p2.prior_arrays.weight, org_weight)
+    assert np.allclose(pst.prior_arrays.weight, org_weight)
+    org_weight = pst.prior_information.weight.values.copy()
+    p2 = pst.get()
+    p2.prior_information.loc[:, "weight"] = 0.0
+    assert np.allclose(pst.prior_information.weight.values, org_weight)
+
+
+def write_realizations_test():
+    import os
+    import numpy as np
+    import pandas as pd
+    import pyemu
+
+    pst = pyemu.Pst(os.path.join("pst", "pest.pst"))
+    org_parval1 = pst.parameter_data.parval1.copy()
+    pv = pd.DataFrame(np.random.random((3, 2)), columns=pst.par_names[:2])
+    ov = pd.DataFrame(np.random.random((3, 1)), columns=pst.obs_names[-1:])
+    names = [os.path.join("temp", "real_{0}.pst".format(i)) for i in range(3)]
+    pst.write_realizations(names, parval1=pv, obsval=ov)
+    assert np.allclose(pst.parameter_data.parval1.values, org_parval1.values)
+    for i, name in enumerate(names):
+        p = pyemu.Pst(os.path.join("pst", "pest.pst"))
+        p.parameter_data.loc[pv.columns, "parval1"] = pv.iloc[i, :].values
+        p.observation_data.loc[ov.columns, "obsval"] = ov.iloc[i, :].values
+        p.write(os.path.join("temp", "single.pst"))
+        with open(name, 'r') as f1, open(os.path.join("temp", "single.pst"), 'r') as f2:
+            assert f1.read() == f2.read()
+
+    pv.loc[:, "junk"] = 1.0
+    try:
+        pst.write_realizations(names, parval1=pv)
+    except Exception:
+        pass
+    else:
+        raise Exception("should have failed")
+
+
 def comments_test():
     import os
     import pyemu
@@ -1263,6 +1633,15 @@ if __name__ == "__main__":
     # comments_test()
     # test_e_clean()
     # load_test()
+    # load_cache_test()
+    # derived_names_memo_test()
+    # get_view_test()
+    # phi_components_test()
+    # instruction_engine_test()
+    # write_realizations_test()
+    # read_resfile_cache_test()
+    # prior_information_arrays_test()
+    # parse_io_files_cache_test()
     # res_test()
     # smp_test()
     # from_io_with_inschek_test()
@@ -436,6 +436,40 @@ def write_tpl_test():
     pyemu.pst_utils.write_to_template(par_vals,tpl_file,in_file)
 
 
+def compiled_tpl_test():
+    import os
+    import numpy as np
+    import pandas as pd
+    import pyemu
+    tpl_file = os.path.join("temp", "compiled.tpl")
+    in_file = os.path.join("temp", "compiled.dat")
+    with open(tpl_file, 'w') as f:
+        f.write("ptf ~\n")
+        f.write("# 100% literal line\n")
+        for i in range(10):
+            f.write("{0} ~   p{0}   ~ ~     p{0}          ~\n".format(i))
+    fmt, names, slots = pyemu.pst_utils.compile_template(tpl_file)
+    assert len(names) == 10
+    assert len(slots) == 20
+    # the plan is cached
+    assert pyemu.pst_utils.compile_template(tpl_file)[0] is fmt
+
+    par_vals = pd.Series(np.arange(10) + 0.5, index=["p{0}".format(i) for i in range(10)])
+    pyemu.pst_utils.write_to_template(par_vals, tpl_file, in_file)
+    lines = open(in_file).readlines()
+    assert lines[0] == "# 100% literal line\n"
+    arr = np.loadtxt(in_file, skiprows=1)
+    assert np.allclose(arr[:, 1], par_vals.values)
+    assert np.allclose(arr[:, 2], par_vals.values)
+
+    try:
+        pyemu.pst_utils.write_to_template(par_vals.iloc[1:], tpl_file, in_file)
+    except Exception:
+        pass
+    else:
+        raise Exception("should have failed")
+
+
 def read_pestpp_runstorage_file_test():
     import os
     import pyemu
@@ -1648,6 +1682,7 @@ if __name__ == "__main__":
     # smp_to_ins_test()
     # read_pestpp_runstorage_file_test()
     # write_tpl_test()
+    # compiled_tpl_test()
     # pp_to_shapefile_test()
     # read_pval_test()
     read_hob_test()
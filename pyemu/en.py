@@ -3,14 +3,18 @@ import os
 from datetime import datetime
 import copy
 import warnings
+from io import StringIO
 warnings.filterwarnings("ignore",category=UserWarning)
 from .pyemu_warnings import PyemuWarning
 import math
 import numpy as np
 import pandas as pd
+import scipy.sparse
+from scipy.sparse.csgraph import connected_components
 
-from pyemu.mat.mat_handler import get_common_elements,Matrix,Cov,SparseMatrix
-from pyemu.pst.pst_utils import write_parfile,read_parfile
+from pyemu.mat.mat_handler import get_common_elements,Matrix,Cov,SparseMatrix,LowRankCov,\
+    NullSpaceProjector,save_coo_blocks
+from pyemu.pst.pst_utils import write_parfile,read_parfile,write_parfiles,read_parfiles
 from pyemu.plot.plot_utils import ensemble_helper
 from .utils.os_utils import run_sweep
 
@@ -261,7 +265,7 @@ class Ensemble(pd.DataFrame):
 
 
 
-    def covariance_matrix(self,localizer=None):
+    def covariance_matrix(self,localizer=None,low_rank=False):
         """calculate the approximate covariance matrix implied by the ensemble using
         mean-differencing operation at the core of EnKF
 
@@ -269,28 +273,23 @@ class Ensemble(pd.DataFrame):
         ----------
             localizer : pyemu.Matrix
                 covariance localizer to apply
+            low_rank : bool
+                flag to return a pyemu.LowRankCov deviation-factor operator
+                instead of forming the dense npar X npar covariance matrix.
+                The localizer is then only applied lazily to requested blocks.
+                Default is False
 
         Returns
         -------
-            cov : pyemu.Cov
+            cov : pyemu.Cov or pyemu.LowRankCov
                 covariance matrix
 
         """
 
-
-
-
-        mean = np.array(self.mean(axis=0))
-        delta = self.as_pyemu_matrix(typ=Cov)
-        for i in range(self.shape[0]):
-            delta.x[i, :] -= mean
-        delta *= (1.0 / np.sqrt(float(self.shape[0] - 1.0)))
-
-        if localizer is not None:
-            delta = delta.T * delta
-            return delta.hadamard_product(localizer)
-
-        return delta.T * delta
+        lrcov = LowRankCov.from_ensemble(self,localizer=localizer)
+        if low_rank:
+            return lrcov
+        return lrcov.to_cov()
 
 
     def get_deviations(self):
@@ -388,7 +387,8 @@ class ObservationEnsemble(Ensemble):
     def draw(self,cov,num_reals):
         """ draw realizations of observation noise and add to mean_values
         Note: only draws noise realizations for non-zero weighted observations
-        zero-weighted observations are set to mean value for all realizations
+        zero-weighted observations are set to mean value for all realizations.
+        Uses the same block factoring as ObservationEnsemble.from_gaussian_draw()
 
         Parameters
         ----------
@@ -399,9 +399,16 @@ class ObservationEnsemble(Ensemble):
             number of realizations to draw
 
         """
-        super(ObservationEnsemble,self).draw(cov,num_reals,
-                                             names=self.pst.nnz_obs_names)
-        self.loc[:,self.names] += self.pst.observation_data.obsval
+        self.loc[:,:] = np.NaN
+        self.dropna(inplace=True)
+        for col in self.columns:
+            self[col] = self[col].astype(np.float64)
+
+        # this sucks - can only set by enlargement one row at a time
+        cidx = pd.Index(self.pst.obs_names).get_indexer(self.columns)
+        for start,arr in ObservationEnsemble._draw_blocks(self.pst,cov,num_reals):
+            for i,vals in enumerate(arr[:,cidx]):
+                self.loc[start + i,:] = vals
 
     @property
     def nonzero(self):
@@ -434,22 +441,171 @@ class ObservationEnsemble(Ensemble):
             ObservationEnsemble : ObservationEnsemble
 
         """
-        # set up some column names
-        real_names = np.arange(num_reals,dtype=np.int64)
-        #arr = np.empty((num_reals,len(pst.obs_names)))
+        return cls.from_gaussian_draw(pst=pst,cov=None,num_reals=num_reals)
+
+    @staticmethod
+    def _noise_factors(pst,cov=None):
+        """ private method to find the independent blocks of an observation
+        noise covariance matrix and form a (square root) factor for each block.
+        Blocks of the same size are stacked so they can be factored and
+        drawn in batches
+
+        Parameters
+        ----------
+        pst : pyemu.Pst
+            a control file instance
+        cov : pyemu.Cov or pyemu.SparseMatrix
+            observation noise covariance matrix.  If None, a diagonal
+            covariance matrix is formed from the weights
+
+        Returns
+        -------
+        names : list
+            the non-zero weighted observation names that get noise
+        stds : tuple
+            (indices,standard deviations) for the single-observation blocks
+        blocks : list
+            list of (indices,factors) for each stacked group of blocks of
+            the same size.  indices has shape (nblock,size) and factors
+            has shape (nblock,size,size)
+
+        """
         obs = pst.observation_data
-        stds = {name:1.0/obs.loc[name,"weight"] for name in pst.nnz_obs_names}
-        nz_names = set(pst.nnz_obs_names)
-        arr = np.random.randn(num_reals,pst.nobs)
-        for i,oname in enumerate(pst.obs_names):
-            if oname in nz_names:
-                arr[:,i] *= stds[oname]
+        names = pst.nnz_obs_names
+        if cov is None:
+            stds = 1.0 / obs.loc[names,"weight"].values.astype(np.float64)
+            return names,(np.arange(len(names)),stds),[]
+
+        nidx = {n:i for i,n in enumerate(names)}
+        cidx = np.array([nidx.get(n,-1) for n in cov.row_names])
+        keep = np.where(cidx >= 0)[0]
+        cidx = cidx[keep]
+        if isinstance(cov,SparseMatrix):
+            x = cov.x.tocsr()[keep,:][:,keep].tocoo()
+            x = scipy.sparse.coo_matrix((x.data,(cidx[x.row],cidx[x.col])),
+                                        shape=(len(names),len(names))).tocsr()
+        elif isinstance(cov,Matrix):
+            if cov.isdiagonal:
+                d = np.zeros(len(names))
+                d[cidx] = cov.x.flatten()[keep]
+                x = scipy.sparse.diags(d).tocsr()
             else:
-                arr[:,i] = 0.0
-        df = pd.DataFrame(arr,index=real_names,columns=pst.obs_names)
-        df.loc[:,pst.obs_names] += pst.observation_data.obsval
-        new_oe = cls.from_dataframe(pst=pst,df=df)
-        return new_oe
+                x = scipy.sparse.coo_matrix(cov.as_2d[np.ix_(keep,keep)])
+                x = scipy.sparse.coo_matrix((x.data,(cidx[x.row],cidx[x.col])),
+                                            shape=(len(names),len(names))).tocsr()
+        else:
+            raise Exception("ObservationEnsemble._noise_factors() error: " +\
+                            "cov must be a Cov or SparseMatrix, not {0}".format(type(cov)))
+
+        # nnz obs not in cov get their noise from the weights
+        missing = np.setdiff1d(np.arange(len(names)),cidx)
+        if len(missing) > 0:
+            warnings.warn("{0} non-zero weighted obs not in cov, ".format(len(missing))+\
+                          "using weights for noise",PyemuWarning)
+            wstd = 1.0 / obs.loc[names,"weight"].values.astype(np.float64)
+            x = x + scipy.sparse.coo_matrix((wstd[missing]**2,(missing,missing)),
+                                            shape=x.shape).tocsr()
+
+        nblock,labels = connected_components(x,directed=False)
+        order = np.argsort(labels,kind="stable")
+        sizes = np.bincount(labels,minlength=nblock)
+        starts = np.concatenate([[0],np.cumsum(sizes)[:-1]])
+        single = sizes == 1
+        sidx = order[starts[single]]
+        stds = np.sqrt(x.diagonal()[sidx])
+        blocks = []
+        for size in np.unique(sizes[~single]):
+            bstarts = starts[sizes == size]
+            idxs = order[bstarts[:,None] + np.arange(size)[None,:]]
+            bcov = np.array([x[idx,:][:,idx].toarray() for idx in idxs])
+            v,w = np.linalg.eigh(bcov)
+            v[v < 1.0e-10] = 0.0
+            blocks.append((idxs,w * np.sqrt(v)[:,None,:]))
+        return names,(sidx,stds),blocks
+
+    @classmethod
+    def from_gaussian_draw(cls,pst,cov=None,num_reals=100,filename=None,chunk=1000):
+        """ instantiate an observation ensemble of noise realizations (added to
+        the observation values) from a diagonal, block-diagonal or sparse
+        covariance matrix.  The independent blocks of cov are found once
+        and each block is drawn with batched matrix products.  Only non-zero
+        weighted observations get noise
+
+        Parameters
+        ----------
+        pst : pyemu.Pst
+            a control file instance
+        cov : pyemu.Cov or pyemu.SparseMatrix
+            observation noise covariance matrix.  If None, a diagonal covariance
+            matrix implied by the weights is used.  Non-zero weighted observations
+            not in cov get noise from the weights.  Default is None
+        num_reals : int
+            number of realizations to draw
+        filename : str
+            optional csv file to stream realizations to in chunks.  If not None,
+            the ensemble is not held in memory and None is returned
+        chunk : int
+            number of realizations to draw (and write) at one time.  Default is 1000
+
+        Returns
+        -------
+        ObservationEnsemble : ObservationEnsemble
+            if filename is None, otherwise None
+
+        """
+        if filename is None:
+            arr = np.zeros((num_reals,pst.nobs))
+            for i,block in ObservationEnsemble._draw_blocks(pst,cov,num_reals,chunk):
+                arr[i:i + block.shape[0],:] = block
+            df = pd.DataFrame(arr,index=np.arange(num_reals,dtype=np.int64),
+                              columns=pst.obs_names)
+            return cls.from_dataframe(pst=pst,df=df)
+
+        with open(filename,'w') as f:
+            for i,block in ObservationEnsemble._draw_blocks(pst,cov,num_reals,chunk):
+                df = pd.DataFrame(block,columns=pst.obs_names,
+                                  index=np.arange(i,i + block.shape[0],dtype=np.int64))
+                df.to_csv(f,header=i == 0)
+        return None
+
+    @staticmethod
+    def _draw_blocks(pst,cov,num_reals,chunk=1000):
+        """ private generator of blocks of realizations of observation noise
+        added to the observation values, using the factors from
+        ObservationEnsemble._noise_factors()
+
+        Parameters
+        ----------
+        pst : pyemu.Pst
+            a control file instance
+        cov : pyemu.Cov or pyemu.SparseMatrix
+            observation noise covariance matrix (or None to use the weights)
+        num_reals : int
+            number of realizations to draw
+        chunk : int
+            number of realizations in each block.  Default is 1000
+
+        Returns
+        -------
+        blocks : generator
+            (start realization, numpy.ndarray) pairs.  The columns are in
+            the order of pst.obs_names
+
+        """
+        names,(sidx,stds),blocks = ObservationEnsemble._noise_factors(pst,cov)
+        obsval = pst.observation_data.loc[pst.obs_names,"obsval"].values.astype(np.float64)
+        nz_idx = pd.Index(pst.obs_names).get_indexer(names)
+        chunk = max(1,int(chunk))
+        for i in range(0,num_reals,chunk):
+            nreals = min(chunk,num_reals - i)
+            noise = np.zeros((nreals,len(names)))
+            noise[:,sidx] = np.random.randn(nreals,len(sidx)) * stds
+            for idxs,a in blocks:
+                snv = np.random.randn(idxs.shape[0],nreals,idxs.shape[1])
+                noise[:,idxs] = np.einsum("kij,knj->nki",a,snv)
+            arr = np.zeros((nreals,len(obsval))) + obsval
+            arr[:,nz_idx] += noise
+            yield i,arr
 
     def to_binary(self, filename):
         """write the observation ensemble to a jco-style binary file.  The
@@ -500,20 +656,30 @@ class ObservationEnsemble(Ensemble):
         for the realizations.  The ObservationEnsemble.pst.weights can be
         updated prior to calling this method to evaluate new weighting strategies
 
+        Return
+        ------
+        pandas.Series : pandas.Series
+
+        """
+        return self.phi_components.sum(axis=1)
+
+    @property
+    def phi_components(self):
+        """property decorated method to get the phi contribution of each
+        observation group for each realization in one vectorized call.
+        The ObservationEnsemble.pst.weights can be updated prior to calling
+        this method to evaluate new weighting strategies
+
         Return
         ------
         pandas.DataFrame : pandas.DataFrame
+            realizations (rows) by observation groups (columns)
 
         """
-        weights = self.pst.observation_data.loc[self.names,"weight"]
-        obsval = self.pst.observation_data.loc[self.names,"obsval"]
-        phi_vec = []
-        for idx in self.index.values:
-            simval = self.loc[idx,self.names]
-            phi = (((simval - obsval) * weights)**2).sum()
-            phi_vec.append(phi)
-        #return pd.DataFrame({"phi":phi_vec},index=self.index)
-        return pd.Series(data=phi_vec,index=self.index)
+        obsval = self.pst.observation_data.loc[self.names,"obsval"].values
+        resid = pd.DataFrame(self.loc[:,self.names].values - obsval,
+                             index=self.index,columns=self.names)
+        return self.pst.get_phi_components(resid)
 
 
     def add_base(self):
@@ -723,6 +889,114 @@ class ParameterEnsemble(Ensemble):
             apply(lambda x : x in ["fixed","tied"])
         return isfixed.values
 
+    def _transform_arrays(self):
+        """ private method to get the log-transform mask, scale and offset
+        arrays aligned with the columns of self.  Columns not in the
+        control file are treated as untransformed
+
+        Returns
+        -------
+        islog : numpy.ndarray
+            boolean mask of log-transformed columns
+        scale : numpy.ndarray
+            scale factor for each column
+        offset : numpy.ndarray
+            offset for each column
+
+        """
+        par = self.pst.parameter_data
+        islog = (par.partrans.reindex(self.columns) == "log").values
+        scale = par.scale.reindex(self.columns).fillna(1.0).values.astype(np.float64)
+        offset = par.offset.reindex(self.columns).fillna(0.0).values.astype(np.float64)
+        return islog, scale, offset
+
+    def _row_blocks(self,ncols,max_mem_mb=256):
+        """ private method to get the (start,stop) row ranges of blocks of
+        self that hold about max_mem_mb of float64 values across ncols
+        columns
+
+        """
+        nrows = max(1,int(max_mem_mb * 1.0e6 / (8.0 * max(ncols,1))))
+        return [(i,min(i + nrows,self.shape[0]))
+                for i in range(0,self.shape[0],nrows)]
+
+    def _apply_inplace(self,idx,func,max_mem_mb=256):
+        """ private method to replace the columns idx of self with
+        func(values) in place, one block of rows at a time so that only
+        one block is ever copied out of self
+
+        Parameters
+        ----------
+        idx : numpy.ndarray
+            integer positions of the columns to change
+        func : callable
+            function of a (nrow,len(idx)) float64 array
+        max_mem_mb : float
+            approximate memory for each block.  Default is 256
+
+        """
+        if len(idx) == 0:
+            return
+        for start,stop in self._row_blocks(len(idx),max_mem_mb):
+            vals = self.iloc[start:stop,idx].values.astype(np.float64)
+            self.iloc[start:stop,idx] = func(vals)
+
+    def _log10_inplace(self,inverse=False):
+        """ private method to log10 (or un-log10 if inverse) just the log-transformed
+        columns of self in place.  Does not change the transform flag
+
+        Parameters
+        ----------
+        inverse : bool
+            flag to apply 10**x instead of log10(x)
+
+        """
+        islog,_,_ = self._transform_arrays()
+        func = (lambda x: np.power(10.0,x,out=x)) if inverse \
+            else (lambda x: np.log10(x,out=x))
+        self._apply_inplace(np.where(islog)[0],func)
+
+    def _back_transformed_blocks(self,max_mem_mb=256):
+        """ private method to get the values of self in control file space,
+        one block of rows at a time, without changing self.  Used by the
+        writers to back transform on the fly
+
+        Parameters
+        ----------
+        max_mem_mb : float
+            approximate memory for each block.  Default is 256
+
+        Returns
+        -------
+        blocks : generator
+            (start row, numpy.ndarray) pairs that cover the rows of self
+
+        """
+        islog, scale, offset = self._transform_arrays()
+        so = (scale != 1.0) | (offset != 0.0)
+        for start,stop in self._row_blocks(self.shape[1],max_mem_mb):
+            vals = self.iloc[start:stop,:].values.astype(np.float64)
+            if self.istransformed:
+                if islog.any():
+                    vals[:,islog] = np.power(10.0,vals[:,islog])
+                if so.any():
+                    vals[:,so] = (vals[:,so] - offset[so]) / scale[so]
+            yield start,vals
+
+    def _back_transformed_values(self):
+        """ private method to get all of the values of self in control
+        file space without changing self
+
+        Returns
+        -------
+        vals : numpy.ndarray
+
+        """
+        vals = np.zeros(self.shape)
+        for start,block in self._back_transformed_blocks():
+            vals[start:start + block.shape[0],:] = block
+        return vals
+
 
 
     def draw(self,cov,num_reals=1,how="normal",enforce_bounds=None):
@@ -760,8 +1034,7 @@ class ParameterEnsemble(Ensemble):
                 #if fname not in self.columns:
                 #    continue
                 self.loc[:,fname] = fval
-        istransformed = self.pst.parameter_data.loc[:,"partrans"] == "log"
-        self.loc[:,istransformed] = 10.0**self.loc[:,istransformed]
+        self._log10_inplace(inverse=True)
         self.__istransformed = False
 
         #self._applied_tied()
@@ -1371,31 +1644,29 @@ class ParameterEnsemble(Ensemble):
 
         Note
         ----
-        Don't call this method unless you know what you are doing
+        Don't call this method unless you know what you are doing.
+        Only the log-transformed columns (and columns with non-default
+        scale and offset) are touched
 
         """
         if not self.istransformed:
             raise Exception("ParameterEnsemble already back transformed")
 
-        istransformed = self.pst.parameter_data.loc[:,"partrans"] == "log"
         if inplace:
-            self.loc[:,istransformed] = 10.0**(self.loc[:,istransformed])
-            self.loc[:,:] = (self.loc[:,:] -\
-                             self.pst.parameter_data.offset)/\
-                             self.pst.parameter_data.scale
+            _, scale, offset = self._transform_arrays()
+            self._log10_inplace(inverse=True)
+            so = np.where((scale != 1.0) | (offset != 0.0))[0]
+            self._apply_inplace(so,lambda x: (x - offset[so]) / scale[so])
 
             self.__istransformed = False
         else:
             vals = (self.pst.parameter_data.parval1 -\
                     self.pst.parameter_data.offset) /\
                     self.pst.parameter_data.scale
-            new_en = ParameterEnsemble(pst=self.pst.get(),data=self.loc[:,:].copy(),
-                              columns=self.columns,
-                              mean_values=vals,istransformed=False)
-            new_en.loc[:,istransformed] = 10.0**(self.loc[:,istransformed])
-            new_en.loc[:,:] = (new_en.loc[:,:] -\
-                             new_en.pst.parameter_data.offset)/\
-                             new_en.pst.parameter_data.scale
+            new_en = ParameterEnsemble(pst=self.pst.get(),
+                                       data=self._back_transformed_values(),
+                                       index=self.index,columns=self.columns,
+                                       mean_values=vals,istransformed=False)
             return new_en
 
 
@@ -1414,41 +1685,43 @@ class ParameterEnsemble(Ensemble):
 
         Note
         ----
-        Don't call this method unless you know what you are doing
+        Don't call this method unless you know what you are doing.
+        Only the log-transformed columns (and columns with non-default
+        scale and offset) are touched
 
         """
         if self.istransformed:
             #raise Exception("ParameterEnsemble already transformed")
             return
 
-        istransformed = self.pst.parameter_data.loc[:,"partrans"] == "log"
         if inplace:
-            #self.loc[:,istransformed] = np.log10(self.loc[:,istransformed])
-            self.loc[:,:] = (self.loc[:,:] * self.pst.parameter_data.scale) +\
-                             self.pst.parameter_data.offset
-            self.loc[:,istransformed] = self.loc[:,istransformed].applymap(lambda x: math.log10(x))
+            _, scale, offset = self._transform_arrays()
+            so = np.where((scale != 1.0) | (offset != 0.0))[0]
+            self._apply_inplace(so,lambda x: (x * scale[so]) + offset[so])
+            self._log10_inplace()
 
             self.__istransformed = True
         else:
             vals = self.pst.parameter_data.parval1.copy()
             new_en = ParameterEnsemble(pst=self.pst.get(),data=self.loc[:,:].copy(),
                               columns=self.columns,
-                              mean_values=vals,istransformed=True)
-            new_en.loc[:,:] = (new_en.loc[:,:] * self.pst.parameter_data.scale) +\
-                             new_en.pst.parameter_data.offset
-            new_en.loc[:,istransformed] = self.loc[:,istransformed].applymap(lambda x: math.log10(x))
+                              mean_values=vals,istransformed=False)
+            new_en._transform(inplace=True)
             return new_en
 
 
 
     def project(self,projection_matrix,inplace=True,log=None,
-                enforce_bounds="reset"):
+                enforce_bounds="reset",solution_basis=False):
         """ project the ensemble using the null-space Monte Carlo method
 
         Parameters
         ----------
-        projection_matrix : pyemu.Matrix
-            projection operator - must already respect log transform
+        projection_matrix : pyemu.Matrix or pyemu.NullSpaceProjector
+            projection operator - must already respect log transform.  If
+            solution_basis is True, this is the truncated solution-space
+            basis V1 instead and the projection is applied as (I - V1V1^T).
+            A NullSpaceProjector is applied the same way
 
         inplace : bool
             project self or return a new ParameterEnsemble instance
@@ -1460,61 +1733,67 @@ class ParameterEnsemble(Ensemble):
             parameter bound enforcement flag. 'drop' removes
             offending realizations, 'reset' resets offending values
 
+        solution_basis : bool
+            flag to treat projection_matrix as the npar X nsing solution-space
+            basis V1 so that the npar X npar projection matrix is never formed.
+            Default is False
+
         Returns
         -------
         ParameterEnsemble : ParameterEnsemble
             if inplace is False
 
+        Note
+        ----
+        the projection is applied to blocks of realizations as a
+        matrix product
+
         """
 
         if self.istransformed:
             self._back_transform()
 
-        istransformed = self.pst.parameter_data.loc[:,"partrans"] == "log"
-        self.loc[:,istransformed] = self.loc[:,istransformed].applymap(lambda x: math.log10(x))
-        self.__istransformed = True
-
         #make sure everything is cool WRT ordering
         common_names = get_common_elements(self.adj_names,
                                                  projection_matrix.row_names)
-        base = self.mean_values.loc[common_names]
-        projection_matrix = projection_matrix.get(common_names,common_names)
+        if solution_basis:
+            projection_matrix = NullSpaceProjector(projection_matrix)
+        if isinstance(projection_matrix,NullSpaceProjector):
+            projection_matrix = projection_matrix.get(common_names)
+        else:
+            projection_matrix = projection_matrix.get(common_names,common_names).x
 
         if not inplace:
             new_en = ParameterEnsemble(pst=self.pst.get(),data=self.loc[:,:].copy(),
                                        columns=self.columns,
                                        mean_values=self.mean_values.copy(),
                                        istransformed=self.istransformed)
-
-        for real in self.index:
-            if log is not None:
-                log("projecting realization {0}".format(real))
-
-            # null space projection of difference vector
-            pdiff = self.loc[real,common_names] - base
-            pdiff = np.dot(projection_matrix.x,
-                           (self.loc[real,common_names] - base)\
-                           .values)
-
-            if inplace:
-                self.loc[real,common_names] = base + pdiff
-            else:
-                new_en.loc[real,common_names] = base + pdiff
-
-            if log is not None:
-                log("projecting realization {0}".format(real))
+        else:
+            new_en = self
+
+        new_en._log10_inplace()
+        new_en.__istransformed = True
+        base = new_en.mean_values.loc[common_names].values.astype(np.float64)
+        cidx = new_en.columns.get_indexer(common_names)
+
+        if log is not None:
+            log("projecting {0} realizations".format(new_en.shape[0]))
+        # null space projection of difference vectors - all realizations at once
+        pdiff = new_en.iloc[:,cidx].values.astype(np.float64) - base
+        if isinstance(projection_matrix,NullSpaceProjector):
+            pdiff = projection_matrix.project(pdiff)
+        else:
+            pdiff = np.dot(pdiff,projection_matrix.T)
+        new_en.iloc[:,cidx] = base + pdiff
+        if log is not None:
+            log("projecting {0} realizations".format(new_en.shape[0]))
+
+        new_en.enforce(enforce_bounds)
+        new_en._log10_inplace(inverse=True)
+        new_en.__istransformed = False
         if not inplace:
-            new_en.enforce(enforce_bounds)
-            new_en.loc[:,istransformed] = 10.0**new_en.loc[:,istransformed]
-            new_en.__istransformed = False
-
-            #new_en._back_transform()
             return new_en
 
-        self.enforce(enforce_bounds)
-        self.loc[:,istransformed] = 10.0**self.loc[:,istransformed]
-        self.__istransformed = False
-
     def enforce(self,enforce_bounds="reset"):
         """ entry point for bounds enforcement.  This gets called for the
         draw method(s), so users shouldn't need to call this
@@ -1670,7 +1949,8 @@ class ParameterEnsemble(Ensemble):
         # self.loc[:,:] = self.loc[:,:].astype(np.float64)
 
     @classmethod
-    def from_parfiles(cls,pst,parfile_names,real_names=None):
+    def from_parfiles(cls,pst,parfile_names,real_names=None,num_workers=None,
+                      logger=None):
         """ create a parameter ensemble from parfiles.  Accepts parfiles with less than the
         parameters in the control (get NaNs in the ensemble) or extra parameters in the
         parfiles (get dropped)
@@ -1684,37 +1964,37 @@ class ParameterEnsemble(Ensemble):
             real_names : str
                 optional list of realization names. If None, a single integer counter is used
 
+            num_workers : int
+                number of threads to use to read the par files.  If None, the
+                number of cpus is used
+
+            logger : pyemu.Logger
+                optional logger for progress reporting
+
         Returns:
             pyemu.ParameterEnsemble
 
 
         """
         if isinstance(pst,str):
-            pst = pyemu.Pst(pst)
-        dfs = {}
+            from pyemu.pst.pst_handler import Pst
+            pst = Pst(pst)
         if real_names is not None:
             assert len(real_names) == len(parfile_names)
         else:
             real_names = np.arange(len(parfile_names))
 
-        for rname,pfile in zip(real_names,parfile_names):
-            assert os.path.exists(pfile), "ParameterEnsemble.read_parfiles() error: " + \
-                                          "file: {0} not found".format(pfile)
-            df = read_parfile(pfile)
-            #check for scale differences - I don't who is dumb enough
-            #to change scale between par files and pst...
-            diff = df.scale - pst.parameter_data.scale
-            if diff.apply(np.abs).sum() > 0.0:
-                warnings.warn("differences in scale detected, applying scale in par file",
-                              PyemuWarning)
-                #df.loc[:,"parval1"] *= df.scale
-
-            dfs[rname] = df.parval1.values
-
-        df_all = pd.DataFrame(data=dfs).T
-        df_all.columns = df.index
-
-
+        df_all,scales = read_parfiles(parfile_names,num_workers=num_workers,
+                                      logger=logger)
+        df_all.index = real_names
+        #check for scale differences - I don't who is dumb enough
+        #to change scale between par files and pst...
+        common = [c for c in scales.columns if c in pst.parameter_data.index]
+        diff = scales.loc[:,common].values - \
+               pst.parameter_data.loc[common,"scale"].values
+        if np.nansum(np.abs(diff)) > 0.0:
+            warnings.warn("differences in scale detected, applying scale in par file",
+                          PyemuWarning)
 
         if len(pst.par_names) != df_all.shape[1]:
             #if len(pst.par_names) < df_all.shape[1]:
@@ -1752,19 +2032,38 @@ class ParameterEnsemble(Ensemble):
 
         Note
         ----
-        this function back-transforms inplace with respect to
-        log10 before writing
+        this function back-transforms on the fly with respect to
+        log10 - self is not changed.  If self is transformed, the
+        realizations are back transformed and written a block of rows
+        at a time
 
         """
-        retrans = False
-        if self.istransformed:
-            self._back_transform(inplace=True)
-            retrans = True
         if self.isnull().values.any():
             warnings.warn("NaN in par ensemble",PyemuWarning)
-        super(ParameterEnsemble,self).to_csv(*args,**kwargs)
-        if retrans:
-            self._transform(inplace=True)
+        if not self.istransformed or self.shape[0] == 0:
+            return super(ParameterEnsemble,self).to_csv(*args,**kwargs)
+
+        args = list(args)
+        path = args.pop(0) if len(args) > 0 else kwargs.pop("path_or_buf",None)
+        if len(args) > 4:
+            # header passed by position
+            kwargs["header"] = args.pop(4)
+        header = kwargs.pop("header",True)
+        mode = kwargs.pop("mode","w")
+        if path is None:
+            f = StringIO()
+        elif hasattr(path,"write"):
+            f = path
+        else:
+            f = open(path,mode)
+        for start,vals in self._back_transformed_blocks():
+            df = pd.DataFrame(data=vals,columns=self.columns,
+                              index=self.index[start:start + vals.shape[0]])
+            df.to_csv(f,*args,header=header if start == 0 else False,**kwargs)
+        if path is None:
+            return f.getvalue()
+        if f is not path:
+            f.close()
 
 
     def to_binary(self,filename):
@@ -1782,23 +2081,20 @@ class ParameterEnsemble(Ensemble):
 
         Note
         ----
-        this function back-transforms inplace with respect to
-        log10 before writing
+        this function back-transforms on the fly with respect to
+        log10 - self is not changed.  The realizations are back
+        transformed and written a block of rows at a time
 
         """
 
-        retrans = False
-        if self.istransformed:
-            self._back_transform(inplace=True)
-            retrans = True
         if self.isnull().values.any():
             warnings.warn("NaN in par ensemble",PyemuWarning)
-        self.as_pyemu_matrix().to_coo(filename)
-        if retrans:
-            self._transform(inplace=True)
+        save_coo_blocks(self._back_transformed_blocks(),self.shape,
+                        row_names=[str(r) for r in self.index],
+                        col_names=list(self.columns),filename=filename)
 
 
-    def to_parfiles(self,prefix):
+    def to_parfiles(self,prefix,real_names=None,num_workers=None,logger=None):
         """
             write the parameter ensemble to PEST-style parameter files
 
@@ -1806,25 +2102,46 @@ class ParameterEnsemble(Ensemble):
         ----------
         prefix: str
             file prefix for par files
+        real_names : list
+            optional subset of realization names to write.  If None, all
+            realizations are written
+        num_workers : int
+            number of threads to use to write the par files.  If None, the
+            number of cpus is used
+        logger : pyemu.Logger
+            optional logger for progress reporting
 
         Note
         ----
-        this function back-transforms inplace with respect to
-        log10 before writing
+        this function back-transforms on the fly with respect to
+        log10 - self is not changed.  The realizations are back
+        transformed and written a block of rows at a time
 
         """
         if self.isnull().values.any():
             warnings.warn("NaN in par ensemble",PyemuWarning)
-        if self.istransformed:
-            self._back_transform(inplace=True)
-
-        par_df = self.pst.parameter_data.loc[:,
-                 ["parnme","parval1","scale","offset"]].copy()
-
-        for real in self.index:
-            par_file = "{0}{1}.par".format(prefix,real)
-            par_df.loc[:,"parval1"] =self.loc[real,:]
-            write_parfile(par_df,par_file)
+        if real_names is None:
+            real_names = list(self.index)
+        else:
+            if not isinstance(real_names,list):
+                real_names = list(real_names)
+            missing = [r for r in real_names if r not in self.index]
+            if len(missing) > 0:
+                raise Exception("ParameterEnsemble.to_parfiles() error: " +\
+                                "realizations not found: {0}".\
+                                format(','.join([str(m) for m in missing])))
+        pos = self.index.get_indexer(real_names)
+
+        par_df = self.pst.parameter_data.loc[self.columns,
+                 ["parnme","scale","offset"]]
+        par_files = ["{0}{1}.par".format(prefix,real) for real in real_names]
+        for start,vals in self._back_transformed_blocks():
+            inblock = np.where((pos >= start) & (pos < start + vals.shape[0]))[0]
+            if len(inblock) == 0:
+                continue
+            write_parfiles(par_df,vals[pos[inblock] - start,:],
+                           [par_files[i] for i in inblock],
+                           num_workers=num_workers,logger=logger)
 
 
     def add_base(self):
@@ -40,6 +40,7 @@ class ErrVar(LinearAnalysis):
 
 
     """
+    _cache_svd = True
 
     def __init__(self,jco,**kwargs):
 
@@ -308,15 +309,108 @@ class ErrVar(LinearAnalysis):
         if not isinstance(singular_values, list) and \
                 not isinstance(singular_values, np.ndarray):
             singular_values = [singular_values]
-        results = {}
-        for singular_value in singular_values:
-            sv_results = self.variance_at(singular_value)
-            for key, val in sv_results.items():
-                if key not in results.keys():
-                    results[key] = []
-                results[key].append(val)
+        results = self.__errvar_curves(singular_values)
         return pd.DataFrame(results, index=singular_values)
 
+    def __errvar_curves(self, singular_values, block_size=1000):
+        """private method to get the error variance terms for all predictions
+        at many singular values from the single SVD of xtqx.  With
+        z = V^T * y, the first term at singular value k is
+        z_2^T * V_2^T * parcov * V_2 * z_2 (the trailing block of
+        V^T * parcov * V), the second term is sum(z_1**2 / s_1) and the
+        third term uses the cumulative sum of (z_1 / s_1) * V_1^T * X^T * Q^-1 * X_o,
+        so each singular value is a cumulative sum update
+
+        Parameters
+        ----------
+        singular_values : list
+            singular values to test
+        block_size : int
+            number of rows of V^T * parcov * V to process at once.
+            Default is 1000
+
+        Returns
+        -------
+        dict : dict
+            dictionary of (err var term,prediction_name), list of error
+            variance pairs in the order of singular_values
+
+        Note
+        ----
+        used by get_errvar_dataframe() - equivalent to calling variance_at()
+        for each singular value
+
+        """
+        if not self.predictions:
+            raise Exception("ErrVar.get_errvar_dataframe(): no predictions are set")
+        singular_values = np.asarray(singular_values, dtype=int)
+        v = self.xtqx.v
+        par_names = v.row_names
+        npar = len(par_names)
+        vx = v.x
+        s = self.xtqx.s.x.flatten()[:npar]
+        pred_names = self.predictions.col_names
+        z = np.dot(vx.T, self.predictions.get(row_names=par_names).x)
+        nfore = z.shape[1]
+
+        self.log("calc first term curves")
+        parcov = self.parcov.get(par_names)
+        if parcov.isdiagonal:
+            vtcv = np.dot(vx.T, parcov.x.flatten()[:, np.newaxis] * vx)
+        else:
+            vtcv = np.dot(vx.T, np.dot(parcov.x, vx))
+        # z_i * sum(vtcv[i,j>=i] * z_j), processed in blocks of rows
+        # to avoid a copy of upper triangle of vtcv
+        mz = np.zeros_like(z)
+        for i0 in range(0, npar, block_size):
+            i1 = min(npar, i0 + block_size)
+            mz[i0:i1] = np.dot(np.triu(vtcv[i0:i1, i0:i1]), z[i0:i1]) +\
+                        np.dot(vtcv[i0:i1, i1:], z[i1:])
+        piece = z * (2.0 * mz - np.diag(vtcv)[:, np.newaxis] * z)
+        first = np.zeros((npar + 1, nfore))
+        first[:npar] = np.cumsum(piece[::-1], axis=0)[::-1]
+        self.log("calc first term curves")
+
+        self.log("calc second term curves")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            zs = z / s[:, np.newaxis]
+            second = np.zeros((npar + 1, nfore))
+            second[1:] = np.cumsum(z * zs, axis=0)
+        self.log("calc second term curves")
+
+        third = np.zeros((npar + 1, nfore))
+        if self.__need_omitted:
+            self.log("calc third term curves")
+            onames = self.omitted_jco.col_names
+            xtqxo = self.jco.T * self.obscov.inv * self.omitted_jco
+            vtxtqxo = np.dot(vx.T, xtqxo.get(row_names=par_names, col_names=onames).x)
+            oparcov = self.omitted_parcov.get(onames)
+            for i, opred in enumerate(self.omitted_predictions):
+                with np.errstate(invalid="ignore"):
+                    p = np.zeros((npar + 1, len(onames)))
+                    p[1:] = np.cumsum(zs[:, i, np.newaxis] * vtxtqxo, axis=0)
+                p -= opred.get(row_names=onames).x.flatten()
+                if oparcov.isdiagonal:
+                    third[:, i] = (p * p * oparcov.x.flatten()).sum(axis=1)
+                else:
+                    third[:, i] = (p * np.dot(p, oparcov.x)).sum(axis=1)
+            self.log("calc third term curves")
+
+        mn = min(self.jco.shape)
+        try:
+            mn = min(self.pst.npar_adj, self.pst.nnz_obs)
+        except:
+            pass
+        idx = np.clip(singular_values, 0, npar)
+        results = {}
+        for term, curves in zip(["first", "second", "third"], [first, second, third]):
+            for i, pred_name in enumerate(pred_names):
+                vals = curves[idx, i]
+                if term == "second" or (term == "third" and self.__need_omitted):
+                    vals = np.where(singular_values > mn, 1.0E+35, vals)
+                results[(term, pred_name)] = list(vals)
+        return results
+
 
     def get_identifiability_dataframe(self,singular_value=None,precondition=False):
         """get the parameter identifiability as a pandas dataframe
@@ -501,10 +595,8 @@ class ErrVar(LinearAnalysis):
         first_term = self.I_minus_R(singular_value).T * self.parcov *\
                      self.I_minus_R(singular_value)
         if self.predictions:
-            results = {}
-            for prediction in self.predictions_iter:
-                results[("first",prediction.col_names[0])] = \
-                    float((prediction.T * first_term * prediction).x)
+            results = {("first",name):var for name,var in
+                       self.propagate(first_term).items()}
             self.log("calc first term parameter @" + str(singular_value))
             return results
 
@@ -568,10 +660,8 @@ class ErrVar(LinearAnalysis):
         else:
             second_term = self.G(singular_value) * self.obscov * \
                           self.G(singular_value).T
-            results = {}
-            for prediction in self.predictions_iter:
-                results[("second",prediction.col_names[0])] = \
-                    float((prediction.T * second_term * prediction).x)
+            results = {("second",name):var for name,var in
+                       self.propagate(second_term).items()}
             self.log("calc second term prediction @" + str(singular_value))
             return results
 
@@ -9,9 +9,28 @@ import numpy as np
 import pandas as pd
 from pyemu.mat.mat_handler import Matrix, Jco, Cov
 from pyemu.pst.pst_handler import Pst
+from pyemu.pst import pst_utils
 from pyemu.utils.helpers import _istextfile
 from .logger import Logger
 
+# version tag stored with on-disk cache entries
+_la_cache_key = ("pyemu linear analysis", 1)
+
+
+def _matrix_digest(m):
+    """ private helper to get a digest of the contents (values, names
+    and storage) of a Matrix for the on-disk cache keys
+
+    """
+    import hashlib
+    h = hashlib.sha1()
+    h.update(str((m.shape, m.isdiagonal)).encode())
+    h.update('\n'.join(m.row_names).encode())
+    h.update('\n'.join(m.col_names).encode())
+    h.update(np.ascontiguousarray(m.x, dtype=np.float64).data)
+    return h.hexdigest()
+
+
 class LinearAnalysis(object):
     """The super class for linear analysis.  Can be used directly, but
     for prior uncertainty analyses only.  The derived types
@@ -64,6 +83,12 @@ class LinearAnalysis(object):
         when calculating prior parameter covariance matrix from
         bounds.  This arg is onlyused if constructing parcov
         from parameter bounds.Default is True.
+    cache_dir : str
+        optional directory for an on-disk cache of expensive intermediates
+        (xtqx and its SVD and the Schur posterior parameter covariance).
+        Entries are keyed on digests of the contents of jco, obscov and
+        parcov, so they are recomputed if any of these change.  Default is
+        None (no caching)
 
     Note
     ----
@@ -71,10 +96,13 @@ class LinearAnalysis(object):
     private attributes
     
     """
+    # flag to compute and cache the SVD of xtqx along with xtqx
+    _cache_svd = False
+
     def __init__(self, jco=None, pst=None, parcov=None, obscov=None,
                  predictions=None, ref_var=1.0, verbose=False,
                  resfile=False, forecasts=None,sigma_range=4.0,
-                 scale_offset=True,**kwargs):
+                 scale_offset=True,cache_dir=None,**kwargs):
         self.logger = Logger(verbose)
         self.log = self.logger.log
         self.jco_arg = jco
@@ -99,6 +127,9 @@ class LinearAnalysis(object):
 
         self.sigma_range = sigma_range
         self.scale_offset = scale_offset
+        self.cache_dir = cache_dir
+        if cache_dir is not None and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
 
         #private attributes - access is through @decorated functions
         self.__pst = None
@@ -110,6 +141,7 @@ class LinearAnalysis(object):
         self.__xtqx = None
         self.__fehalf = None
         self.__prior_prediction = None
+        self.__prior_information = None
         self.prediction_extract = None
 
         self.log("pre-loading base components")
@@ -375,6 +407,12 @@ class LinearAnalysis(object):
                 an ascii file
             can be none if only interested in parameters.
 
+        Note
+        ----
+        the sources are collected first and the (npar,npred) prediction
+        matrix is preallocated and filled column-wise, so large numbers
+        of forecasts (e.g. jco rows) are loaded without repeated copies
+
         """
         if self.prediction_arg is None:
             self.__predictions = None
@@ -383,26 +421,15 @@ class LinearAnalysis(object):
         if not isinstance(self.prediction_arg, list):
             self.prediction_arg = [self.prediction_arg]
 
+        # collect the sources: jco row names, Matrix blocks and ndarray blocks
         row_names = []
-        vecs = []
-        mat = None
+        blocks = []
+        jco_rows = set(self.jco.row_names) if self.jco is not None else set()
         for arg in self.prediction_arg:
             if isinstance(arg, Matrix):
-                # a vector
-                if arg.shape[1] == 1:
-                    vecs.append(arg)
-                else:
-                    if self.jco is not None:
-                        assert arg.shape[0] == self.jco.shape[1],\
-                        "linear_analysis.__load_predictions(): " +\
-                        "multi-prediction matrix(npar,npred) not aligned " +\
-                        "with jco(nobs,npar): " + str(arg.shape) +\
-                        ' ' + str(self.jco.shape)
-                        #for pred_name in arg.row_names:
-                        #    vecs.append(arg.extract(row_names=pred_name).T)
-                    mat = arg
+                blocks.append(arg)
             elif isinstance(arg, str):
-                if arg.lower() in self.jco.row_names:
+                if arg.lower() in jco_rows:
                     row_names.append(arg.lower())
                 else:
                     try:
@@ -411,16 +438,7 @@ class LinearAnalysis(object):
                         raise Exception("forecast argument: "+arg+" not found in " +\
                                         "jco row names and could not be " +\
                                         "loaded from a file.")
-                    # vector
-                    if pred_mat.shape[1] == 1:
-                        vecs.append(pred_mat)
-                    else:
-                        #for pred_name in pred_mat.row_names:
-                        #    vecs.append(pred_mat.get(row_names=pred_name))
-                        if mat is None:
-                            mat = pred_mat
-                        else:
-                            mat = mat.extend((pred_mat))
+                    blocks.append(pred_mat)
             elif isinstance(arg, np.ndarray):
                 self.logger.warn("linear_analysis.__load_predictions(): " +
                                 "instantiating prediction matrix from " +
@@ -428,62 +446,80 @@ class LinearAnalysis(object):
                 self.logger.warn("linear_analysis.__load_predictions(): " +
                                  "instantiating prediction matrix from " +
                                  "ndarray, generating generic prediction names")
-
-                pred_names = ["pred_{0}".format(i+1) for i in range(arg.shape[0])]
-
-                if self.jco:
-                    names = self.jco.col_names
-                elif self.parcov:
-                    names = self.parcov.col_names
-                else:
-                    raise Exception("linear_analysis.__load_predictions(): " +
-                                    "ndarray passed for predicitons " +
-                                    "requires jco or parcov to get " +
-                                    "parameter names")
-                if mat is None:
-                    mat = Matrix(x=arg,row_names=pred_names,col_names=names).T
-                else:
-                    mat = mat.extend(Matrix(x=arg,row_names=pred_names,col_names=names).T)
-                #for pred_name in pred_names:
-                #    vecs.append(pred_matrix.get(row_names=pred_name).T)
+                blocks.append(np.atleast_2d(arg))
             else:
                 raise Exception("unrecognized predictions argument: " +
                                 str(arg))
-        # turn vecs into a pyemu.Matrix
-
-        if len(vecs) > 0:
-            xs = vecs[0].x
-            for vec in vecs[1:]:
-                xs = xs.extend(vec.x)
-            names = [vec.col_names[0] for vec in vecs]
-            if mat is None:
-                mat = Matrix(x=xs,row_names=vecs[0].row_names,
-                             col_names=names)
+
+        # the parameter names that the prediction vectors are aligned to
+        if self.jco is not None:
+            par_names = list(self.jco.col_names)
+        elif len(blocks) > 0 and isinstance(blocks[0], Matrix):
+            par_names = list(blocks[0].row_names)
+        elif self.parcov is not None:
+            par_names = list(self.parcov.col_names)
+        else:
+            raise Exception("linear_analysis.__load_predictions(): " +
+                            "ndarray passed for predicitons " +
+                            "requires jco or parcov to get " +
+                            "parameter names")
+        npar = len(par_names)
+
+        fore_names = []
+        for block in blocks:
+            if isinstance(block, Matrix):
+                fore_names.extend(block.col_names)
             else:
-                mat = mat.extend(Matrix(x = np.array(xs),
-                                        row_names=vecs[0].row_names,
-                                        col_names=names))
+                if block.shape[1] != npar:
+                    raise Exception("linear_analysis.__load_predictions(): " +
+                                    "prediction ndarray (npred,npar) not " +
+                                    "aligned with {0} parameters: {1}".\
+                                    format(npar, str(block.shape)))
+                fore_names.extend(["pred_{0}".format(len(fore_names) + i + 1)
+                                   for i in range(block.shape[0])])
+        fore_names.extend(row_names)
+        if len(set(fore_names)) != len(fore_names):
+            raise Exception("linear_analysis.__load_predictions(): " +
+                            "duplicate forecast names")
+
+        # fortran order so that each forecast vector is contiguous
+        x = np.zeros((npar, len(fore_names)), order='F')
+        icol = 0
+        for block in blocks:
+            if isinstance(block, Matrix):
+                if list(block.row_names) != par_names:
+                    missing = set(par_names) - set(block.row_names)
+                    if len(missing) > 0:
+                        raise Exception("linear_analysis.__load_predictions(): " +
+                                        "prediction matrix not aligned with " +
+                                        "parameters, missing: " +
+                                        ','.join(list(missing)[:10]))
+                    block = block.get(row_names=par_names)
+                ncol = block.shape[1]
+                x[:, icol:icol + ncol] = block.as_2d
+            else:
+                ncol = block.shape[0]
+                x[:, icol:icol + ncol] = block.T
+            icol += ncol
 
         if len(row_names) > 0:
-            extract = self.jco.extract(row_names=row_names).T
-            if mat is None:
-                mat = extract
-            else:
-                mat = mat.extend(extract)
-            #for row_name in row_names:
-            #    vecs.append(extract.get(row_names=row_name).T)
-            # call obscov to load __obscov so that __obscov
-            # (priavte) can be manipulated
-            self.__obscov.drop(row_names, axis=0)
+            idxs = self.jco.indices(row_names, axis=0)
+            x[:, icol:] = self.jco.x[idxs, :].T
+            # remove the forecast rows from the jco and the obscov in
+            # one pass each - obscov returns a reference to __obscov
+            self.jco.drop(row_names, axis=0)
+            self.obscov.drop(row_names, axis=0)
+        mat = Matrix(x=x, row_names=par_names, col_names=fore_names)
         self.__predictions = mat
         try:
-            fnames = [fname for fname in self.forecast_names if fname in self.pst.nnz_obs_names]
+            nnz_obs_names = set(self.pst.nnz_obs_names)
+            fnames = [fname for fname in self.forecast_names if fname in nnz_obs_names]
         except:
             fnames = []
         if len(fnames) > 0:
             self.logger.warn("forecasts with non-zero weight in pst: {0}...".format(','.join(fnames)) +
                              "\n -> re-setting these forecast weights to zero...")
-            self.pst.observation_data.loc[fnames,"weight"] = 0.0
+            self.pst._set_values("observation_data",fnames,"weight",0.0)
         self.log("loading forecasts")
         self.logger.statement("forecast names: {0}".format(','.join(mat.col_names)))
         return self.__predictions
@@ -736,11 +772,88 @@ class LinearAnalysis(object):
 
         """
         if self.__xtqx is None:
-            self.log("xtqx")
-            self.__xtqx = self.jco.T * (self.obscov ** -1) * self.jco
-            self.log("xtqx")
+            entry = self._cache_entry("xtqx", [self.jco, self.obscov])
+            state = self._read_cache(entry) or {}
+            self.__xtqx = state.get("xtqx")
+            if self.__xtqx is None:
+                self.log("xtqx")
+                self.__xtqx = self.jco.T * (self.obscov ** -1) * self.jco
+                self.log("xtqx")
+            if entry is not None and (len(state) == 0 or
+                                      (self._cache_svd and not state["svd"])):
+                if self._cache_svd:
+                    # the svd components are stored with xtqx
+                    self.log("xtqx svd")
+                    self.__xtqx.v
+                    self.log("xtqx svd")
+                self._write_cache(entry, {"xtqx": self.__xtqx,
+                                          "svd": self._cache_svd})
         return self.__xtqx
 
+    def _cache_entry(self, name, matrices):
+        """ get the file name and key of an on-disk cache entry
+
+        Parameters
+        ----------
+        name : str
+            the name of the cached quantity
+        matrices : list
+            the matrices the quantity is computed from
+
+        Returns
+        -------
+        entry : tuple
+            (cache file name, key).  None if self.cache_dir is None
+
+        """
+        if self.cache_dir is None:
+            return None
+        import hashlib
+        digests = [_matrix_digest(m) for m in matrices]
+        digest = hashlib.sha1('|'.join(digests).encode()).hexdigest()
+        cache_file = os.path.join(self.cache_dir, "{0}_{1}.cache".format(name, digest))
+        return cache_file, (_la_cache_key, name, digests)
+
+    def _read_cache(self, entry):
+        """ read an on-disk cache entry (see _cache_entry())
+
+        Parameters
+        ----------
+        entry : tuple
+            (cache file name, key)
+
+        Returns
+        -------
+        dict : dict
+            the cached quantities or None if entry is None or the entry is
+            missing or stale
+
+        """
+        if entry is None:
+            return None
+        state = pst_utils.read_cache(entry[0], entry[1])
+        if state is not None:
+            self.logger.statement("loaded {0} from cache file {1}".
+                                  format(','.join(state.keys()), entry[0]))
+        return state
+
+    def _write_cache(self, entry, state):
+        """ write an on-disk cache entry (see _cache_entry())
+
+        Parameters
+        ----------
+        entry : tuple
+            (cache file name, key)
+        state : dict
+            the quantities to cache
+
+        """
+        if entry is None:
+            return
+        self.logger.statement("writing {0} to cache file {1}".
+                              format(','.join(state.keys()), entry[0]))
+        pst_utils.write_cache(entry[0], entry[1], state)
+
     @property
     def mle_covariance(self):
         """ get the maximum likelihood parameter covariance matrix.
@@ -824,16 +937,103 @@ class LinearAnalysis(object):
         else:
             if self.predictions is not None:
                 self.log("propagating prior to predictions")
-                prior_cov = self.predictions.T *\
-                                self.parcov * self.predictions
-                self.__prior_prediction = {n:v for n,v in
-                                          zip(prior_cov.row_names,
-                                              np.diag(prior_cov.x))}
+                self.__prior_prediction = self.propagate(self.parcov)
                 self.log("propagating prior to predictions")
             else:
                 self.__prior_prediction = {}
             return self.__prior_prediction
 
+    def propagate(self, cov, predictions=None, full=False, chunk_size=None,
+                  max_mem_mb=256, num_workers=1):
+        """propagate a parameter covariance matrix to the predictions
+        (predictions^T * cov * predictions).  By default, only the
+        prediction variances are calculated as column-wise dot products,
+        so the off-diagonal prediction covariances are never formed
+
+        Parameters
+        ----------
+        cov : pyemu.Matrix
+            the parameter covariance matrix to propagate (e.g. parcov or
+            Schur.posterior_parameter)
+        predictions : pyemu.Matrix
+            prediction sensitivity vectors (column wise) to use instead of
+            self.predictions.  Can be used to stream large numbers of
+            predictions through in blocks.  Default is None
+        full : bool
+            flag to return the full prediction covariance matrix.  Default
+            is False
+        chunk_size : int
+            number of predictions to process at once.  If None, the
+            chunk size is derived from max_mem_mb.  Default is None
+        max_mem_mb : float
+            approximate memory budget (in megabytes) for the intermediate
+            (npar,chunk_size) cov * predictions block.  If None, all
+            predictions are processed at once.  Default is 256
+        num_workers : int
+            number of threads to use to process the chunks.  Default is 1
+
+        Returns
+        -------
+        dict : dict
+            dictionary of prediction name, variance pairs.  If full is
+            True, a pyemu.Cov of the prediction covariance matrix
+
+        Example
+        -------
+        ``>>>import pyemu``
+
+        ``>>>sc = pyemu.Schur(jco="pest.jcb",forecasts=["fore1","fore2"])``
+
+        ``>>>post_var = sc.propagate(sc.posterior_parameter,chunk_size=1000)``
+
+        """
+        if predictions is None:
+            predictions = self.predictions
+        if predictions is None:
+            raise Exception("LinearAnalysis.propagate(): no predictions are set")
+        names = list(predictions.row_names)
+        if list(cov.row_names) != names or list(cov.col_names) != names:
+            if isinstance(cov, Cov):
+                cov = cov.get(names)
+            else:
+                cov = cov.get(row_names=names, col_names=names)
+        y = predictions.x
+        npar, npred = y.shape
+        if chunk_size is None:
+            if max_mem_mb is None:
+                chunk_size = npred
+            else:
+                chunk_size = int(max_mem_mb * 1.0e6 / (8.0 * max(npar, 1)))
+        chunk_size = max(1, min(int(chunk_size), npred))
+        if cov.isdiagonal:
+            c = cov.x.flatten()[:, np.newaxis]
+        else:
+            c = cov.x
+        if full:
+            result = np.zeros((npred, npred))
+        else:
+            result = np.zeros(npred)
+
+        def _chunk(start):
+            end = min(npred, start + chunk_size)
+            yc = y[:, start:end]
+            if cov.isdiagonal:
+                cy = c * yc
+            else:
+                cy = np.dot(c, yc)
+            if full:
+                result[:, start:end] = np.dot(y.T, cy)
+            else:
+                result[start:end] = np.einsum("ij,ij->j", yc, cy)
+
+        starts = list(range(0, npred, chunk_size))
+        pst_utils._run_threaded(_chunk, starts, num_workers=num_workers,
+                                logger=self.logger if len(starts) > 1 else None,
+                                label="forecast chunks")
+        if full:
+            return Cov(x=result, names=list(predictions.col_names))
+        return {n:v for n,v in zip(predictions.col_names, result)}
+
 
     def apply_karhunen_loeve_scaling(self):
         """apply karhuene-loeve scaling to the jacobian matrix.
@@ -922,6 +1122,8 @@ class LinearAnalysis(object):
                             " prior info not found: {0}".format(missing))
         if self.jco is not None:
             self.__jco.drop(pi_names, axis=0)
+        # keep the equations in array form for get_prior_information_normal()
+        self.__prior_information = self.__pst.prior_arrays
         self.__pst.prior_information = self.pst.null_prior
         self.__pst.control_data.pestmode = "estimation"
         #self.__obscov.drop(pi_names,axis=0)
@@ -929,6 +1131,48 @@ class LinearAnalysis(object):
                                             "obs cov")
 
 
+    @property
+    def prior_information(self):
+        """the prior information equations dropped from the jco and pst
+        attributes by drop_prior_information()
+
+        Returns
+        -------
+        prior_information : pyemu.PriorInformation
+            the equations as a sparse coefficient matrix with right-hand
+            sides, weights and groups.  None if no prior information was
+            dropped
+
+        """
+        return self.__prior_information
+
+    def get_prior_information_normal(self, par_names=None):
+        """get the contribution of the (dropped) prior information
+        equations to the normal matrix (A^T * W^2 * A), built directly from
+        the sparse coefficient matrix of the equations
+
+        Parameters
+        ----------
+        par_names : list
+            the parameter names for the rows and columns.  If None,
+            jco.col_names is used.  Default is None
+
+        Returns
+        -------
+        pyemu.Cov : pyemu.Cov
+            the prior information normal matrix.  All zeros if there is
+            no prior information
+
+        """
+        if par_names is None:
+            par_names = self.jco.col_names
+        prior = self.__prior_information
+        if prior is None or prior.nprior == 0:
+            return Cov(x=np.zeros((len(par_names), len(par_names))),
+                       names=list(par_names))
+        xtqx = prior.get_normal_matrix(par_names)
+        return Cov(x=xtqx.x, names=list(par_names))
+
     def get(self,par_names=None,obs_names=None,astype=None):
         """method to get a new LinearAnalysis class using a
         subset of parameters and/or observations
@@ -983,7 +1227,7 @@ class LinearAnalysis(object):
             new_obscov = None
         # if possible, get a new pst
         if self.pst_arg is not None:
-            new_pst = self.pst.get(par_names=par_names,obs_names=obs_names)
+            new_pst = self.pst.get_view(par_names=par_names,obs_names=obs_names)
         else:
             new_pst = None
         new_extract = None
@@ -1030,10 +1274,17 @@ class LinearAnalysis(object):
         self.__obscov.from_observation_data(self.pst)
 
 
-    def get_par_css_dataframe(self):
+    def get_par_css_dataframe(self, chunk_size=10000):
         """ get a dataframe of composite scaled sensitivities.  Includes both
         PEST-style and Hill-style.
 
+        Parameters
+        ----------
+        chunk_size : int
+            number of jco rows to process at once.  The column norms are
+            accumulated over blocks of rows, so the jco is never copied
+            (it can be memory-mapped).  Default is 10000
+
         Returns
         -------
         css : pandas.DataFrame
@@ -1042,11 +1293,15 @@ class LinearAnalysis(object):
 
         assert self.jco is not None
         assert self.pst is not None
-        jco = self.jco.to_dataframe()
-        weights = self.pst.observation_data.loc[jco.index,"weight"].copy().values
-        jco = (jco.T * weights).T
-
-        dss_sum = jco.apply(np.linalg.norm)
+        jco = self.jco
+        weights = self.pst.observation_data.loc[jco.row_names,"weight"].values
+        # sum of squared weighted sensitivities for each parameter
+        sumsq = np.zeros(jco.shape[1])
+        for start in range(0, jco.shape[0], chunk_size):
+            end = min(jco.shape[0], start + chunk_size)
+            wx = jco.x[start:end, :] * weights[start:end, np.newaxis]
+            sumsq += (wx * wx).sum(axis=0)
+        dss_sum = pd.Series(np.sqrt(sumsq), index=jco.col_names)
         css = (dss_sum / float(self.pst.nnz_obs)).to_frame()
         css.columns = ["pest_css"]
         # log transform stuff
@@ -1055,7 +1310,7 @@ class LinearAnalysis(object):
         css.loc[:,"hill_css"] = (dss_sum * parval1) / (float(self.pst.nnz_obs)**2)
         return css
 
-    def get_cso_dataframe(self):
+    def get_cso_dataframe(self, chunk_size=10000):
         """
         get a dataframe of composite observation sensitivity, as returned by PEST in the
         seo file.
@@ -1063,16 +1318,33 @@ class LinearAnalysis(object):
         Note that this formulation deviates slightly from the PEST documentation in that the
         values are divided by (npar-1) rather than by (npar).
 
-        The equation is cso_j = ((Q^1/2*J*J^T*Q^1/2)^1/2)_jj/(NPAR-1)
+        The equation is cso_j = ((Q^1/2*J*J^T*Q^1/2)^1/2)_jj/(NPAR-1).  Only the
+        diagonal is needed, so it is calculated as the row norms of Q^1/2*J
+        without forming the nobs-by-nobs matrix
+
+        Parameters
+        ----------
+        chunk_size : int
+            number of jco rows to process at once.  Default is 10000
+
         Returns:
         cso : pandas.DataFrame
 
         """
         assert self.jco is not None
         assert self.pst is not None
-        weights = self.pst.observation_data.loc[self.jco.to_dataframe().index,"weight"].copy().values
-        cso = np.diag(np.sqrt((self.qhalfx.x.dot(self.qhalfx.x.T))))/(float(self.pst.npar-1))
-        cso_df = pd.DataFrame.from_dict({'obnme':self.jco.to_dataframe().index,'cso':cso})
-        cso_df.index=cso_df['obnme']
-        cso_df.drop('obnme', axis=1, inplace=True)
+        jco = self.jco
+        if self.obscov.isdiagonal:
+            qhalf = self.obscov.get(jco.row_names).x.flatten() ** -0.5
+            x = jco.x
+        else:
+            qhalf = np.ones(jco.shape[0])
+            x = self.qhalfx.x
+        cso = np.zeros(jco.shape[0])
+        for start in range(0, jco.shape[0], chunk_size):
+            end = min(jco.shape[0], start + chunk_size)
+            qx = x[start:end, :] * qhalf[start:end, np.newaxis]
+            cso[start:end] = np.sqrt((qx * qx).sum(axis=1))
+        cso /= float(self.pst.npar - 1)
+        cso_df = pd.DataFrame({"cso":cso}, index=pd.Index(jco.row_names, name="obnme"))
         return cso_df
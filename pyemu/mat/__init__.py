@@ -2,5 +2,5 @@
 The primary objects are the Matrix() and Cov().  These objects overload most numerical
 operators to autoalign the elements based on row and column names."""
 
-from .mat_handler import Matrix, Cov, Jco, SparseMatrix, concat, save_coo
+from .mat_handler import Matrix, Cov, Jco, SparseMatrix, LowRankCov, NullSpaceProjector, concat, save_coo, save_coo_blocks
 
@@ -47,6 +47,54 @@ def save_coo(x, row_names, col_names,  filename, chunk=None):
     data = np.core.records.fromarrays([x.row, x.col, x.data], dtype=Matrix.coo_rec_dt)
     data.tofile(f)
 
+    _write_coo_names(f, row_names, col_names)
+    f.close()
+
+
+def save_coo_blocks(blocks, shape, row_names, col_names, filename):
+    """write a PEST-compatible (coo format) binary file from blocks of rows
+    of a dense matrix, so that the whole matrix never has to be in memory.
+    The file is the same as the one written by Matrix.to_coo()
+
+    Parameters
+    ----------
+    blocks : iterable
+        (start row, numpy.ndarray) pairs that cover the rows in order
+    shape : tuple
+        (nrow,ncol) of the full matrix
+    row_names : list
+        list of row_names
+    col_names : list
+        list of col_names
+    filename : str
+        filename to save binary file
+
+    """
+    f = open(filename, 'wb')
+    # the number of non-zero entries isn't known until the end, so the
+    # header is written again once the blocks are done
+    header = np.array((shape[1], shape[0], 0), dtype=Matrix.binary_header_dt)
+    header.tofile(f)
+    nnz = 0
+    for start, x in blocks:
+        row_idxs, col_idxs = np.nonzero(x)
+        data = np.core.records.fromarrays([row_idxs + start, col_idxs,
+                                           x[row_idxs, col_idxs]],
+                                          dtype=Matrix.coo_rec_dt)
+        data.tofile(f)
+        nnz += row_idxs.shape[0]
+
+    _write_coo_names(f, row_names, col_names)
+    f.seek(0)
+    header = np.array((shape[1], shape[0], nnz), dtype=Matrix.binary_header_dt)
+    header.tofile(f)
+    f.close()
+
+
+def _write_coo_names(f, row_names, col_names):
+    """ private function to write the padded col and row names at the end
+    of a coo format binary file
+    """
     for name in col_names:
         if len(name) > Matrix.new_par_length:
             name = name[:Matrix.new_par_length - 1]
@@ -61,7 +109,6 @@ def save_coo(x, row_names, col_names,  filename, chunk=None):
             for i in range(len(name), Matrix.new_obs_length):
                 name = name + ' '
         f.write(name.encode())
-    f.close()
 
 
 def concat(mats):
@@ -1171,11 +1218,16 @@ class Matrix(object):
 
     @staticmethod
     def find_rowcol_indices(names,row_names,col_names,axis=None):
+        # only build the lookups for the axis that is needed
+        if axis == 0:
+            col_names = []
+        elif axis == 1:
+            row_names = []
         self_row_idxs = {row_names[i]: i for i in range(len(row_names))}
         self_col_idxs = {col_names[i]: i for i in range(len(col_names))}
 
-        scol = set(col_names)
-        srow = set(row_names)
+        scol = self_col_idxs
+        srow = self_row_idxs
         row_idxs = []
         col_idxs = []
         for name in names:
@@ -1365,17 +1417,25 @@ class Matrix(object):
         if self.isdiagonal:
             extract = np.diag(self.__x[:, 0])
         else:
-            extract = self.__x.copy()
+            extract = self.__x
+        # index both axes in one step rather than copying the full matrix
+        row_idxs = slice(None)
+        col_idxs = slice(None)
         if row_names is not None:
             row_idxs = self.indices(row_names, axis=0)
-            extract = np.atleast_2d(extract[row_idxs, :].copy())
+        if col_names is not None:
+            col_idxs = self.indices(col_names, axis=1)
+        if row_names is not None and col_names is not None:
+            extract = extract[np.ix_(row_idxs, col_idxs)]
+        else:
+            extract = extract[row_idxs, col_idxs].copy()
+        extract = np.atleast_2d(extract)
+        if row_names is not None:
             if drop:
                 self.drop(row_names, axis=0)
         else:
             row_names = self.row_names
         if col_names is not None:
-            col_idxs = self.indices(col_names, axis=1)
-            extract = np.atleast_2d(extract[:, col_idxs].copy())
             if drop:
                 self.drop(col_names, axis=1)
         else:
@@ -1411,8 +1471,8 @@ class Matrix(object):
             assert len(names) < self.shape[0], "can't drop all names along axis 0"
 
         idxs = self.indices(names, axis=axis)
-
-
+        # set lookup - names can be long (e.g. many forecast rows)
+        names = set(names)
 
         if self.isdiagonal:
             self.__x = np.delete(self.__x, idxs, 0)
@@ -2926,3 +2986,456 @@ class SparseMatrix(object):
 
 
 
+
+class LowRankCov(object):
+    """a covariance matrix operator stored as a deviation factor.  The implied
+    covariance matrix is delta.T * delta (optionally hadamard-multiplied with a
+    localizer), but the full npar X npar matrix is never formed unless explicitly
+    requested.  Localization is applied lazily, only to the blocks that are used.
+
+    Parameters
+    ----------
+    delta : numpy.ndarray
+        the deviation factor.  Shape is (nreals,npar).  Rows are
+        typically ensemble deviations from the mean scaled by 1/sqrt(nreals-1)
+    names : list
+        the (column) names of delta
+    mean : numpy.ndarray
+        optional mean vector of length npar.  Used by LowRankCov.draw().
+        Default is None (zero mean)
+    localizer : pyemu.Matrix or numpy.ndarray
+        optional localizing matrix to hadamard-multiply with delta.T * delta.
+        If a numpy.ndarray, it must be aligned with names.  Default is None
+
+    Note
+    ----
+    the rank of the implied covariance matrix is at most nreals - 1 (ignoring
+    the localizer), so storage is nreals X npar instead of npar X npar
+
+    """
+    def __init__(self, delta, names, mean=None, localizer=None):
+        delta = np.atleast_2d(np.array(delta, dtype=np.float64))
+        names = [str(n).lower() for n in names]
+        assert delta.shape[1] == len(names), \
+            "LowRankCov error: delta.shape[1] != len(names): {0} vs {1}".\
+            format(delta.shape[1], len(names))
+        self.delta = delta
+        self.names = names
+        if mean is not None:
+            mean = np.array(mean, dtype=np.float64).flatten()
+            assert mean.shape[0] == len(names), \
+                "LowRankCov error: mean vector length != len(names)"
+        self.mean = mean
+        if localizer is not None:
+            if isinstance(localizer, pd.DataFrame):
+                localizer = Matrix.from_dataframe(localizer)
+            if isinstance(localizer, np.ndarray):
+                assert localizer.shape == (len(names), len(names)), \
+                    "LowRankCov error: localizer shape mismatch"
+                localizer = Matrix(x=localizer, row_names=self.names,
+                                   col_names=self.names)
+        self.localizer = localizer
+        self.__name_idx = None
+        self.__loc_idxs = None
+
+    @classmethod
+    def from_ensemble(cls, ensemble, localizer=None):
+        """instantiate from an ensemble (or any realizations-by-names dataframe)
+        using the mean-differencing operation at the core of EnKF
+
+        Parameters
+        ----------
+        ensemble : pandas.DataFrame
+            realizations (rows) by names (columns)
+        localizer : pyemu.Matrix or numpy.ndarray
+            optional localizer
+
+        Returns
+        -------
+        LowRankCov : LowRankCov
+
+        """
+        x = ensemble.values.astype(np.float64)
+        mean = x.mean(axis=0)
+        delta = (x - mean) * (1.0 / np.sqrt(float(x.shape[0] - 1.0)))
+        return cls(delta=delta, names=list(ensemble.columns), mean=mean,
+                   localizer=localizer)
+
+    @property
+    def shape(self):
+        """get the implied, 2D shape of self
+
+        Returns
+        -------
+        tuple : tuple
+            (npar,npar)
+
+        """
+        return (len(self.names), len(self.names))
+
+    @property
+    def row_names(self):
+        return self.names
+
+    @property
+    def col_names(self):
+        return self.names
+
+    @property
+    def nreals(self):
+        """the number of rows in the deviation factor
+
+        Returns
+        -------
+        int : int
+
+        """
+        return self.delta.shape[0]
+
+    def indices(self, names):
+        """get the positions of names in self.names
+
+        Parameters
+        ----------
+        names : list
+            names to find
+
+        Returns
+        -------
+        numpy.ndarray : numpy.ndarray
+
+        """
+        if self.__name_idx is None:
+            self.__name_idx = {n: i for i, n in enumerate(self.names)}
+        if isinstance(names, str):
+            names = [names]
+        try:
+            return np.array([self.__name_idx[str(n).lower()] for n in names],
+                            dtype=np.int64)
+        except KeyError as e:
+            raise Exception("LowRankCov.indices(): name not found: {0}".format(str(e)))
+
+    def _localizer_indices(self):
+        """get the row and col positions of self.names in the localizer"""
+        if self.__loc_idxs is None:
+            lrow = Matrix.find_rowcol_indices(self.names, self.localizer.row_names,
+                                              self.localizer.col_names, axis=0)
+            lcol = Matrix.find_rowcol_indices(self.names, self.localizer.row_names,
+                                              self.localizer.col_names, axis=1)
+            self.__loc_idxs = (lrow, lcol)
+        return self.__loc_idxs
+
+    def _localizer_block(self, iidx, jidx):
+        """get the localizer block for positions iidx,jidx of self.names"""
+        lrow, lcol = self._localizer_indices()
+        lx = self.localizer.as_2d
+        return lx[np.ix_(lrow[iidx], lcol[jidx])]
+
+    def _block(self, iidx, jidx):
+        """form the (localized) covariance block for positions iidx,jidx"""
+        x = np.dot(self.delta[:, iidx].T, self.delta[:, jidx])
+        if self.localizer is not None:
+            x *= self._localizer_block(iidx, jidx)
+        return x
+
+    def get(self, row_names=None, col_names=None):
+        """get a dense block of the implied covariance matrix.  The localizer
+        (if any) is only applied to the requested block
+
+        Parameters
+        ----------
+        row_names : list
+            row names of the block.  If None, all names are used
+        col_names : list
+            column names of the block.  If None, row_names are used
+
+        Returns
+        -------
+        Cov or Matrix : Cov or Matrix
+            a Cov if the block is symmetric, otherwise a Matrix
+
+        Note
+        ----
+        requesting all names forms the full npar X npar matrix - user beware!
+
+        """
+        if row_names is None:
+            row_names = self.names
+        if isinstance(row_names, str):
+            row_names = [row_names]
+        iidx = self.indices(row_names)
+        if col_names is None:
+            return Cov(x=self._block(iidx, iidx),
+                       names=[self.names[i] for i in iidx])
+        if isinstance(col_names, str):
+            col_names = [col_names]
+        jidx = self.indices(col_names)
+        return Matrix(x=self._block(iidx, jidx),
+                      row_names=[self.names[i] for i in iidx],
+                      col_names=[self.names[j] for j in jidx])
+
+    def to_cov(self):
+        """form the full, dense covariance matrix
+
+        Returns
+        -------
+        Cov : Cov
+
+        """
+        return self.get()
+
+    def get_diagonal_vector(self, col_name="diag"):
+        """get the diagonal of the implied covariance matrix without forming it
+
+        Parameters
+        ----------
+        col_name : str
+            the name of the column in the returned Matrix
+
+        Returns
+        -------
+        Matrix : Matrix
+            shape is (npar,1)
+
+        """
+        d = (self.delta ** 2).sum(axis=0)
+        if self.localizer is not None:
+            lrow, lcol = self._localizer_indices()
+            d = d * self.localizer.as_2d[lrow, lcol]
+        return Matrix(x=np.atleast_2d(d).transpose(), row_names=self.names,
+                      col_names=[col_name])
+
+    def _as_aligned_array(self, other):
+        """align a vector/Matrix/DataFrame/Series with self.names"""
+        if isinstance(other, pd.Series):
+            other = other.loc[self.names].values
+        elif isinstance(other, pd.DataFrame):
+            other = other.loc[self.names, :].values
+        elif isinstance(other, Matrix):
+            other = other.get(row_names=self.names).as_2d
+        other = np.array(other, dtype=np.float64)
+        assert other.shape[0] == len(self.names), \
+            "LowRankCov error: vector length {0} != {1}".\
+            format(other.shape[0], len(self.names))
+        return other
+
+    def matvec(self, other, chunk=None, max_mem_mb=256):
+        """multiply the implied covariance matrix with a vector (or a
+        matrix of column vectors) without forming the covariance matrix
+
+        Parameters
+        ----------
+        other : numpy.ndarray, pandas.Series, pandas.DataFrame or Matrix
+            the vector(s) to multiply.  First dimension must be npar.  Matrix,
+            Series and DataFrame instances are aligned by name
+        chunk : int
+            number of rows of the localized covariance matrix to form at
+            one time.  Only used if a localizer was passed.  If None, the
+            chunk is derived from max_mem_mb.  Default is None
+        max_mem_mb : float
+            approximate memory budget (in megabytes) for each (chunk,npar)
+            block of the localized covariance matrix.  Only used if chunk
+            is None.  Default is 256
+
+        Returns
+        -------
+        numpy.ndarray : numpy.ndarray
+            the product with the same shape as other
+
+        """
+        col_names = None
+        if isinstance(other, Matrix):
+            col_names = other.col_names
+        p = self._as_aligned_array(other)
+        if self.localizer is None:
+            r = np.dot(self.delta.T, np.dot(self.delta, p))
+        else:
+            r = np.zeros_like(p)
+            idx = np.arange(len(self.names))
+            if chunk is None:
+                chunk = max(1, int(max_mem_mb * 1.0e6 / (8.0 * len(self.names))))
+            for s in range(0, len(self.names), chunk):
+                iidx = idx[s:s + chunk]
+                r[iidx] = np.dot(self._block(iidx, idx), p)
+        if col_names is not None:
+            return Matrix(x=np.atleast_2d(r.reshape(r.shape[0], -1)),
+                          row_names=self.names, col_names=col_names)
+        return r
+
+    def __mul__(self, other):
+        return self.matvec(other)
+
+    def forecast_variance(self, other):
+        """calculate p.T * C * p for each column (forecast sensitivity vector)
+        in other without forming C
+
+        Parameters
+        ----------
+        other : numpy.ndarray, pandas.Series, pandas.DataFrame or Matrix
+            forecast sensitivity vector(s), first dimension is npar
+
+        Returns
+        -------
+        numpy.ndarray or pandas.Series : numpy.ndarray or pandas.Series
+            the variance of each forecast.  A pandas.Series indexed
+            by forecast names is returned if other is a Matrix or DataFrame
+
+        """
+        col_names = None
+        if isinstance(other, Matrix):
+            col_names = other.col_names
+        elif isinstance(other, pd.DataFrame):
+            col_names = list(other.columns)
+        p = self._as_aligned_array(other)
+        if self.localizer is None:
+            dp = np.dot(self.delta, p)
+            var = (dp ** 2).sum(axis=0)
+        else:
+            var = (p * self.matvec(p)).sum(axis=0)
+        if col_names is not None:
+            return pd.Series(data=np.atleast_1d(var), index=col_names)
+        return var
+
+    def draw(self, num_reals=1, mean=None):
+        """draw realizations directly from the deviation factor.  The draws
+        have covariance delta.T * delta
+
+        Parameters
+        ----------
+        num_reals : int
+            number of realizations to draw
+        mean : numpy.ndarray
+            mean vector.  If None, self.mean is used.  If self.mean is None,
+            zero mean is used
+
+        Returns
+        -------
+        numpy.ndarray : numpy.ndarray
+            shape is (num_reals,npar)
+
+        Note
+        ----
+        the localizer is not used in the draws
+
+        """
+        if mean is None:
+            mean = self.mean
+        draws = np.dot(np.random.standard_normal((num_reals, self.nreals)),
+                       self.delta)
+        if mean is not None:
+            draws += np.array(mean, dtype=np.float64).flatten()
+        return draws
+
+
+class NullSpaceProjector(object):
+    """an implicit null-space projection operator (I - V1 * V1^T) stored as
+    the truncated solution-space basis V1.  The npar X npar projection
+    matrix (V2 * V2^T) is never formed unless explicitly requested.
+
+    Parameters
+    ----------
+    solution_basis : pyemu.Matrix
+        the npar X nsing solution-space basis (V1).  The columns must be
+        orthonormal
+
+    Note
+    ----
+    storage is npar X nsing instead of npar X npar
+
+    """
+    def __init__(self, solution_basis):
+        assert isinstance(solution_basis, Matrix), \
+            "NullSpaceProjector error: solution_basis must be a Matrix"
+        self.solution_basis = solution_basis
+
+    @property
+    def shape(self):
+        """get the implied, 2D shape of self
+
+        Returns
+        -------
+        tuple : tuple
+            (npar,npar)
+
+        """
+        npar = self.solution_basis.shape[0]
+        return (npar, npar)
+
+    @property
+    def row_names(self):
+        return self.solution_basis.row_names
+
+    @property
+    def col_names(self):
+        return self.solution_basis.row_names
+
+    @property
+    def nsing(self):
+        """the number of solution-space dimensions
+
+        Returns
+        -------
+        int : int
+
+        """
+        return self.solution_basis.shape[1]
+
+    def get(self, names):
+        """get a new NullSpaceProjector for a subset (or reordering) of the
+        parameters.  The rows of V1 are extracted, so this is the
+        corresponding block of (I - V1 * V1^T)
+
+        Parameters
+        ----------
+        names : list
+            parameter names
+
+        Returns
+        -------
+        NullSpaceProjector : NullSpaceProjector
+
+        """
+        return NullSpaceProjector(self.solution_basis.get(row_names=names))
+
+    def project(self, x, chunk=1000):
+        """apply the projection x - (x * V1) * V1^T to the rows of x
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            array of shape (nreals,npar), aligned with self.row_names.
+            A 1-D array is treated as a single row
+        chunk : int
+            number of rows of x to project at once.  Default is 1000
+
+        Returns
+        -------
+        numpy.ndarray : numpy.ndarray
+            the projected rows
+
+        """
+        v1 = self.solution_basis.x
+        x = np.array(x, dtype=np.float64)
+        is_vec = x.ndim == 1
+        x = np.atleast_2d(x)
+        assert x.shape[1] == v1.shape[0], \
+            "NullSpaceProjector.project() error: x.shape[1] != npar: {0} vs {1}".\
+            format(x.shape[1], v1.shape[0])
+        for start in range(0, x.shape[0], chunk):
+            end = min(x.shape[0], start + chunk)
+            x[start:end] -= np.dot(np.dot(x[start:end], v1), v1.T)
+        if is_vec:
+            return x[0]
+        return x
+
+    def to_matrix(self):
+        """form the full, dense npar X npar projection matrix
+
+        Returns
+        -------
+        Matrix : Matrix
+
+        """
+        v1 = self.solution_basis.x
+        x = np.eye(v1.shape[0]) - np.dot(v1, v1.T)
+        return Matrix(x=x, row_names=self.row_names, col_names=self.row_names)
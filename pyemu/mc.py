@@ -7,8 +7,9 @@ import os
 import numpy as np
 from pyemu.la import LinearAnalysis
 from pyemu.en import ObservationEnsemble, ParameterEnsemble
-from pyemu.mat import Cov
+from pyemu.mat import Cov, Matrix, NullSpaceProjector
 from pyemu.utils.os_utils import run_sweep
+from scipy.sparse.linalg import svds
 #from pyemu.utils.helpers import zero_order_tikhonov
 
 class MonteCarlo(LinearAnalysis):
@@ -46,6 +47,7 @@ class MonteCarlo(LinearAnalysis):
 
     """
     def __init__(self,**kwargs):
+        self.__qhalfx_svd = None
         super(MonteCarlo,self).__init__(**kwargs)
         assert self.pst is not None, \
             "monte carlo requires a pest control file"
@@ -63,6 +65,71 @@ class MonteCarlo(LinearAnalysis):
         """
         return self.parensemble.shape[0]
 
+    def __qhalfx_factors(self,nsing=None,epsilon=None):
+        """private method to get the leading singular values and right
+        singular vectors of qhalfx from a rank-limited SVD.  The squared
+        singular values and the right singular vectors are the leading part
+        of the spectrum of XTQX, so the npar X npar XTQX is never formed.
+        Components are added until there are at least nsing of them and,
+        if epsilon is passed, until the singular value ratio drops below
+        epsilon.  The factors are stored in the LinearAnalysis cache_dir
+        (if set)
+
+        Parameters
+        ----------
+        nsing : int
+            the minimum number of components needed
+        epsilon : float
+            singular value ratio that the components must reach
+
+        Returns
+        -------
+        s : numpy.ndarray
+            the leading singular values of XTQX
+        vt : numpy.ndarray
+            the leading right singular vectors of qhalfx (rows)
+
+        """
+        entry = None
+        if self.__qhalfx_svd is None:
+            entry = self._cache_entry("qhalfx_svd",[self.jco,self.obscov])
+            self.__qhalfx_svd = self._read_cache(entry)
+
+        def _resolved(state):
+            if state is None:
+                return False
+            if state["complete"]:
+                return True
+            if nsing is not None and state["s"].shape[0] < nsing:
+                return False
+            s = state["s"]
+            if epsilon is not None and s[-1] / s[0] >= epsilon:
+                return False
+            return True
+
+        if not _resolved(self.__qhalfx_svd):
+            x = self.qhalfx.x
+            nmax = min(x.shape)
+            k = 0 if self.__qhalfx_svd is None else self.__qhalfx_svd["s"].shape[0]
+            while not _resolved(self.__qhalfx_svd):
+                k = max(nsing or 0, 2 * k, 50)
+                self.log("rank-{0} svd of qhalfx".format(min(k,nmax)))
+                if 2 * k >= nmax:
+                    # most of the spectrum is needed - the thin svd is cheaper
+                    u,s,vt = np.linalg.svd(x,full_matrices=False)
+                    complete = True
+                else:
+                    u,s,vt = svds(x,k=k,v0=np.ones(nmax) / np.sqrt(nmax))
+                    order = np.argsort(s)[::-1]
+                    s,vt = s[order],vt[order,:]
+                    complete = False
+                self.log("rank-{0} svd of qhalfx".format(min(k,nmax)))
+                self.__qhalfx_svd = {"s":s ** 2,"vt":vt,"complete":complete}
+            if entry is None:
+                entry = self._cache_entry("qhalfx_svd",[self.jco,self.obscov])
+            self._write_cache(entry,self.__qhalfx_svd)
+        return self.__qhalfx_svd["s"],self.__qhalfx_svd["vt"]
+
     def get_nsing(self,epsilon=1.0e-4):
         """ get the number of solution space dimensions given
         a ratio between the largest and smallest singular values
@@ -80,11 +147,14 @@ class MonteCarlo(LinearAnalysis):
         Note
         -----
             If nsing == nadj_par, then None is returned
+
+            the singular values are from a rank-limited SVD of qhalfx
         
         """
-        mx = self.xtqx.shape[0]
-        nsing = mx - np.searchsorted(
-                np.sort((self.xtqx.s.x / self.xtqx.s.x.max())[:,0]),epsilon)
+        mx = self.jco.shape[1]
+        s = self.__qhalfx_factors(epsilon=epsilon)[0]
+        # the rest of the spectrum of XTQX is below epsilon
+        nsing = int((s / s.max() >= epsilon).sum())
         if nsing == mx:
             self.logger.warn("optimal nsing=npar")
             nsing = None
@@ -114,12 +184,76 @@ class MonteCarlo(LinearAnalysis):
         self.log("forming null space projection matrix with " +\
                  "{0} of {1} singular components".format(nsing,self.jco.shape[1]))
 
-        v2_proj = (self.xtqx.v[:,nsing:] * self.xtqx.v[:,nsing:].T)
+        # V2V2^T = I - V1V1^T, from the same factors as get_solution_basis()
+        v1 = self.get_solution_basis(nsing)
+        v2_proj = Matrix(x=np.eye(v1.shape[0]) - np.dot(v1.x,v1.x.T),
+                         row_names=v1.row_names,col_names=v1.row_names)
         self.log("forming null space projection matrix with " +\
                  "{0} of {1} singular components".format(nsing,self.jco.shape[1]))
 
         return v2_proj
 
+    def get_solution_basis(self,nsing=None):
+        """ get the truncated solution-space basis of XTQX.  This
+        is the compact alternative to the null-space projection matrix
+
+        Parameters
+        ----------
+        nsing: int
+            optional number of singular components to use
+            If None, then nsing is determined from
+            call to MonteCarlo.get_nsing()
+
+        Returns
+        -------
+        v1 : pyemu.Matrix
+            the npar X nsing solution-space basis (V1)
+
+        """
+        if nsing is None:
+            nsing = self.get_nsing()
+        if nsing is None:
+            raise Exception("nsing is None")
+        vt = self.__qhalfx_factors(nsing=nsing)[1]
+        if nsing > vt.shape[0]:
+            raise Exception("MonteCarlo.get_solution_basis() error: nsing ({0}) > ".format(nsing) +
+                            "number of singular components ({0})".format(vt.shape[0]))
+        col_names = ["right_sing_vec_" + str(i + 1) for i in range(nsing)]
+        return Matrix(x=vt[:nsing,:].T.copy(),row_names=self.jco.col_names,
+                      col_names=col_names)
+
+    def get_null_projector(self,nsing=None):
+        """ get an implicit null-space projection operator (I - V1V1^T) built
+        from the truncated solution-space basis.  This is the compact
+        alternative to get_null_proj()
+
+        Parameters
+        ----------
+        nsing: int
+            optional number of singular components to use
+            If None, then nsing is determined from
+            call to MonteCarlo.get_nsing()
+
+        Returns
+        -------
+        projector : pyemu.NullSpaceProjector
+
+        Example
+        -------
+        ``>>>import pyemu``
+
+        ``>>>mc = pyemu.MonteCarlo(jco="pest.jcb")``
+
+        ``>>>mc.draw(1000)``
+
+        ``>>>mc.project_parensemble(projector=mc.get_null_projector(100))``
+
+        """
+        self.log("forming null space projector")
+        projector = NullSpaceProjector(self.get_solution_basis(nsing))
+        self.log("forming null space projector")
+        return projector
+
     def draw(self, num_reals=1, par_file = None, obs=False,
              enforce_bounds=None, cov=None, how="gaussian"):
         """draw stochastic realizations of parameters and
@@ -197,7 +331,8 @@ class MonteCarlo(LinearAnalysis):
 
 
     def project_parensemble(self,par_file=None,nsing=None,
-                            inplace=True,enforce_bounds='reset'):
+                            inplace=True,enforce_bounds='reset',
+                            solution_basis=False,projector=None):
         """ perform the null-space projection operations for null-space monte carlo
 
         Parameters
@@ -212,6 +347,13 @@ class MonteCarlo(LinearAnalysis):
         enforce_bounds: str
             how to enforce parameter bounds.  can be None, 'reset', or 'drop'.
             Default is None
+        solution_basis : bool
+            flag to project with (I - V1V1^T) using the truncated
+            solution-space basis rather than forming the npar X npar
+            null-space projection matrix.  Default is False
+        projector : pyemu.NullSpaceProjector
+            an existing null-space projector (see get_null_projector()).  If
+            passed, nsing and solution_basis are ignored.  Default is None
 
         Returns
         -------
@@ -243,7 +385,14 @@ class MonteCarlo(LinearAnalysis):
 
         # project the ensemble
         self.log("projecting parameter ensemble")
-        en = self.parensemble.project(self.get_null_proj(nsing),inplace=inplace,log=self.log)
+        if projector is None and solution_basis:
+            projector = self.get_null_projector(nsing)
+        if projector is not None:
+            en = self.parensemble.project(projector,inplace=inplace,
+                                          log=self.log,enforce_bounds=enforce_bounds)
+        else:
+            en = self.parensemble.project(self.get_null_proj(nsing),inplace=inplace,
+                                          log=self.log,enforce_bounds=enforce_bounds)
         self.log("projecting parameter ensemble")
         return en
 
@@ -297,23 +446,13 @@ class MonteCarlo(LinearAnalysis):
         else:
             par_en = self.parensemble
 
-        for i in range(self.num_reals):
-            pst_name = prefix + "{0:d}.pst".format(i)
-            self.log("writing realized pest control file " + pst_name)
-            pst.parameter_data.loc[par_en.columns,"parval1"] = par_en.iloc[i, :].T
-
-            # reset the regularization
-            #if pst.control_data.pestmode == "regularization":
-                #pst.zero_order_tikhonov(parbounds=True)
-                #zero_order_tikhonov(pst,parbounds=True)
-            # add the obs noise realization if needed
-            if self.obsensemble.shape[0] == self.num_reals:
-                pst.observation_data.loc[self.obsensemble.columns,"obsval"] = \
-                    self.obsensemble.iloc[i, :].T
-
-            # write
-            pst.write(pst_name)
-            self.log("writing realized pest control file " + pst_name)
+        pst_names = [prefix + "{0:d}.pst".format(i) for i in range(self.num_reals)]
+        # add the obs noise realization if needed
+        obsval = None
+        if self.obsensemble.shape[0] == self.num_reals:
+            obsval = self.obsensemble
+        # the invariant sections are formatted once and reused for every file
+        pst.write_realizations(pst_names,parval1=par_en,obsval=obsval)
         self.log("writing realized pest control files")
 
     def run(self,slave_dir,num_slaves=10):
@@ -129,12 +129,7 @@ class Phi(object):
         obs_diff = self.get_residual_obs_matrix(obsensemble)
 
         q = np.diagonal(self.em.obscov_inv_sqrt.get(row_names=obs_diff.col_names,col_names=obs_diff.col_names).x)
-        phi_vec = []
-        for i in range(obs_diff.shape[0]):
-            o = obs_diff.x[i,:]
-            phi_vec.append(((obs_diff.x[i,:] * q)**2).sum())
-
-        return np.array(phi_vec)
+        return ((obs_diff.x * q)**2).sum(axis=1)
 
 
     def _calc_regul_phi(self,parensemble):
@@ -4,5 +4,6 @@ all sections of the control file.  The primary object is the Pst...start there.
 """
 
 from .pst_controldata import ControlData
-from .pst_handler import Pst
+from .pst_handler import Pst, PstView
+from .pst_prior import PriorInformation
 from . import pst_utils
\ No newline at end of file
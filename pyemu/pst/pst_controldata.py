@@ -348,7 +348,9 @@ class ControlData(object):
 
     def copy(self):
         cd = ControlData()
-        cd._df = self._df
+        cd._df = self._df.copy()
+        super(ControlData, cd).__setattr__("keyword_accessed",
+                                           list(self.keyword_accessed))
         return cd
 
 
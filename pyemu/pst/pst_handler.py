@@ -6,7 +6,9 @@ from __future__ import print_function, division
 import os
 import re
 import copy
+import zlib
 import warnings
+from io import StringIO
 import numpy as np
 import pandas as pd
 pd.options.display.max_colwidth = 100
@@ -14,9 +16,13 @@ import pyemu
 from ..pyemu_warnings import PyemuWarning
 from pyemu.pst.pst_controldata import ControlData, SvdData, RegData
 from pyemu.pst import pst_utils
+from pyemu.pst.pst_prior import PriorInformation
 from pyemu.plot import plot_utils
 #from pyemu.utils.os_utils import run
 
+# bump when the layout of the cached Pst.__dict__ changes
+_pst_cache_key = ("pyemu control file", 1)
+
 class Pst(object):
     """basic class for handling pest control files to support linear analysis
     as well as replicate some of the functionality of the pest utilities
@@ -30,6 +36,12 @@ class Pst(object):
     resfile : str
         corresponding residual file.  If None, a residual file
         with the control file base name is sought.  Default is None
+    cache : bool or str
+        flag to use an on-disk cache of the parsed control file.  If a str,
+        it is used as the cache file name, otherwise filename + ".cache"
+        is used.  The cache is keyed on the path, size and modification
+        time of filename.  If True, the residual file is also cached when
+        it is loaded (see pst_utils.read_resfile()).  Default is False
 
     Returns
     -------
@@ -37,7 +49,7 @@ class Pst(object):
         a control file object
 
     """
-    def __init__(self, filename, load=True, resfile=None):
+    def __init__(self, filename, load=True, resfile=None, cache=False):
 
         self.parameter_data = None
         """pandas.DataFrame:  parameter data loaded from pst control file"""
@@ -49,6 +61,7 @@ class Pst(object):
         self.filename = filename
         self.resfile = resfile
         self.__res = None
+        self._res_cache = bool(cache)
         self.__pi_count = 0
         self.with_comments = False
         self.comments = {}
@@ -68,13 +81,134 @@ class Pst(object):
             assert os.path.exists(filename),\
                 "pst file not found:{0}".format(filename)
 
-            self.load(filename)
+            self.load(filename,cache=cache)
 
     def __setattr__(self, key, value):
         if key == "model_command":
             if isinstance(value, str):
                 value = [value]
+        if key == "prior_information":
+            self.__dict__.pop("_prior_arrays",None)
         super(Pst,self).__setattr__(key,value)
+        if key in ["parameter_data","observation_data","prior_information"]:
+            self._bump_data_version()
+
+    def __getattr__(self, key):
+        # only called if key is not found the normal way, so this is where
+        # prior information set with set_prior_information() is rendered
+        if key == "prior_information" and "_prior_arrays" in self.__dict__:
+            self.prior_information = self.__dict__["_prior_arrays"].to_dataframe()
+            return self.__dict__["prior_information"]
+        raise AttributeError("'{0}' object has no attribute '{1}'".\
+                             format(self.__class__.__name__,key))
+
+    def _bump_data_version(self):
+        """ private method to invalidate the memoized derived properties
+        (names, groups, counts).  Called when one of the data frames is
+        set and by Pst._set_values()
+
+        """
+        self.__dict__["_data_version"] = self.__dict__.get("_data_version",0) + 1
+
+    def _set_values(self,attr,index,col,values):
+        """ private method to set values in one of the data frames (or the
+        pending prior information arrays) in place and invalidate the
+        memoized derived properties.  This is how the Pst methods and the
+        analysis and helper modules change weights, transforms and groups
+
+        Parameters
+        ----------
+        attr : str
+            "parameter_data", "observation_data", "prior_information" or
+            "prior_arrays"
+        index : list-like or slice
+            the rows to set (a boolean or integer array for "prior_arrays")
+        col : str or slice
+            the column to set (an attribute name for "prior_arrays")
+        values : object
+            the values to set
+
+        """
+        if attr == "prior_arrays":
+            # a new array - the arrays may be shared with another Pst
+            prior = self.prior_arrays
+            arr = getattr(prior,col).copy()
+            arr[index] = values
+            setattr(prior,col,arr)
+        else:
+            self.__getattribute__(attr).loc[index,col] = values
+        self._bump_data_version()
+
+    @staticmethod
+    def _fingerprint(df,cols):
+        """ private method to get a cheap content fingerprint of the
+        columns of df that a memoized property depends on: a crc32 of the
+        raw bytes of numeric columns and the (cached) hashes of the
+        entries of object columns.  The name columns are skipped - they
+        are the most expensive to hash and are not edited in place by
+        pyemu.  Returns None if a column can't be fingerprinted, in which
+        case the property is always recalculated
+
+        """
+        fp = [df.shape[0]]
+        try:
+            for col in cols:
+                if col in ["parnme","obsnme","pilbl"]:
+                    continue
+                if col not in df.columns:
+                    fp.append(None)
+                    continue
+                vals = np.asarray(df[col])
+                if vals.dtype == object:
+                    fp.append(hash(tuple(vals)))
+                else:
+                    fp.append(zlib.crc32(np.ascontiguousarray(vals)))
+        except TypeError:
+            return None
+        return tuple(fp)
+
+    def _memoize(self,name,df,cols,func):
+        """ private method to memoize a derived property of one of
+        the data frames.
+
+        The memo is keyed on the data version counter, the identity of df
+        and a content fingerprint of cols (see Pst._fingerprint()).  The
+        version counter is bumped when a data frame is set (e.g.
+        Pst.observation_data = df), by Pst.set_prior_information() and by
+        Pst._set_values(), which all of the pyemu methods that change
+        weights, transforms or groups go through.  The fingerprint catches
+        any other in-place edit of the weight, transform, group and other
+        value columns: .loc/.iloc/.at, chained assignment and writes to the
+        underlying .values.  In-place edits of the name columns (parnme,
+        obsnme, pilbl) are not detected - set the data frame again (e.g.
+        Pst.observation_data = obs) after renaming in place
+
+        Parameters
+        ----------
+        name : str
+            name of the derived property
+        df : pandas.DataFrame
+            the dataframe the property is derived from
+        cols : list
+            the columns of df the property depends on
+        func : callable
+            function of df that calculates the property
+
+        Returns
+        -------
+        object : object
+            the (possibly memoized) property value
+
+        """
+        key = (self.__dict__.get("_data_version",0),id(df))
+        fp = Pst._fingerprint(df,cols)
+        memo = self.__dict__.setdefault("_derived_memo",{})
+        if fp is not None and name in memo and memo[name][0] == key \
+                and memo[name][2] == fp:
+            return memo[name][1]
+        val = func(df)
+        memo[name] = (key,val,fp)
+        return val
 
 
     @classmethod
@@ -91,10 +225,7 @@ class Pst(object):
             sum of squared residuals
 
         """
-        sum = 0.0
-        for grp, contrib in self.phi_components.items():
-            sum += contrib
-        return sum
+        return float(self.get_phi_components().sum())
 
     @property
     def phi_components(self):
@@ -107,50 +238,93 @@ class Pst(object):
 
         Raises
         ------
-        Assertion error if Pst.observation_data groups don't match
-        Pst.res groups
+        Exception if Pst.res is missing residuals for any observations
 
         """
+        return self.get_phi_components().to_dict()
 
-        # calculate phi components for each obs group
-        components = {}
-        ogroups = self.observation_data.groupby("obgnme").groups
-        rgroups = self.res.groupby("group").groups
-        self.res.index = self.res.name
-        for og,onames in ogroups.items():
-            #assert og in rgroups.keys(),"Pst.phi_componentw obs group " +\
-            #    "not found: " + str(og)
-            #og_res_df = self.res.ix[rgroups[og]]
-            og_res_df = self.res.loc[onames,:].dropna()
-            #og_res_df.index = og_res_df.name
-            og_df = self.observation_data.ix[ogroups[og]]
-            og_df.index = og_df.obsnme
-            #og_res_df = og_res_df.loc[og_df.index,:]
-            assert og_df.shape[0] == og_res_df.shape[0],\
-            " Pst.phi_components error: group residual dataframe row length" +\
-            "doesn't match observation data group dataframe row length" + \
-                str(og_df.shape) + " vs. " + str(og_res_df.shape)
-            components[og] = np.sum((og_res_df["residual"] *
-                                     og_df["weight"]) ** 2)
+    def _phi_codes(self):
+        """ private method to get the names, integer group codes, group names
+        and weights used in the phi calculations.  Prior information is
+        included unless the control file is in regularization mode.  The
+        observation codes are memoized
+
+        """
+        obs = self.observation_data
+        pilbl,piweight,piobgnme = self._prior_columns()
         if not self.control_data.pestmode.startswith("reg") and \
-            self.prior_information.shape[0] > 0:
-            ogroups = self.prior_information.groupby("obgnme").groups
-            for og in ogroups.keys():
-                assert og in rgroups.keys(),"Pst.adjust_weights_res() obs group " +\
-                    "not found: " + str(og)
-                og_res_df = self.res.ix[rgroups[og]]
-                og_res_df.index = og_res_df.name
-                og_df = self.prior_information.ix[ogroups[og]]
-                og_df.index = og_df.pilbl
-                og_res_df = og_res_df.loc[og_df.index,:]
-                assert og_df.shape[0] == og_res_df.shape[0],\
-                " Pst.phi_components error: group residual dataframe row length" +\
-                "doesn't match observation data group dataframe row length" + \
-                    str(og_df.shape) + " vs. " + str(og_res_df.shape)
-                components[og] = np.sum((og_res_df["residual"] *
-                                         og_df["weight"]) ** 2)
-
-        return components
+                pilbl.shape[0] > 0:
+            names = np.concatenate([obs.obsnme.values, pilbl])
+            codes,groups = pd.factorize(np.concatenate([obs.obgnme.values,
+                                                        piobgnme]),
+                                        sort=True)
+            weights = np.concatenate([obs.weight.values, piweight])
+            return pd.Index(names),codes,list(groups),weights.astype(float)
+        index,codes,groups = self._memoize("_phi_codes",obs,["obsnme","obgnme"],
+                                           lambda obs: (pd.Index(obs.obsnme.values),) +
+                                           tuple(pd.factorize(obs.obgnme.values,sort=True)))
+        return index,codes,list(groups),obs.weight.values.astype(float)
+
+    def get_phi_components(self, residuals=None):
+        """ vectorized calculation of the phi contributions by group for
+        one residual vector or many (e.g. the residuals of an
+        observation ensemble) in one call
+
+        Parameters
+        ----------
+        residuals : pandas.Series or pandas.DataFrame
+            residuals indexed (Series) or with columns (DataFrame) of
+            observation (and/or prior information) names.  A DataFrame
+            is treated as one residual vector per row.  If None, the
+            residual column of Pst.res is used.  Default is None
+
+        Returns
+        -------
+        phi : pandas.Series or pandas.DataFrame
+            the phi contribution of each group. A Series indexed by
+            group for a single residual vector, or a DataFrame of
+            realizations (rows) by groups (columns).  Per realization
+            totals are phi.sum(axis=1)
+
+        Note
+        ----
+        the current weights are used, so weights can be changed
+        and phi re-evaluated without re-indexing anything
+
+        """
+        index,codes,groups,weights = self._phi_codes()
+        if residuals is None:
+            res = self.res
+            res.index = res.name
+            resid = pd.Series(res.residual.values,index=res.name.values)
+            resid = resid.loc[~resid.index.duplicated()].reindex(index)
+            if resid.isnull().any():
+                missing = resid.loc[resid.isnull()].index
+                raise Exception("Pst.get_phi_components() error: residuals " +
+                                "missing (or nan) for {0} names: {1}".\
+                                format(len(missing),','.join(missing[:10])))
+            phi = pst_utils.calc_phi_components(resid.values,weights,
+                                                codes,len(groups))
+            return pd.Series(phi[0],index=groups)
+
+        if isinstance(residuals,pd.Series):
+            names,vals = residuals.index,residuals.values
+        elif isinstance(residuals,pd.DataFrame):
+            names,vals = residuals.columns,residuals.values
+        else:
+            raise Exception("Pst.get_phi_components() error: residuals must " +
+                            "be a pandas.Series or pandas.DataFrame, not " +
+                            str(type(residuals)))
+        idx = index.get_indexer([str(n).lower() for n in names])
+        if np.any(idx < 0):
+            missing = [str(n) for n,i in zip(names,idx) if i < 0]
+            raise Exception("Pst.get_phi_components() error: names not found: " +
+                            ','.join(missing[:10]))
+        phi = pst_utils.calc_phi_components(vals.astype(float),weights[idx],
+                                            codes[idx],len(groups))
+        if isinstance(residuals,pd.Series):
+            return pd.Series(phi[0],index=groups)
+        return pd.DataFrame(phi,index=residuals.index,columns=groups)
 
     @property
     def phi_components_normalized(self):
@@ -168,9 +342,8 @@ class Pst(object):
         self.res groups
 
         """
-        # use a dictionary comprehension to go through and normalize each component of phi to the total
-        phi_components_normalized = {i: self.phi_components[i]/self.phi for i in self.phi_components}
-        return phi_components_normalized
+        phi_comps = self.get_phi_components()
+        return (phi_comps / phi_comps.sum()).to_dict()
 
     def set_res(self,res):
         """ reset the private Pst.res attribute
@@ -182,7 +355,7 @@ class Pst(object):
 
         """
         if isinstance(res,str):
-            res = pst_utils.read_resfile(res)
+            res = pst_utils.read_resfile(res,cache=self._res_cache)
         self.__res = res
 
     @property
@@ -223,9 +396,8 @@ class Pst(object):
                                                         " or case.obs.csv")
 
 
-            res = pst_utils.read_resfile(self.resfile)
-            missing_bool = self.observation_data.obsnme.apply\
-                (lambda x: x not in res.name)
+            res = pst_utils.read_resfile(self.resfile,cache=self._res_cache)
+            missing_bool = ~self.observation_data.obsnme.isin(res.index)
             missing = self.observation_data.obsnme[missing_bool]
             if missing.shape[0] > 0:
                 raise Exception("Pst.res: the following observations " +
@@ -244,9 +416,61 @@ class Pst(object):
             the number of prior info equations
 
         """
-        self.control_data.nprior = self.prior_information.shape[0]
+        self.control_data.nprior = self._prior_columns()[0].shape[0]
         return self.control_data.nprior
 
+    @property
+    def prior_arrays(self):
+        """ the prior information equations as a
+        pyemu.pst.pst_prior.PriorInformation instance, that is, as a sparse
+        coefficient matrix with right-hand sides, weights and groups.  The
+        parsed equations are memoized
+
+        Returns
+        -------
+        prior_arrays : pyemu.PriorInformation
+
+        """
+        if "_prior_arrays" in self.__dict__:
+            return self.__dict__["_prior_arrays"]
+        return self._memoize("prior_arrays",self.prior_information,
+                             ["pilbl","equation","weight","obgnme"],
+                             PriorInformation.from_dataframe)
+
+    def set_prior_information(self, prior, reset=True):
+        """ set the prior information equations from a
+        PriorInformation instance.  The equation strings are
+        not rendered until Pst.prior_information is accessed (e.g.
+        when the control file is written)
+
+        Parameters
+        ----------
+        prior : pyemu.PriorInformation
+            the prior information equations
+        reset : bool
+            flag to replace the existing prior information.  If False,
+            prior is appended to the existing equations.  Default is True
+
+        """
+        if not reset and self.nprior > 0:
+            prior = PriorInformation.concat([self.prior_arrays,prior])
+        self.__dict__.pop("prior_information",None)
+        self.__dict__["_prior_arrays"] = prior
+        self._bump_data_version()
+
+    def _prior_columns(self):
+        """ private method to get the pilbl, weight and obgnme values of the
+        prior information without rendering pending equations
+
+        """
+        prior = self.__dict__.get("_prior_arrays",None)
+        if prior is not None:
+            return prior.pilbl,prior.weight,prior.obgnme
+        pi = self.prior_information
+        if pi.shape[0] == 0:
+            return np.array([],dtype=object),np.array([]),np.array([],dtype=object)
+        return pi.pilbl.values,pi.weight.values,pi.obgnme.values
+
     @property
     def nnz_obs(self):
         """ get the number of non-zero weighted observations
@@ -257,11 +481,8 @@ class Pst(object):
             the number of non-zeros weighted observations
 
         """
-        nnz = 0
-        for w in self.observation_data.weight:
-            if w > 0.0:
-                nnz += 1
-        return nnz
+        return self._memoize("nnz_obs",self.observation_data,["weight"],
+                             lambda obs: int((obs.weight.values > 0.0).sum()))
 
 
     @property
@@ -288,12 +509,8 @@ class Pst(object):
             the number of adjustable parameters
 
         """
-        pass
-        np = 0
-        for t in self.parameter_data.partrans:
-            if t not in ["fixed", "tied"]:
-                np += 1
-        return np
+        return self._memoize("npar_adj",self.parameter_data,["partrans"],
+                             lambda par: int((~par.partrans.isin(["fixed","tied"])).sum()))
 
 
     @property
@@ -317,11 +534,12 @@ class Pst(object):
         Returns:
             dictionary
         """
-        pargp = self.par_groups
-        allpars = dict()
-        for cpg in pargp:
-            allpars[cpg] = [i for i in self.parameter_data.loc[self.parameter_data.pargp == cpg, 'parnme']]
-        return allpars
+        def _pars_in_groups(par):
+            groups = par.groupby("pargp").groups
+            return {cpg:list(par.loc[groups[cpg],"parnme"]) for cpg in self.par_groups}
+        allpars = self._memoize("pars_in_groups",self.parameter_data,
+                                ["pargp","parnme"],_pars_in_groups)
+        return {k:list(v) for k,v in allpars.items()}
 
     @property
     def forecast_names(self):
@@ -351,9 +569,10 @@ class Pst(object):
             a list of unique observation groups
 
         """
-        og = list(self.observation_data.groupby("obgnme").groups.keys())
+        og = self._memoize("obs_groups",self.observation_data,["obgnme"],
+                           lambda obs: list(obs.groupby("obgnme").groups.keys()))
         #og = list(map(pst_utils.SFMT, og))
-        return og
+        return list(og)
 
     @property
     def nnz_obs_groups(self):
@@ -367,12 +586,11 @@ class Pst(object):
             least one non-zero weighted observation
 
         """
-        og = []
-        obs = self.observation_data
-        for g in self.obs_groups:
-            if obs.loc[obs.obgnme==g,"weight"].sum() > 0.0:
-                og.append(g)
-        return og
+        def _nnz_obs_groups(obs):
+            gsum = obs.groupby("obgnme").weight.sum()
+            return [g for g in self.obs_groups if gsum[g] > 0.0]
+        return list(self._memoize("nnz_obs_groups",self.observation_data,
+                                  ["obgnme","weight"],_nnz_obs_groups))
 
     @property
     def adj_par_groups(self):
@@ -384,12 +602,12 @@ class Pst(object):
             a list of parameter groups with  at least one adjustable parameter
 
         """
-        adj_pargp = []
-        for pargp in self.par_groups:
-            ptrans = self.parameter_data.loc[self.parameter_data.pargp==pargp,"partrans"].values
-            if "log" in ptrans or "none" in ptrans:
-                adj_pargp.append(pargp)
-        return adj_pargp
+        def _adj_par_groups(par):
+            isadj = par.partrans.isin(["log","none"])
+            adj = set(par.loc[isadj,"pargp"])
+            return [pargp for pargp in self.par_groups if pargp in adj]
+        return list(self._memoize("adj_par_groups",self.parameter_data,
+                                  ["pargp","partrans"],_adj_par_groups))
 
 
     @property
@@ -402,8 +620,8 @@ class Pst(object):
             a list of parameter groups
 
         """
-        pass
-        return list(self.parameter_data.groupby("pargp").groups.keys())
+        return list(self._memoize("par_groups",self.parameter_data,["pargp"],
+                                  lambda par: list(par.groupby("pargp").groups.keys())))
 
 
     @property
@@ -416,6 +634,8 @@ class Pst(object):
             a list of prior information groups
 
         """
+        if "_prior_arrays" in self.__dict__:
+            return sorted(set(self.__dict__["_prior_arrays"].obgnme))
         og = list(self.prior_information.groupby("obgnme").groups.keys())
         #og = list(map(pst_utils.SFMT, og))
         return og
@@ -430,6 +650,8 @@ class Pst(object):
             a list of prior information names
 
         """
+        if "_prior_arrays" in self.__dict__:
+            return sorted(set(self.__dict__["_prior_arrays"].pilbl))
         return list(self.prior_information.groupby(
                 self.prior_information.index).groups.keys())
 
@@ -442,7 +664,8 @@ class Pst(object):
         par_names : list
             a list of parameter names
         """
-        return list(self.parameter_data.parnme.values)
+        return list(self._memoize("par_names",self.parameter_data,["parnme"],
+                                  lambda par: list(par.parnme.values)))
 
     @property
     def adj_par_names(self):
@@ -454,12 +677,11 @@ class Pst(object):
             list of adjustable (not fixed or tied) parameter names
 
         """
-        adj_names = []
-        for t,n in zip(self.parameter_data.partrans,
-                       self.parameter_data.parnme):
-            if t.lower() not in ["tied","fixed"]:
-                adj_names.append(n)
-        return adj_names
+        def _adj_par_names(par):
+            isadj = ~par.partrans.str.lower().isin(["tied","fixed"])
+            return list(par.parnme.values[isadj.values])
+        return list(self._memoize("adj_par_names",self.parameter_data,
+                                  ["partrans","parnme"],_adj_par_names))
 
     @property
     def obs_names(self):
@@ -471,8 +693,8 @@ class Pst(object):
             a list of observation names
 
         """
-        pass
-        return list(self.observation_data.obsnme.values)
+        return list(self._memoize("obs_names",self.observation_data,["obsnme"],
+                                  lambda obs: list(obs.obsnme.values)))
 
     @property
     def nnz_obs_names(self):
@@ -489,10 +711,9 @@ class Pst(object):
         #                self.observation_data.obsnme):
         #     if w > 0.0:
         #         nz_names.append(n)
-        obs = self.observation_data
-
-        nz_names = list(obs.loc[obs.weight>0.0,"obsnme"])
-        return nz_names
+        return list(self._memoize("nnz_obs_names",self.observation_data,
+                                  ["weight","obsnme"],
+                                  lambda obs: list(obs.obsnme.values[obs.weight.values > 0.0])))
 
     @property
     def zero_weight_obs_names(self):
@@ -504,13 +725,9 @@ class Pst(object):
              a list of zero-weighted observation names
 
         """
-        self.observation_data.index = self.observation_data.obsnme
-        groups = self.observation_data.groupby(
-                self.observation_data.weight.apply(lambda x: x==0.0)).groups
-        if True in groups:
-            return list(self.observation_data.loc[groups[True],"obsnme"])
-        else:
-            return []
+        return list(self._memoize("zero_weight_obs_names",self.observation_data,
+                                  ["weight","obsnme"],
+                                  lambda obs: list(obs.obsnme.values[obs.weight.values == 0.0])))
 
     # @property
     # def regul_section(self):
@@ -546,6 +763,62 @@ class Pst(object):
         tied = par.loc[tied_pars,["parnme","partied"]]
         return tied
 
+    @staticmethod
+    def _convert_df(df,converters):
+        """ a private method to apply control file converters to the columns
+        of a dataframe.  String and float converters are applied as vectorized
+        column operations, anything else falls back to pandas.Series.apply()
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            dataframe to convert in place
+        converters : dict
+            dictionary of column name, converter function pairs
+
+        """
+        for col,con in converters.items():
+            if col not in df.columns:
+                continue
+            if con is pst_utils.str_con:
+                vals = df.loc[:,col]
+                isnull = pd.isnull(vals)
+                vals = vals.astype(str).str.strip().str.lower()
+                vals[isnull | (vals == '')] = np.NaN
+                df.loc[:,col] = vals
+            elif con in (float,np.float64):
+                df.loc[:,col] = df.loc[:,col].astype(np.float64)
+            else:
+                df.loc[:,col] = df.loc[:,col].apply(con)
+
+    @staticmethod
+    def _parse_section(lines,names,converters):
+        """ a private method to parse the (comment-free) lines of a control
+        file section into a dataframe with a single pandas.read_csv() call
+
+        Parameters
+        ----------
+        lines : list
+            section lines with comments removed
+        names : list
+            names of the columns
+        converters : dict
+            dictionary of column name, converter function pairs
+
+        Returns
+        -------
+        pandas.DataFrame : pandas.DataFrame
+
+        """
+        dtype = {name:str for name,con in converters.items()
+                 if con is pst_utils.str_con and name in names}
+        if len(lines) == 0:
+            return pd.DataFrame(columns=names)
+        df = pd.read_csv(StringIO('\n'.join(lines)),header=None,names=names,
+                         delim_whitespace=True,index_col=False,dtype=dtype)
+        Pst._convert_df(df,converters)
+        return df
+
     @staticmethod
     def _read_df(f,nrows,names,converters,defaults=None):
         """ a private method to read part of an open file into a pandas.DataFrame.
@@ -589,31 +862,25 @@ class Pst(object):
             if nrows is None:
                 raise Exception("Pst._read_df() error: non-external sections require nrows")
             f.seek(seek_point)
-            df = pd.read_csv(f, header=None,names=names,
-                             nrows=nrows,delim_whitespace=True,
-                             converters=converters, index_col=False,
-                             comment='#')
-
-            # in case there was some extra junk at the end of the lines
-            if df.shape[1] > len(names):
-                df = df.iloc[:,len(names)]
-                df.columns = names
-            isnull = pd.isnull(df)
+            # one pass to split data from trailing comments
+            data,extras = [],[]
+            while len(data) < nrows:
+                line = f.readline()
+                if line == '':
+                    break
+                dline,_,comment = line.partition('#')
+                if dline.strip() == '':
+                    continue
+                data.append(dline.strip())
+                extras.append(comment.strip() if comment.strip() != '' else np.NaN)
+
+            df = Pst._parse_section(data,names,converters)
             if defaults is not None:
                 for name in names:
                     df.loc[:,name] = df.loc[:,name].fillna(defaults[name])
 
             elif np.any(pd.isnull(df).values.flatten()):
                 raise Exception("NANs found")
-            f.seek(seek_point)
-            extras = []
-            for i in range(nrows):
-                line = f.readline()
-                extra = np.NaN
-                if '#' in line:
-                    raw = line.strip().split('#')
-                    extra = ' # '.join(raw[1:])
-                extras.append(extra)
 
             df.loc[:,"extra"] = extras
 
@@ -693,9 +960,8 @@ class Pst(object):
                 df.loc[:,col] = np.NaN
             if col in fieldnames:
                 df.loc[:, col] = df.loc[:, col].fillna(defaults[col])
-            if col in converters:
-
-                df.loc[:,col] = df.loc[:,col].apply(converters[col])
+        Pst._convert_df(df,{col:con for col,con in converters.items()
+                            if col in fieldnames})
 
         return df
 
@@ -858,19 +1124,58 @@ class Pst(object):
 
 
 
-    def load(self,filename):
+    def load(self,filename,cache=False):
         """ entry point load the pest control file.  sniffs the first non-comment line to detect the version (if present)
 
         Parameters
         ----------
         filename : str
             pst filename
+        cache : bool or str
+            flag to use an on-disk cache of the parsed control file.  If a str,
+            it is used as the cache file name, otherwise filename + ".cache"
+            is used.  The cache is keyed on the path, size and modification
+            time of filename and on the pyemu version and cache layout.  A
+            cache that can't be restored is ignored.  Default is False
 
         Raises
         ------
             lots of exceptions for incorrect format
         """
         assert os.path.exists(filename), "couldn't find control file {0}".format(filename)
+        if cache:
+            cache_file = cache if isinstance(cache,str) else filename + ".cache"
+            key = (_pst_cache_key,pyemu.__version__,
+                   pst_utils.file_cache_key(filename))
+            state = pst_utils.read_cache(cache_file,key)
+            if state is not None:
+                org_state = dict(self.__dict__)
+                try:
+                    state = dict(state)
+                    values,keyword_accessed = state.pop("control_data")
+                    self.__dict__.update(state)
+                    self.control_data._df.loc[:,"value"] = values
+                    self.control_data.keyword_accessed.extend(keyword_accessed)
+                    return
+                except Exception as e:
+                    warnings.warn("error restoring cache file {0}: {1}".\
+                                  format(cache_file,str(e)),PyemuWarning)
+                    self.__dict__.clear()
+                    self.__dict__.update(org_state)
+                    self.control_data = ControlData()
+            self.load(filename)
+            # the formatters and converters are reset by the constructor
+            # and the control data (which carries formatters) is stored as values
+            skip = ["filename","resfile","_Pst__res","_res_cache","control_data",
+                    "_derived_memo"] + \
+                   [k for k in pst_utils.pst_config.keys()
+                    if k.endswith("_format") or k.endswith("_converters")]
+            state = {k:v for k,v in self.__dict__.items() if k not in skip}
+            state["control_data"] = (self.control_data._df.loc[:,"value"].values,
+                                     list(self.control_data.keyword_accessed))
+            pst_utils.write_cache(cache_file,key,state)
+            return
+
         f = open(filename, 'r')
 
         while True:
@@ -1138,10 +1443,9 @@ class Pst(object):
         self.control_data.nobs = self.nobs
         self.control_data.npargp = self.parameter_groups.shape[0]
         self.control_data.nobsgp = self.observation_data.obgnme.\
-            value_counts().shape[0] + self.prior_information.obgnme.\
-            value_counts().shape[0]
+            value_counts().shape[0] + len(self.prior_groups)
 
-        self.control_data.nprior = self.prior_information.shape[0]
+        self.control_data.nprior = self.nprior
         self.control_data.ntplfle = len(self.template_files)
         self.control_data.ninsfle = len(self.instruction_files)
         self.control_data.numcom = len(self.model_command)
@@ -1190,25 +1494,8 @@ class Pst(object):
             self.prior_information.pop("names")
         if "rhs" in self.prior_information.columns:
             self.prior_information.pop("rhs")
-        def parse(eqs):
-            raw = eqs.split('=')
-            rhs = float(raw[1])
-            raw = [i for i in re.split('[###]',
-                    raw[0].lower().strip().replace(' + ','###').replace(' - ','###')) if i != '']
-            # in case of a leading '-' or '+'
-            if len(raw[0]) == 0:
-                raw = raw[1:]
-            # pnames = []
-            # for r in raw:
-            #     if '*' not in r:
-            #         continue
-            #     pname =  r.split('*')[1].replace("log(", '').replace(')', '').strip()
-            #     pnames.append(pname)
-            # return pnames
-            return [r.split('*')[1].replace("log(",'').replace(')','').strip() for r in raw if '*' in r]
-
-        self.prior_information.loc[:,"names"] =\
-            self.prior_information.equation.apply(lambda x: parse(x))
+        self.prior_information.loc[:,"names"] = pd.Series(self.prior_arrays.get_par_names(),
+                                                          index=self.prior_information.index)
 
 
     def add_pi_equation(self,par_names,pilbl=None,rhs=0.0,weight=1.0,
@@ -1238,35 +1525,32 @@ class Pst(object):
         if pilbl is None:
             pilbl = "pilbl_{0}".format(self.__pi_count)
             self.__pi_count += 1
-        missing,fixed = [],[]
-
-        for par_name in par_names:
-            if par_name not in self.parameter_data.parnme:
-                missing.append(par_name)
-            elif self.parameter_data.loc[par_name,"partrans"] in ["fixed","tied"]:
-                fixed.append(par_name)
+        par_names = list(par_names)
+        par = self.parameter_data
+        is_par = pd.Index(par_names).isin(par.parnme.values)
+        missing = [n for n,f in zip(par_names,is_par) if not f]
         if len(missing) > 0:
             raise Exception("Pst.add_pi_equation(): the following pars "+\
                             " were not found: {0}".format(','.join(missing)))
+        partrans = par.loc[par_names,"partrans"].values
+        fixed = [n for n,t in zip(par_names,partrans) if t in ["fixed","tied"]]
         if len(fixed) > 0:
             raise Exception("Pst.add_pi_equation(): the following pars "+\
-                            " were are fixed/tied: {0}".format(','.join(missing)))
-        eqs_str = ''
-        sign = ''
-        for i,par_name in enumerate(par_names):
-            coef = coef_dict.get(par_name,1.0)
-            if coef < 0.0:
-                sign = '-'
-                coef = np.abs(coef)
-            elif i > 0: sign = '+'
-            if self.parameter_data.loc[par_name,"partrans"] == "log":
-                par_name = "log({})".format(par_name)
-            eqs_str += " {0} {1} * {2} ".format(sign,coef,par_name)
-        eqs_str += " = {0}".format(rhs)
-        self.prior_information.loc[pilbl,"pilbl"] = pilbl
-        self.prior_information.loc[pilbl,"equation"] = eqs_str
-        self.prior_information.loc[pilbl,"weight"] = weight
-        self.prior_information.loc[pilbl,"obgnme"] = obs_group
+                            " were are fixed/tied: {0}".format(','.join(fixed)))
+        coef = np.array([[coef_dict.get(n,1.0) for n in par_names]])
+        prior = PriorInformation([pilbl],coef,par_names,rhs,weight=weight,
+                                 obgnme=obs_group,log=partrans == "log")
+        pending = self.__dict__.get("_prior_arrays",None)
+        if pending is not None:
+            pending = pending.get(pending.pilbl != pilbl)
+            self.set_prior_information(PriorInformation.concat([pending,prior]))
+        elif self.prior_information.shape[0] == 0:
+            self.set_prior_information(prior)
+        else:
+            # keep the existing equation strings (and comments) as they are
+            df = prior.to_dataframe()
+            pi = self.prior_information
+            self.prior_information = pd.concat([pi.loc[pi.index != pilbl,:],df])
 
     def rectify_pi(self):
         """ rectify the prior information equation with the current state of the
@@ -1274,25 +1558,42 @@ class Pst(object):
         are removed. This method is called during Pst.write()
 
         """
+        prior = self.__dict__.get("_prior_arrays",None)
+        if prior is not None:
+            keep = prior.uses_only(self.adj_par_names)
+            if not keep.all():
+                self.__dict__["_prior_arrays"] = prior.get(keep)
+            return
         if self.prior_information.shape[0] == 0:
             return
-        self._parse_pi_par_names()
-        adj_names = self.adj_par_names
-        def is_good(names):
-            for n in names:
-                if n not in adj_names:
-                    return False
-            return True
-        keep_idx = self.prior_information.names.\
-            apply(lambda x: is_good(x))
-        self.prior_information = self.prior_information.loc[keep_idx,:]
+        keep = self.prior_arrays.uses_only(self.adj_par_names)
+        if not keep.all():
+            self.prior_information = self.prior_information.loc[keep,:]
 
-    def _write_df(self,name,f,df,formatters,columns):
+    def _write_df(self,name,f,df,formatters,columns,sections=None):
         if name.startswith('*'):
             f.write(name+'\n')
         if self.with_comments:
             for line in self.comments.get(name, []):
                 f.write(line+'\n')
+        if sections is not None and name in sections:
+            f.write(sections[name])
+            return
+        f.write(self._format_df(name,df,formatters,columns))
+
+    def _format_df(self,name,df,formatters,columns):
+        """render a section dataframe to a string with the column
+        formatters in pst_utils
+
+        """
+        columns = self._check_df(name,df,columns)
+        return pst_utils.format_section(df,formatters,columns)
+
+    def _check_df(self,name,df,columns):
+        """check a section dataframe for NaNs and add the comment column
+        if needed.  Returns the columns to write
+
+        """
         if df.loc[:,columns].isnull().values.any():
             #warnings.warn("WARNING: NaNs in {0} dataframe".format(name))
             csv_name = "pst.{0}.nans.csv".format(name.replace(" ",'_').replace('*',''))
@@ -1304,16 +1605,33 @@ class Pst(object):
             return ''
         if self.with_comments and 'extra' in df.columns:
             df.loc[:,"extra_str"] = df.extra.apply(ext_fmt)
-            columns.append("extra_str")
+            columns = list(columns) + ["extra_str"]
             #formatters["extra"] = lambda x: " # {0}".format(x) if pd.notnull(x) else 'test'
             #formatters["extra"] = lambda x: ext_fmt(x)
+        return columns
 
+    def _format_prior(self):
+        """render the prior information section to a string.  Written
+        column-by-column since pandas won't output strings longer than
+        100 chars, even with display.max_colwidth
 
-        f.write(df.to_string(col_space=0,formatters=formatters,
-                                                  columns=columns,
-                                                  justify="right",
-                                                  header=False,
-                                                  index=False) + '\n')
+        """
+        prior = self.__dict__.get("_prior_arrays",None)
+        if prior is not None:
+            # pending equations are rendered straight from the arrays
+            pi = pd.DataFrame({"pilbl":prior.pilbl,"equation":prior.equations(),
+                               "weight":prior.weight,"obgnme":prior.obgnme})
+        else:
+            pi = self.prior_information
+        max_eq_len = pi.equation.apply(lambda x:len(x)).max()
+        eq_fmt_str = " %-" + str(max_eq_len) + "s "
+        cols = [pst_utils._column_formats[pst_utils.SFMT](pi.pilbl.values),
+                [eq_fmt_str % eq for eq in pi.equation.values],
+                pst_utils._column_formats[pst_utils.FFMT](pi.weight.values),
+                pst_utils._column_formats[pst_utils.SFMT](pi.obgnme.values)]
+        if self.with_comments and 'extra' in pi.columns:
+            cols.append([" # {0}".format(e) for e in pi.extra.values])
+        return ''.join([''.join(c) + '\n' for c in zip(*cols)])
 
     def sanity_checks(self):
 
@@ -1431,7 +1749,118 @@ class Pst(object):
         else:
             raise Exception("Pst.write() error: version must be 1 or 2, not '{0}'".format(version))
 
-    def _write_version1(self,new_filename,update_regul=False):
+    def write_realizations(self,filenames,parval1=None,obsval=None):
+        """write a series of pest control files that differ only in
+        parameter and/or observation values, e.g. one per realization.
+        The invariant columns of the parameter and observation data
+        sections are formatted once and only the changing value column is
+        re-rendered for each file.  The values in self are not changed
+
+        Parameters
+        ----------
+        filenames : list
+            names of the pest control files to write
+        parval1 : pandas.DataFrame
+            parameter values, one row per file in filenames and one
+            column per parameter to change.  Parameters not in the
+            columns keep their current parval1.  If None, parval1 is not
+            changed
+        obsval : pandas.DataFrame
+            observation values, one row per file in filenames and one
+            column per observation to change.  If None, obsval is not
+            changed
+
+        Example
+        -------
+        ``>>>import pyemu``
+
+        ``>>>pst = pyemu.Pst("pest.pst")``
+
+        ``>>>pe = pyemu.ParameterEnsemble.from_gaussian_draw(pst,num_reals=10)``
+
+        ``>>>pst.write_realizations(["real_{0}.pst".format(i) for i in range(10)],parval1=pe)``
+
+        """
+        filenames = list(filenames)
+        changes = [("* parameter data",self.parameter_data,"parval1",parval1),
+                   ("* observation data",self.observation_data,"obsval",obsval)]
+        keys = {"* parameter data":"parnme","* observation data":"obsnme"}
+        changes = [c for c in changes if c[3] is not None]
+        for name,df,col,vals in changes:
+            if vals.shape[0] != len(filenames):
+                raise Exception("Pst.write_realizations() error: {0} has {1} rows "
+                                "but there are {2} filenames".
+                                format(col,vals.shape[0],len(filenames)))
+
+        if self._version != 1:
+            orig = [df.loc[:,col].copy() for _,df,col,_ in changes]
+            try:
+                for i,filename in enumerate(filenames):
+                    for _,df,col,vals in changes:
+                        df.loc[vals.columns,col] = vals.iloc[i,:].values
+                    self.write(filename)
+            finally:
+                for (_,df,col,_),o in zip(changes,orig):
+                    df.loc[:,col] = o
+            return
+
+        self.rectify_pgroups()
+        self.rectify_pi()
+        self._update_control_section()
+        self.sanity_checks()
+
+        # pre-render every section that doesn't change
+        sections = {}
+        f = StringIO()
+        self.control_data.write(f)
+        sections["* control data"] = f.getvalue()
+        if self.tied is not None:
+            sections["tied parameter data"] = self._format_df("tied parameter data",
+                                                self.tied,self.tied_format,
+                                                self.tied_fieldnames)
+        if self.nprior > 0:
+            sections["* prior information"] = self._format_prior()
+        formats = {"* parameter data":(self.par_format,self.par_fieldnames),
+                   "* observation data":(self.obs_format,self.obs_fieldnames)}
+        changed = [c[0] for c in changes]
+        for name,df in [("* parameter data",self.parameter_data),
+                        ("* observation data",self.observation_data)]:
+            if name not in changed:
+                sections[name] = self._format_df(name,df,*formats[name])
+        plans = []
+        for name,df,col,vals in changes:
+            formatters,columns = formats[name]
+            columns = self._check_df(name,df,columns)
+            pos = pd.Index(df.loc[:,keys[name]].values).get_indexer(vals.columns)
+            if (pos < 0).any():
+                missing = vals.columns[pos < 0]
+                raise Exception("Pst.write_realizations() error: names not found in "
+                                "{0}: {1}".format(name,','.join(missing)))
+            idx = columns.index(col)
+            rendered = [pst_utils.format_column(df.loc[:,c],formatters.get(c,None))
+                        for c in columns[:idx] + columns[idx+1:]]
+            left = pst_utils.join_columns(rendered[:idx]) if idx > 0 else None
+            right = pst_utils.join_columns(rendered[idx:]) if idx < len(rendered) else None
+            base = df.loc[:,col].values.astype(np.float64)
+            plans.append((name,col,formatters[col],vals.values.astype(np.float64),
+                          pos,base,left,right))
+
+        for i,filename in enumerate(filenames):
+            for name,col,formatter,vals,pos,base,left,right in plans:
+                v = base.copy()
+                v[pos] = vals[i,:]
+                if np.isnan(v).any():
+                    raise Exception("Pst.write_realizations() error: NaNs in {0} for {1}".
+                                    format(col,filename))
+                cols = [pst_utils.format_column(pd.Series(v),formatter)]
+                if left is not None:
+                    cols.insert(0,left)
+                if right is not None:
+                    cols.append(right)
+                sections[name] = '\n'.join(pst_utils.join_columns(cols)) + '\n'
+            self._write_version1(filename,sections=sections)
+
+    def _write_version1(self,new_filename,update_regul=False,sections=None):
         """write a version 1 pest control file
 
         Parameters
@@ -1441,21 +1870,30 @@ class Pst(object):
         update_regul : (boolean)
             flag to update zero-order Tikhonov prior information
             equations to prefer the current parameter values
+        sections : dict
+            optional pre-rendered section name - text pairs to write
+            in place of formatting those sections (see
+            Pst.write_realizations()).  If passed, the pst is assumed to
+            already be rectified and checked
 
 
         """
         self.new_filename = new_filename
-        self.rectify_pgroups()
-        self.rectify_pi()
-        self._update_control_section()
-        self.sanity_checks()
+        if sections is None:
+            self.rectify_pgroups()
+            self.rectify_pi()
+            self._update_control_section()
+            self.sanity_checks()
 
         f_out = open(new_filename, 'w')
         if self.with_comments:
             for line in self.comments.get("initial",[]):
                 f_out.write(line+'\n')
         f_out.write("pcf\n* control data\n")
-        self.control_data.write(f_out)
+        if sections is not None and "* control data" in sections:
+            f_out.write(sections["* control data"])
+        else:
+            self.control_data.write(f_out)
 
         # for line in self.other_lines:
         #     f_out.write(line)
@@ -1472,15 +1910,15 @@ class Pst(object):
             self.parameter_groups.pargpnme.apply(self.pargp_format["pargpnme"])
 
         self._write_df("* parameter groups", f_out, self.parameter_groups,
-                       self.pargp_format, self.pargp_fieldnames)
+                       self.pargp_format, self.pargp_fieldnames, sections)
         self.parameter_groups.loc[:,"pargpnme"] = pargpnme
 
         self._write_df("* parameter data",f_out, self.parameter_data,
-                       self.par_format, self.par_fieldnames)
+                       self.par_format, self.par_fieldnames, sections)
 
         if self.tied is not None:
             self._write_df("tied parameter data", f_out, self.tied,
-                           self.tied_format, self.tied_fieldnames)
+                           self.tied_format, self.tied_fieldnames, sections)
 
         f_out.write("* observation groups\n")
         for group in self.obs_groups:
@@ -1497,7 +1935,7 @@ class Pst(object):
             f_out.write(pst_utils.SFMT(str(group))+'\n')
 
         self._write_df("* observation data", f_out, self.observation_data,
-                       self.obs_format, self.obs_fieldnames)
+                       self.obs_format, self.obs_fieldnames, sections)
 
         f_out.write("* model command line\n")
         for cline in self.model_command:
@@ -1510,36 +1948,19 @@ class Pst(object):
             f_out.write(insfle+' '+outfle+'\n')
 
         if self.nprior > 0:
-            if self.prior_information.isnull().values.any():
+            prior = self.__dict__.get("_prior_arrays",None)
+            if prior is not None:
+                has_nans = np.isnan(prior.weight).any() or np.isnan(prior.rhs).any()
+            else:
+                has_nans = self.prior_information.isnull().values.any()
+            if has_nans:
                 #print("WARNING: NaNs in prior_information dataframe")
                 warnings.warn("NaNs in prior_information dataframe",PyemuWarning)
             f_out.write("* prior information\n")
-            #self.prior_information.index = self.prior_information.pop("pilbl")
-            max_eq_len = self.prior_information.equation.apply(lambda x:len(x)).max()
-            eq_fmt_str =  " {0:<" + str(max_eq_len) + "s} "
-            eq_fmt_func = lambda x:eq_fmt_str.format(x)
-            #  17/9/2016 - had to go with a custom writer loop b/c pandas doesn't want to
-            # output strings longer than 100, even with display.max_colwidth
-            #f_out.write(self.prior_information.to_string(col_space=0,
-            #                                  columns=self.prior_fieldnames,
-            #                                  formatters=pi_formatters,
-            #                                  justify="right",
-            #                                  header=False,
-            #                                 index=False) + '\n')
-            #self.prior_information["pilbl"] = self.prior_information.index
-            # for idx,row in self.prior_information.iterrows():
-            #     f_out.write(pst_utils.SFMT(row["pilbl"]))
-            #     f_out.write(eq_fmt_func(row["equation"]))
-            #     f_out.write(pst_utils.FFMT(row["weight"]))
-            #     f_out.write(pst_utils.SFMT(row["obgnme"]) + '\n')
-            for idx, row in self.prior_information.iterrows():
-                f_out.write(pst_utils.SFMT(row["pilbl"]))
-                f_out.write(eq_fmt_func(row["equation"]))
-                f_out.write(pst_utils.FFMT(row["weight"]))
-                f_out.write(pst_utils.SFMT(row["obgnme"]))
-                if self.with_comments and 'extra' in row:
-                    f_out.write(" # {0}".format(row['extra']))
-                f_out.write('\n')
+            if sections is not None and "* prior information" in sections:
+                f_out.write(sections["* prior information"])
+            else:
+                f_out.write(self._format_prior())
 
         if self.control_data.pestmode.startswith("regul"):
             #f_out.write("* regularisation\n")
@@ -1617,7 +2038,11 @@ class Pst(object):
         new_pst.observation_data = new_obs
         new_pst.parameter_groups = new_pargp
         new_pst.__res = new_res
-        new_pst.prior_information = self.prior_information
+        new_pst._res_cache = self._res_cache
+        if "_prior_arrays" in self.__dict__:
+            new_pst.set_prior_information(self.__dict__["_prior_arrays"].copy())
+        else:
+            new_pst.prior_information = self.prior_information.copy()
         new_pst.rectify_pi()
         new_pst.control_data = self.control_data.copy()
 
@@ -1637,6 +2062,35 @@ class Pst(object):
 
         return new_pst
 
+    def get_view(self, par_names=None, obs_names=None):
+        """get a light-weight subset of the control file.  Unlike
+        Pst.get(), the subset data frames are taken by integer position and
+        the prior information is only rectified when it is accessed, so this
+        is the cheap option for repeated subsetting (e.g. looping over
+        observation cases in Schur.get_added_obs_importance()).  The data
+        frames of the returned instance are independent copies
+
+        Parameters
+        ----------
+        par_names : list
+            a list of parameter names to have in the view.
+            If None, all parameters are in the view. Default
+            is None
+        obs_names : list
+            a list of observation names to have in the view.
+            If None, all observations are in the view. Default
+            is None
+
+        Returns
+        -------
+        PstView : PstView
+            a view of self.  The par_idx and obs_idx attributes hold the
+            positions of the selected names in self.parameter_data and
+            self.observation_data
+
+        """
+        return PstView(self, par_names=par_names, obs_names=obs_names)
+
     def zero_order_tikhonov(self,parbounds=True):
         raise Exception("Pst.zero_oder_tikhonov has moved to utils.helpers")
 
@@ -1762,7 +2216,8 @@ class Pst(object):
         factors =  (1.0/swr).apply(np.sqrt)
         if original_ceiling:
             factors = factors.apply(lambda x: 1.0 if x > 1.0 else x)
-        self.observation_data.loc[self.nnz_obs_names,"weight"] *= factors
+        self._set_values("observation_data",self.nnz_obs_names,"weight",
+                         self.observation_data.loc[self.nnz_obs_names,"weight"] * factors)
 
 
         # nz_groups = obs.groupby(obs["weight"].map(lambda x: x == 0)).groups
@@ -1799,27 +2254,26 @@ class Pst(object):
 
         """
         obs = self.observation_data
-        nz_groups = obs.groupby(obs["weight"].map(lambda x: x == 0)).groups
-        ogroups = obs.groupby("obgnme").groups
-        for ogroup, idxs in ogroups.items():
-            if self.control_data.pestmode.startswith("regul") \
-                    and "regul" in ogroup.lower():
-                continue
-            og_phi = components[ogroup]
-            nz_groups = obs.loc[idxs,:].groupby(obs.loc[idxs,"weight"].\
-                                                map(lambda x: x == 0)).groups
-            og_nzobs = 0
-            if False in nz_groups.keys():
-                og_nzobs = len(nz_groups[False])
-            if og_nzobs == 0 and og_phi > 0:
-                raise Exception("Pst.adjust_weights_by_phi_components():"
-                                " no obs with nonzero weight," +
-                                " but phi > 0 for group:" + str(ogroup))
-            if og_phi > 0:
-                factor = np.sqrt(float(og_nzobs) / float(og_phi))
-                if original_ceiling:
-                    factor = min(factor,1.0)
-                obs.loc[idxs,"weight"] = obs.weight[idxs] * factor
+        codes,groups = pd.factorize(obs.obgnme.values,sort=True)
+        weights = obs.weight.values.astype(float)
+        og_nzobs = np.bincount(codes,weights=(weights != 0.0),
+                               minlength=len(groups))
+        og_phi = np.array([components[og] for og in groups],dtype=float)
+        if self.control_data.pestmode.startswith("regul"):
+            skip = np.array(["regul" in og.lower() for og in groups],dtype=bool)
+        else:
+            skip = np.zeros(len(groups),dtype=bool)
+        bad = (~skip) & (og_nzobs == 0) & (og_phi > 0)
+        if np.any(bad):
+            raise Exception("Pst.adjust_weights_by_phi_components():"
+                            " no obs with nonzero weight," +
+                            " but phi > 0 for group:" + str(groups[bad][0]))
+        factors = np.ones(len(groups))
+        adjust = (~skip) & (og_phi > 0)
+        factors[adjust] = np.sqrt(og_nzobs[adjust] / og_phi[adjust])
+        if original_ceiling:
+            factors[adjust] = np.minimum(factors[adjust],1.0)
+        obs.loc[:,"weight"] = weights * factors[codes]
         self.observation_data = obs
 
     def __reset_weights(self, target_phis, res_idxs, obs_idxs):
@@ -1851,7 +2305,8 @@ class Pst(object):
                            [obs_idxs[item], "weight"])**2).sum()
             if actual_phi > 0.0:
                 weight_mult = np.sqrt(target_phis[item] / actual_phi)
-                self.observation_data.loc[obs_idxs[item], "weight"] *= weight_mult
+                self._set_values("observation_data",obs_idxs[item],"weight",
+                                 self.observation_data.loc[obs_idxs[item],"weight"] * weight_mult)
             else:
                 ("Pst.__reset_weights() warning: phi group {0} has zero phi, skipping...".format(item))
 
@@ -1876,9 +2331,9 @@ class Pst(object):
         #                     obs.weight.apply(lambda x:x==0.0)]).groups
         # if (True,True) in groups:
         #    obs.loc[groups[True,True],"weight"] = weight
-        reset_names = obs.loc[obs.apply(lambda x: x.obsnme in obslist and x.weight == 0, axis=1), "obsnme"]
+        reset_names = obs.loc[obs.obsnme.isin(obslist) & (obs.weight == 0), "obsnme"]
         if len(reset_names) > 0:
-            obs.loc[reset_names, "weight"] = weight
+            self._set_values("observation_data",reset_names,"weight",weight)
 
     def adjust_weights(self,obs_dict=None,
                               obsgrp_dict=None):
@@ -1909,7 +2364,7 @@ class Pst(object):
             obs = self.observation_data
             for grp in obsgrp_dict.keys():
                 if obs.loc[obs.obgnme==grp,"weight"].sum() == 0.0:
-                    obs.loc[obs.obgnme==grp,"weight"] = 1.0
+                    self._set_values("observation_data",obs.obgnme==grp,"weight",1.0)
             res_groups = self.res.groupby("group").groups
             obs_groups = self.observation_data.groupby("obgnme").groups
             self.__reset_weights(obsgrp_dict, res_groups, obs_groups)
@@ -1918,7 +2373,7 @@ class Pst(object):
             obs = self.observation_data
             for oname in obs_dict.keys():
                 if obs.loc[oname,"weight"] == 0.0:
-                    obs.loc[oname,"weight"] = 1.0
+                    self._set_values("observation_data",oname,"weight",1.0)
 
             #res_groups = self.res.groupby("name").groups
             res_groups = self.res.groupby(self.res.index).groups
@@ -1954,7 +2409,7 @@ class Pst(object):
                 nw = 1.0 / (np.abs(oval) * fraction_stdev)
                 ow = min(wmax, nw)
             new_weights.append(ow)
-        self.observation_data.weight = new_weights
+        self._set_values("observation_data",slice(None),"weight",new_weights)
 
     def calculate_pertubations(self):
         """ experimental method to calculate finite difference parameter
@@ -2065,7 +2520,8 @@ class Pst(object):
 
 
     @classmethod
-    def from_io_files(cls,tpl_files,in_files,ins_files,out_files,pst_filename=None):
+    def from_io_files(cls,tpl_files,in_files,ins_files,out_files,pst_filename=None,
+                      num_workers=None,cache_file=None,processes=False):
         """ create a Pst instance from model interface files. Assigns generic values for
         parameter info.  Tries to use INSCHEK to set somewhat meaningful observation
         values
@@ -2083,6 +2539,15 @@ class Pst(object):
         pst_filename : str
             name of control file to write.  If None, no file is written.
             Default is None
+        num_workers : int
+            number of workers to use to parse the interface files.  If None,
+            the number of cpus is used.  Default is None
+        cache_file : str
+            optional on-disk cache of the names parsed from each interface
+            file so that only new or changed files are parsed.  Default is None
+        processes : bool
+            flag to use a pool of processes instead of threads.  Default
+            is False
 
         Returns
         -------
@@ -2096,10 +2561,11 @@ class Pst(object):
         from pyemu import helpers
         return helpers.pst_from_io_files(tpl_files=tpl_files,in_files=in_files,
                                            ins_files=ins_files,out_files=out_files,
-                                         pst_filename=pst_filename)
+                                         pst_filename=pst_filename,num_workers=num_workers,
+                                         cache_file=cache_file,processes=processes)
 
 
-    def add_parameters(self,template_file,in_file=None,pst_path=None):
+    def add_parameters(self,template_file,in_file=None,pst_path=None,cache_file=None):
         """ add new parameters to a control file
 
         Parameters
@@ -2112,6 +2578,9 @@ class Pst(object):
                 the path to append to the template_file and in_file in the control file.  If
                 not None, then any existing path in front of the template or in file is split off
                 and pst_path is prepended.  Default is None
+            cache_file : str(optional)
+                on-disk cache of parsed template file names (see
+                pst_utils.parse_tpl_files()).  Default is None
 
         Returns
         -------
@@ -2127,7 +2596,8 @@ class Pst(object):
         assert os.path.exists(template_file),"template file '{0}' not found".format(template_file)
         assert template_file != in_file
         # get the parameter names in the template file
-        parnme = pst_utils.parse_tpl_file(template_file)
+        parnme = pst_utils.parse_tpl_files([template_file],num_workers=1,
+                                           cache_file=cache_file)[0]
 
         # find "new" parameters that are not already in the control file
         new_parnme = [p for p in parnme if p not in self.parameter_data.parnme]
@@ -2154,7 +2624,7 @@ class Pst(object):
         return new_par_data
 
 
-    def add_observations(self,ins_file,out_file=None,pst_path=None,inschek=True):
+    def add_observations(self,ins_file,out_file=None,pst_path=None,inschek=True,cache_file=None):
         """ add new parameters to a control file
 
         Parameters
@@ -2168,7 +2638,11 @@ class Pst(object):
                 not None, then any existing path in front of the template or in file is split off
                 and pst_path is prepended.  Default is None
             inschek : bool
-                flag to run inschek.  If successful, inscheck outputs are used as obsvals
+                flag to read the output file with the native instruction engine (falling
+                back to running inschek).  If successful, the values read are used as obsvals
+            cache_file : str(optional)
+                on-disk cache of parsed instruction file names (see
+                pst_utils.parse_ins_files()).  Default is None
 
         Returns
         -------
@@ -2186,7 +2660,8 @@ class Pst(object):
         assert ins_file != out_file, "doh!"
 
         # get the parameter names in the template file
-        obsnme = pst_utils.parse_ins_file(ins_file)
+        obsnme = pst_utils.parse_ins_files([ins_file],num_workers=1,
+                                           cache_file=cache_file)[0]
 
         sobsnme = set(obsnme)
         sexist = set(self.obs_names)
@@ -2209,6 +2684,7 @@ class Pst(object):
         new_obs_data.index = new_obsnme
         self.observation_data = self.observation_data.append(new_obs_data)
         cwd = '.'
+        local_ins_file,local_out_file = ins_file,out_file
         if pst_path is not None:
             cwd = os.path.join(*os.path.split(ins_file)[:-1])
             ins_file = os.path.join(pst_path,os.path.split(ins_file)[-1])
@@ -2217,24 +2693,56 @@ class Pst(object):
         self.output_files.append(out_file)
         df = None
         if inschek:
-            df = pst_utils._try_run_inschek(ins_file,out_file,cwd=cwd)
+            try:
+                sim = pst_utils.read_output_file(local_ins_file,local_out_file)
+                df = pd.DataFrame({"obsval":sim.values},index=sim.index)
+            except Exception as e:
+                df = pst_utils._try_run_inschek(ins_file,out_file,cwd=cwd)
         if df is not None:
             #print(self.observation_data.index,df.index)
             self.observation_data.loc[df.index,"obsval"] = df.obsval
             new_obs_data.loc[df.index,"obsval"] = df.obsval
         return new_obs_data
 
-    def write_input_files(self):
+    def process_output_files(self, pst_path='.', num_workers=None):
+        """reads the model output files with the native instruction engine.
+        just syntatic sugar for pst_utils.process_output_files()
+
+        Parameters
+        ----------
+        pst_path : str
+            path to prepend to the instruction and output file names.
+            Default is '.'
+        num_workers : int
+            number of threads to use to read the output files.  If None,
+            the number of cpus is used.  Default is None
+
+        Returns
+        -------
+        pandas.Series : pandas.Series
+            simulated values aligned with Pst.obs_names
+
+        """
+        return pst_utils.process_output_files(self,pst_path=pst_path,
+                                              num_workers=num_workers)
+
+    def write_input_files(self, num_workers=None):
         """writes model input files using template files and current parvals.
         just syntatic sugar for pst_utils.write_input_files()
 
+        Parameters
+        ----------
+        num_workers : int
+            number of threads to use to write the input files.  If None,
+            the number of cpus is used.  Default is None
+
         Note
         ----
             adds "parval1_trans" column to Pst.parameter_data that includes the
             effect of scale and offset
 
         """
-        pst_utils.write_input_files(self)
+        pst_utils.write_input_files(self,num_workers=num_workers)
 
     def get_res_stats(self,nonzero=True):
         """ get some common residual stats from the current obsvals,
@@ -2535,6 +3043,16 @@ class Pst(object):
         pyemu.utils.os_utils.run(cmd_line,cwd=cwd)
 
 
+    @staticmethod
+    def _constraint_names(df,pattern,name_col):
+        """ private method to get the names of the non-zero weighted
+        entries in df whose group matches the constraint pattern
+
+        """
+        if df.shape[0] == 0 or "weight" not in df.columns:
+            return pd.Series([],dtype=object,name=name_col)
+        return df.loc[df.obgnme.str.match(pattern) & (df.weight != 0.0),name_col]
+
     def _is_less_const(self,name):
         constraint_tags = ["l_", "less"]
         return True in [True for c in constraint_tags if name.startswith(c)]
@@ -2553,10 +3071,10 @@ class Pst(object):
         """
 
 
-        obs = self.observation_data
-        lt_obs = obs.loc[obs.apply(lambda x: self._is_less_const(x.obgnme) \
-                                             and x.weight != 0.0,axis=1),"obsnme"]
-        return lt_obs
+        lt_obs = self._memoize("less_than_obs_constraints",self.observation_data,
+                               ["obgnme","weight","obsnme"],
+                               lambda obs: Pst._constraint_names(obs,"(l_|less)","obsnme"))
+        return lt_obs.copy()
 
     @property
     def less_than_pi_constraints(self):
@@ -2571,10 +3089,10 @@ class Pst(object):
 
         """
 
-        pi = self.prior_information
-        lt_pi = pi.loc[pi.apply(lambda x: self._is_less_const(x.obgnme) \
-                                             and x.weight != 0.0, axis=1), "pilbl"]
-        return lt_pi
+        lt_pi = self._memoize("less_than_pi_constraints",self.prior_information,
+                              ["obgnme","weight","pilbl"],
+                              lambda pi: Pst._constraint_names(pi,"(l_|less)","pilbl"))
+        return lt_pi.copy()
 
 
     def _is_greater_const(self,name):
@@ -2596,10 +3114,10 @@ class Pst(object):
 
 
 
-        obs = self.observation_data
-        gt_obs = obs.loc[obs.apply(lambda x: self._is_greater_const(x.obgnme) \
-                                             and x.weight != 0.0,axis=1),"obsnme"]
-        return gt_obs
+        gt_obs = self._memoize("greater_than_obs_constraints",self.observation_data,
+                               ["obgnme","weight","obsnme"],
+                               lambda obs: Pst._constraint_names(obs,"(g_|greater)","obsnme"))
+        return gt_obs.copy()
 
     @property
     def greater_than_pi_constraints(self):
@@ -2614,10 +3132,10 @@ class Pst(object):
 
         """
 
-        pi = self.prior_information
-        gt_pi = pi.loc[pi.apply(lambda x: self._is_greater_const(x.obgnme) \
-                                          and x.weight != 0.0, axis=1), "pilbl"]
-        return gt_pi
+        gt_pi = self._memoize("greater_than_pi_constraints",self.prior_information,
+                              ["obgnme","weight","pilbl"],
+                              lambda pi: Pst._constraint_names(pi,"(g_|greater)","pilbl"))
+        return gt_pi.copy()
 
 
 
@@ -2684,3 +3202,102 @@ class Pst(object):
         change_df.loc[:,"eff_lower"] = change_df.loc[:, ["parlbnd", "chg_lower"]].max(axis=1)
 
         return change_df
+
+
+class PstView(Pst):
+    """a light-weight subset of a Pst instance.  The selected parameters
+    and observations are found once as integer positions in the parent's
+    parameter_data and observation_data (the par_idx and obs_idx
+    attributes) and the subset data frames are taken with iloc, so none of
+    the name-based reindexing of Pst.get() is needed.  The prior
+    information equations are only rectified against the selected
+    parameters when they are first accessed.  All of the data frames are
+    independent copies - edits to the view never reach the parent and
+    edits to the parent after the view is made never reach the view.
+
+    Parameters
+    ----------
+    parent : Pst
+        the Pst instance to take a subset of
+    par_names : list
+        a list of parameter names in the view.  If None, all parameters
+        are in the view. Default is None
+    obs_names : list
+        a list of observation names in the view.  If None, all observations
+        are in the view. Default is None
+
+    """
+    _skip_attrs = ["parameter_data","observation_data","parameter_groups",
+                   "prior_information","_prior_arrays","_Pst__res",
+                   "_derived_memo","_data_version","control_data"]
+
+    def __init__(self, parent, par_names=None, obs_names=None):
+        for key,value in parent.__dict__.items():
+            if key not in PstView._skip_attrs:
+                self.__dict__[key] = value
+        self.__dict__["control_data"] = parent.control_data.copy()
+        self.__dict__["par_idx"] = PstView._positions(parent, "parameter_data",
+                                                     "parnme", par_names)
+        self.__dict__["obs_idx"] = PstView._positions(parent, "observation_data",
+                                                     "obsnme", obs_names)
+
+        par = parent.parameter_data.iloc[self.par_idx,:].copy()
+        par.index = par.parnme
+        self.parameter_data = par
+        obs = parent.observation_data.iloc[self.obs_idx,:].copy()
+        obs.index = obs.obsnme
+        self.observation_data = obs
+
+        pargp = parent.parameter_groups.copy()
+        pargp.index = pargp.pargpnme.apply(str.strip)
+        self.parameter_groups = pargp.loc[par.pargp.value_counts().index,:]
+
+        res = parent.__dict__.get("_Pst__res", None)
+        if res is not None:
+            res = res.copy()
+            res.index = res.name
+            res = res.loc[obs.obsnme.values,:]
+        self.__dict__["_Pst__res"] = res
+
+        if "_prior_arrays" in parent.__dict__:
+            self.set_prior_information(parent.__dict__["_prior_arrays"].copy())
+            self.rectify_pi()
+        else:
+            # rectified the first time it is accessed
+            self.__dict__["_prior_snapshot"] = parent.prior_information.copy()
+
+    @staticmethod
+    def _positions(parent, attr, name_col, names):
+        """ private method to get the integer positions of names in the
+        name_col column of one of the parent's data frames
+
+        """
+        df = parent.__getattribute__(attr)
+        if names is None:
+            return np.arange(df.shape[0])
+        if isinstance(names, str):
+            names = [names]
+        names = list(names)
+        values = df[name_col].values
+        index = parent._memoize("_{0}_index".format(name_col), df, [name_col],
+                                lambda df: pd.Index(df[name_col].values))
+        idx = index.get_indexer(names)
+        # the name columns aren't fingerprinted by the memo, so check the
+        # positions against the current names
+        if len(index) != len(values) or np.any(idx < 0) or \
+                list(values[idx]) != names:
+            idx = pd.Index(values).get_indexer(names)
+        if np.any(idx < 0):
+            missing = [n for n,i in zip(names,idx) if i < 0]
+            raise Exception("PstView error: names not found in " +
+                            "{0}: {1}".format(attr, ','.join(missing)))
+        return idx
+
+    def __getattr__(self, key):
+        # only called if key is not found the normal way, so this is where
+        # the prior information is rectified
+        if key == "prior_information" and "_prior_snapshot" in self.__dict__:
+            self.prior_information = self.__dict__.pop("_prior_snapshot")
+            self.rectify_pi()
+            return self.__dict__["prior_information"]
+        return super(PstView,self).__getattr__(key)
@@ -0,0 +1,318 @@
+"""This module contains the PriorInformation class, an array-based
+representation of the prior information section of a PEST control file.
+Equations are held as a sparse coefficient matrix with right-hand sides,
+weights and groups and are only rendered to PEST equation strings when
+needed (e.g. when the control file is written)
+"""
+from __future__ import print_function, division
+import numpy as np
+import pandas as pd
+import scipy.sparse
+
+
+class PriorInformation(object):
+    """array-based prior information equations.  Equation i is
+
+        sum_j(coef[i,j] * par_names[j]) = rhs[i]
+
+    where the parameters flagged in log are written as log(par_name)
+
+    Parameters
+    ----------
+    pilbl : list
+        prior information equation names
+    coef : scipy.sparse matrix or numpy.ndarray
+        coefficient matrix of shape (len(pilbl), len(par_names))
+    par_names : list
+        the parameter names for the columns of coef
+    rhs : float or numpy.ndarray
+        right-hand side of each equation
+    weight : float or numpy.ndarray
+        weight of each equation.  Default is 1.0
+    obgnme : str or list
+        observation group of each equation.  Default is "regul"
+    log : bool or numpy.ndarray
+        flag(s) for the columns of coef that are log-transformed in the
+        equations.  Default is False
+
+    Example
+    -------
+    ``>>>import pyemu``
+
+    ``>>>pst = pyemu.Pst("pest.pst")``
+
+    ``>>>pi = pyemu.PriorInformation(pst.adj_par_names,np.eye(pst.npar_adj),pst.adj_par_names,rhs=0.0)``
+
+    ``>>>pst.set_prior_information(pi)``
+
+    """
+    def __init__(self, pilbl, coef, par_names, rhs, weight=1.0, obgnme="regul",
+                 log=False):
+        self.pilbl = np.asarray(pilbl, dtype=object)
+        self.par_names = list(par_names)
+        self.coef = scipy.sparse.csr_matrix(coef, dtype=np.float64)
+        nprior = self.pilbl.shape[0]
+        if self.coef.shape != (nprior, len(self.par_names)):
+            raise Exception("PriorInformation error: coef shape {0} doesn't match "
+                            "({1},{2})".format(self.coef.shape, nprior,
+                                               len(self.par_names)))
+        self.rhs = np.zeros(nprior) + np.asarray(rhs, dtype=np.float64)
+        self.weight = np.zeros(nprior) + np.asarray(weight, dtype=np.float64)
+        if isinstance(obgnme, str):
+            obgnme = [obgnme] * nprior
+        self.obgnme = np.asarray(obgnme, dtype=object)
+        self.log = np.zeros(len(self.par_names), dtype=bool) | np.asarray(log, dtype=bool)
+
+    @property
+    def nprior(self):
+        """ number of equations
+
+        Returns
+        -------
+        nprior : int
+
+        """
+        return self.pilbl.shape[0]
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """ parse the equations in a prior information dataframe (e.g.
+        Pst.prior_information)
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            dataframe with pilbl, equation, weight and obgnme columns
+
+        Returns
+        -------
+        PriorInformation : PriorInformation
+
+        """
+        if df.shape[0] == 0:
+            return cls([], np.zeros((0, 0)), [], [])
+        col_idx, log_names = {}, set()
+        rows, cols, data, rhs = [], [], [], []
+        for i, eq in enumerate(df.equation.values):
+            try:
+                raw = eq.lower().split('=')
+                rhs.append(float(raw[1].replace('d', 'e')))
+                terms = raw[0].strip().replace(' + ', ' ###+').\
+                    replace(' - ', ' ###-').split('###')
+                for term in terms:
+                    if '*' not in term:
+                        continue
+                    c, name = term.split('*')
+                    c = c.replace(' ', '')
+                    sign = 1.0
+                    if c.startswith('-'):
+                        sign = -1.0
+                    c = c.lstrip('+-')
+                    name = name.strip()
+                    if name.startswith("log("):
+                        name = name.replace("log(", '').replace(')', '').strip()
+                        log_names.add(name)
+                    j = col_idx.setdefault(name, len(col_idx))
+                    rows.append(i)
+                    cols.append(j)
+                    data.append(sign * float(c.replace('d', 'e')))
+            except Exception as e:
+                raise Exception("PriorInformation.from_dataframe() error parsing "
+                                "equation '{0}': {1}".format(eq, str(e)))
+        par_names = list(col_idx.keys())
+        coef = scipy.sparse.coo_matrix((data, (rows, cols)),
+                                       shape=(df.shape[0], len(par_names)))
+        log = np.array([n in log_names for n in par_names], dtype=bool)
+        return cls(df.pilbl.values, coef, par_names, rhs,
+                   weight=df.weight.values, obgnme=list(df.obgnme.values), log=log)
+
+    @classmethod
+    def concat(cls, others):
+        """ stack several PriorInformation instances into one
+
+        Parameters
+        ----------
+        others : list
+            list of PriorInformation instances
+
+        Returns
+        -------
+        PriorInformation : PriorInformation
+
+        """
+        col_idx, log = {}, []
+        blocks = []
+        for other in others:
+            jidx = []
+            for name, l in zip(other.par_names, other.log):
+                if name not in col_idx:
+                    col_idx[name] = len(col_idx)
+                    log.append(l)
+                jidx.append(col_idx[name])
+            coo = other.coef.tocoo()
+            blocks.append((coo.row, np.asarray(jidx, dtype=int)[coo.col], coo.data))
+        offsets = np.cumsum([0] + [o.nprior for o in others])
+        rows = np.concatenate([b[0] + off for b, off in zip(blocks, offsets)])
+        cols = np.concatenate([b[1] for b in blocks])
+        data = np.concatenate([b[2] for b in blocks])
+        coef = scipy.sparse.coo_matrix((data, (rows, cols)),
+                                       shape=(offsets[-1], len(col_idx)))
+        return cls(np.concatenate([o.pilbl for o in others]), coef, list(col_idx.keys()),
+                   np.concatenate([o.rhs for o in others]),
+                   weight=np.concatenate([o.weight for o in others]),
+                   obgnme=list(np.concatenate([o.obgnme for o in others])),
+                   log=np.array(log, dtype=bool))
+
+    def get(self, mask):
+        """ get a new PriorInformation with a subset of the equations
+
+        Parameters
+        ----------
+        mask : numpy.ndarray
+            boolean mask or integer indices of the equations to keep
+
+        Returns
+        -------
+        PriorInformation : PriorInformation
+
+        """
+        return PriorInformation(self.pilbl[mask], self.coef[mask, :], self.par_names,
+                                self.rhs[mask], weight=self.weight[mask],
+                                obgnme=list(self.obgnme[mask]), log=self.log)
+
+    def copy(self):
+        """ get a copy of self that shares no arrays with self
+
+        Returns
+        -------
+        PriorInformation : PriorInformation
+
+        """
+        return self.get(np.arange(self.nprior))
+
+    def uses_only(self, par_names):
+        """ flag the equations that only reference parameters in par_names
+
+        Parameters
+        ----------
+        par_names : list
+            parameter names
+
+        Returns
+        -------
+        mask : numpy.ndarray
+            boolean array, True for equations that only reference par_names
+
+        """
+        bad_cols = ~pd.Index(self.par_names).isin(par_names)
+        if not bad_cols.any():
+            return np.ones(self.nprior, dtype=bool)
+        # structural entries count, even if the coefficient is zero
+        nbad = np.diff(self.coef[:, np.where(bad_cols)[0]].tocsr().indptr)
+        return nbad == 0
+
+    def get_par_names(self):
+        """ get the parameter names in each equation
+
+        Returns
+        -------
+        names : list
+            list of lists of parameter names, one per equation
+
+        """
+        names = np.array(self.par_names, dtype=object)
+        indptr, indices = self.coef.indptr, self.coef.indices
+        return [list(names[indices[indptr[i]:indptr[i + 1]]])
+                for i in range(self.nprior)]
+
+    def equations(self):
+        """ render the equations to PEST prior information equation strings
+
+        Returns
+        -------
+        equations : list
+            list of equation strings
+
+        """
+        csr = self.coef
+        names = np.array(["log({0})".format(n) if l else n
+                          for n, l in zip(self.par_names, self.log)], dtype=object)
+        data = csr.data
+        terms = ["{0} * {1}".format(abs(c), n)
+                 for c, n in zip(data.tolist(), names[csr.indices])]
+        signs = np.where(data < 0.0, " - ", " + ")
+        equations = []
+        indptr = csr.indptr
+        for i, rhs in enumerate(self.rhs.tolist()):
+            s, e = indptr[i], indptr[i + 1]
+            if s == e:
+                equations.append("0.0 * {0} = {1}".format(names[0], rhs))
+                continue
+            eq = ('-' + terms[s]) if data[s] < 0.0 else terms[s]
+            eq += ''.join([sg + t for sg, t in zip(signs[s + 1:e], terms[s + 1:e])])
+            equations.append("{0} = {1}".format(eq, rhs))
+        return equations
+
+    def to_dataframe(self):
+        """ render to a prior information dataframe (the form of
+        Pst.prior_information)
+
+        Returns
+        -------
+        pandas.DataFrame : pandas.DataFrame
+
+        """
+        df = pd.DataFrame({"pilbl": self.pilbl, "equation": self.equations(),
+                           "weight": self.weight, "obgnme": self.obgnme},
+                          index=pd.Index(self.pilbl, name="pilbl"))
+        return df
+
+    def to_sparse_matrix(self, par_names=None):
+        """ get the coefficient matrix as a pyemu.SparseMatrix.  For
+        the log-transformed parameters, the coefficients are the
+        sensitivities of the equations to the log10 parameter values, so
+        these are the prior information rows of a jacobian matrix
+
+        Parameters
+        ----------
+        par_names : list
+            the columns to return.  Parameters not referenced in the
+            equations have zero coefficients.  If None, self.par_names
+            is used
+
+        Returns
+        -------
+        pyemu.SparseMatrix : pyemu.SparseMatrix
+
+        """
+        from pyemu.mat import SparseMatrix
+        coef = self.coef
+        if par_names is None:
+            par_names = self.par_names
+        else:
+            pos = pd.Index(self.par_names).get_indexer(par_names)
+            # columns not in self are zero
+            ext = scipy.sparse.hstack([coef, scipy.sparse.csr_matrix((self.nprior, 1))])
+            coef = ext.tocsc()[:, np.where(pos < 0, self.coef.shape[1], pos)]
+        return SparseMatrix(x=coef.tocoo(), row_names=list(self.pilbl),
+                            col_names=list(par_names))
+
+    def get_normal_matrix(self, par_names):
+        """ get the contribution of the weighted equations to the normal
+        matrix (A^T * W^2 * A)
+
+        Parameters
+        ----------
+        par_names : list
+            the parameter names for the rows and columns
+
+        Returns
+        -------
+        pyemu.Matrix : pyemu.Matrix
+
+        """
+        from pyemu.mat import Matrix
+        a = self.to_sparse_matrix(par_names).x.tocsr()
+        wa = scipy.sparse.diags(self.weight) * a
+        xtqx = (wa.T * wa).toarray()
+        return Matrix(x=xtqx, row_names=list(par_names), col_names=list(par_names))
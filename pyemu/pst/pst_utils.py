@@ -4,6 +4,7 @@ the pyemu.Pst object.
 from __future__ import print_function, division
 import os, sys
 import stat
+import pickle
 import warnings
 from datetime import datetime
 import numpy as np
@@ -117,13 +118,184 @@ pst_config["regul_lines"] = []
 pst_config["pestpp_options"] = {}
 
 
-def read_resfile(resfile):
-        """load a residual file into a pandas.DataFrame
+# column-at-a-time equivalents of the section formatters above, used to
+# render whole columns at once instead of calling the formatter per value
+_column_formats = {SFMT: lambda v: ["%-20s " % x for x in map(str, v)],
+                   SFMT_LONG: lambda v: ["%-50s " % x for x in map(str, v)],
+                   FFMT: lambda v: ["%-20.10E " % x for x in
+                                    np.asarray(v, dtype=np.float64).tolist()],
+                   IFMT: lambda v: ["%-10d " % x for x in
+                                    np.asarray(v, dtype=np.float64).astype(np.int64).tolist()]}
+
+
+def format_column(values,formatter=None):
+    """ render one column of a control file section, right-justified
+    to a common width the same way DataFrame.to_string() would
+
+    Parameters
+    ----------
+    values : pandas.Series
+        the column values
+    formatter : callable
+        one of the section formatters (e.g. SFMT, FFMT). If None,
+        pandas' default formatting of the column is used
+
+    Returns
+    -------
+    column : list
+        the rendered strings for the column
+
+    """
+    if formatter is None:
+        col = values.to_frame().to_string(col_space=0,justify="right",
+                                          header=False,index=False)
+        return col.split('\n')
+    if formatter in _column_formats:
+        col = _column_formats[formatter](values.values)
+    else:
+        col = [formatter(v) for v in values.values]
+    lens = set(map(len,col))
+    if len(lens) > 1:
+        width = max(lens)
+        col = [c.rjust(width) for c in col]
+    return col
+
+
+def join_columns(columns):
+    """ join rendered columns (see format_column()) into lines
+
+    Parameters
+    ----------
+    columns : list
+        list of rendered columns, each a list of str
+
+    Returns
+    -------
+    lines : list
+        the lines of the section, without line endings
+
+    """
+    return list(map(' '.join,zip(*columns)))
+
+
+def format_section(df,formatters,columns):
+    """ render a control file section dataframe to a string,
+    one line per row.  Equivalent to DataFrame.to_string() with
+    the section formatters but vectorized by column
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        the section dataframe (e.g. Pst.parameter_data)
+    formatters : dict
+        column name - formatter pairs
+    columns : list
+        the columns to write, in order
+
+    Returns
+    -------
+    section : str
+        the rendered section with a trailing newline
+
+    """
+    if df.shape[0] == 0:
+        return df.to_string(col_space=0,formatters=formatters,columns=columns,
+                            justify="right",header=False,index=False) + '\n'
+    cols = [format_column(df.loc[:,c],formatters.get(c,None)) for c in columns]
+    return '\n'.join(join_columns(cols)) + '\n'
+
+
+def file_cache_key(filename):
+    """ get a key that identifies the current state of a file for
+    on-disk caching.  The key is the absolute path, size and
+    modification time of the file
+
+    Parameters
+    ----------
+    filename : str
+        the file to get the key for
+
+    Returns
+    -------
+    tuple : tuple
+        (abspath,size,mtime_ns)
+
+    """
+    st = os.stat(filename)
+    return (os.path.abspath(filename),st.st_size,st.st_mtime_ns)
+
+
+def read_cache(cache_file,key):
+    """ read a pickled object from an on-disk cache file if the key
+    stored with it matches
+
+    Parameters
+    ----------
+    cache_file : str
+        the cache file name
+    key : object
+        the key that must match the stored key (see file_cache_key())
+
+    Returns
+    -------
+    object : object
+        the cached object or None if the cache file is missing, stale or
+        can't be read
+
+    """
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with open(cache_file,'rb') as f:
+            stored_key,obj = pickle.load(f)
+    except Exception as e:
+        warnings.warn("error reading cache file {0}: {1}".format(cache_file,str(e)),
+                      PyemuWarning)
+        return None
+    if stored_key != key:
+        return None
+    return obj
+
+
+def write_cache(cache_file,key,obj):
+    """ pickle an object along with its key to an on-disk cache file
+
+    Parameters
+    ----------
+    cache_file : str
+        the cache file name
+    key : object
+        the key to store with obj (see file_cache_key())
+    obj : object
+        the object to cache
+
+    """
+    tmp_file = cache_file + ".tmp"
+    try:
+        with open(tmp_file,'wb') as f:
+            pickle.dump((key,obj),f,protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file,cache_file)
+    except Exception as e:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        warnings.warn("error writing cache file {0}: {1}".format(cache_file,str(e)),
+                      PyemuWarning)
+
+
+def read_resfile(resfile,cache=False):
+        """load a residual file into a pandas.DataFrame.  The numeric
+        columns are read as float64 and the name and group columns as
+        lowercase strings
 
         Parameters
         ----------
         resfile : str
             residual file name
+        cache : bool or str
+            flag to use an on-disk cache of the parsed residuals.  If a str,
+            it is used as the cache file name, otherwise resfile + ".cache"
+            is used.  The cache is keyed on the path, size and modification
+            time of resfile.  Default is False
 
         Returns
         -------
@@ -132,6 +304,14 @@ def read_resfile(resfile):
         """
         assert os.path.exists(resfile),"read_resfile() error: resfile " +\
                                        "{0} not found".format(resfile)
+        if cache:
+            cache_file = cache if isinstance(cache,str) else resfile + ".cache"
+            key = file_cache_key(resfile)
+            res_df = read_cache(cache_file,key)
+            if res_df is not None:
+                if str(res_df.group.dtype) == "category":
+                    res_df["group"] = res_df.group.astype(object)
+                return res_df
         converters = {"name": str_con, "group": str_con}
         f = open(resfile, 'r')
         while True:
@@ -142,10 +322,33 @@ def read_resfile(resfile):
             if "name" in line.lower():
                 header = line.lower().strip().split()
                 break
-        res_df = pd.read_csv(f, header=None, names=header, sep="\s+",
+        start = f.tell()
+        dtype = {h:np.float64 for h in header}
+        dtype["name"] = str
+        dtype["group"] = "category"
+        try:
+            res_df = pd.read_csv(f, header=None, names=header, delim_whitespace=True,
+                                 dtype=dtype)
+            res_df.loc[:,"name"] = res_df.name.str.lower()
+            # groups are parsed as a categorical so that only the unique
+            # group names are lowercased, but are handed back as plain
+            # strings so that callers can assign new groups
+            groups = res_df.group.cat.categories.str.lower()
+            if groups.is_unique:
+                res_df["group"] = res_df.group.cat.\
+                    rename_categories(groups).astype(object)
+            else:
+                res_df["group"] = res_df.group.astype(str).str.lower()
+        except (ValueError,TypeError,AttributeError):
+            # something other than names, groups and numbers - use the
+            # slower generic parse
+            f.seek(start)
+            res_df = pd.read_csv(f, header=None, names=header, sep="\s+",
                                  converters=converters)
         res_df.index = res_df.name
         f.close()
+        if cache:
+            write_cache(cache_file,key,res_df)
         return res_df
 
 def res_from_en(pst,enfile):
@@ -240,6 +443,157 @@ def write_parfile(df,parfile):
                       index=False,
                       index_names=False) + '\n')
 
+def _run_threaded(func, items, num_workers=None, logger=None, label="files",
+                  processes=False):
+    """ private helper to map func over items using a pool of threads.  Results
+    are returned in the same order as items.  Progress is reported through
+    logger.statement() roughly every 10 percent
+
+    Parameters
+    ----------
+    func : callable
+        function to apply to each item
+    items : list
+        arguments for func
+    num_workers : int
+        number of threads to use.  If None, the number of cpus is used.
+        If 1, no threads are used
+    logger : pyemu.Logger
+        optional logger for progress reporting
+    label : str
+        the label to use in the progress messages
+    processes : bool
+        flag to use a pool of processes instead of threads for cpu-bound
+        work.  func and items must be picklable.  Default is False
+
+    Returns
+    -------
+    list : list
+        results of func for each item
+
+    """
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+    nitems = len(items)
+    report = max(1, nitems // 10)
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = max(1, min(int(num_workers), nitems))
+    results = []
+    if num_workers == 1:
+        mapped = map(func, items)
+        pool = None
+    elif processes:
+        pool = ProcessPoolExecutor(max_workers=num_workers)
+        mapped = pool.map(func, items, chunksize=max(1, nitems // (4 * num_workers)))
+    else:
+        pool = ThreadPoolExecutor(max_workers=num_workers)
+        mapped = pool.map(func, items)
+    try:
+        for i, r in enumerate(mapped):
+            results.append(r)
+            if logger is not None and ((i + 1) % report == 0 or i + 1 == nitems):
+                logger.statement("processed {0} of {1} {2}".format(i + 1, nitems, label))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
+
+
+def write_parfiles(df, vals, parfile_names, num_workers=None, logger=None):
+    """ bulk write pest parameter files.  The name, scale and offset columns
+    are rendered once and the values for each file are formatted as a
+    vector, with files written across a pool of threads
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        dataframe with 'parnme','scale' and 'offset' columns
+    vals : numpy.ndarray
+        parameter values, one row per parameter file, columns
+        in the same order as df
+    parfile_names : list
+        names of the parameter files to write (one per row of vals)
+    num_workers : int
+        number of threads to use.  If None, the number of cpus is used
+    logger : pyemu.Logger
+        optional logger for progress reporting
+
+    """
+    for col in ["parnme","scale","offset"]:
+        assert col in df.columns,"write_parfiles() error: " +\
+                                 "{0} not found in df".format(col)
+    vals = np.atleast_2d(np.array(vals, dtype=np.float64))
+    assert vals.shape == (len(parfile_names), df.shape[0]),\
+        "write_parfiles() error: vals shape {0} != ({1},{2})".\
+        format(vals.shape, len(parfile_names), df.shape[0])
+    names = np.array(["{0:20s} ".format(str(n)) for n in df.parnme])
+    tails = np.char.add(np.char.mod(" %20.7E", df.scale.values.astype(np.float64)),
+                        np.char.mod(" %20.7E\n", df.offset.values.astype(np.float64)))
+
+    def _write(i):
+        lines = np.char.add(np.char.add(names, np.char.mod("%20.7E", vals[i, :])), tails)
+        with open(parfile_names[i], 'w') as f:
+            f.write("single point\n")
+            f.write("".join(lines.tolist()))
+        return parfile_names[i]
+
+    _run_threaded(_write, list(range(len(parfile_names))), num_workers=num_workers,
+                  logger=logger, label="par files written")
+
+
+def read_parfiles(parfile_names, num_workers=None, logger=None):
+    """ bulk read pest parameter files across a pool of threads.
+
+    Parameters
+    ----------
+    parfile_names : list
+        names of the parameter files to read
+    num_workers : int
+        number of threads to use.  If None, the number of cpus is used
+    logger : pyemu.Logger
+        optional logger for progress reporting
+
+    Returns
+    -------
+    pandas.DataFrame : pandas.DataFrame
+        parameter values, one row per parameter file (indexed by position),
+        columns are the (lowercase) parameter names.  Parameters missing
+        from some files are filled with NaN
+    pandas.DataFrame : pandas.DataFrame
+        scale values in the same layout
+
+    """
+    for pfile in parfile_names:
+        assert os.path.exists(pfile), "read_parfiles() error: " + \
+                                      "file: {0} not found".format(pfile)
+
+    def _read(pfile):
+        with open(pfile, 'r') as f:
+            f.readline()
+            tokens = f.read().split()
+        if len(tokens) % 4 != 0:
+            raise Exception("read_parfiles() error: wrong number of " +\
+                            "entries in par file {0}".format(pfile))
+        tokens = np.array(tokens).reshape(-1, 4)
+        return np.char.lower(tokens[:, 0]), tokens[:, 1:3].astype(np.float64)
+
+    results = _run_threaded(_read, list(parfile_names), num_workers=num_workers,
+                            logger=logger, label="par files read")
+    if len(results) == 0:
+        return pd.DataFrame(), pd.DataFrame()
+    names = results[0][0]
+    if all([r[0].shape == names.shape and np.all(r[0] == names) for r in results]):
+        data = np.array([r[1] for r in results])
+        vals = pd.DataFrame(data=data[:, :, 0], columns=names)
+        scales = pd.DataFrame(data=data[:, :, 1], columns=names)
+    else:
+        vals = pd.DataFrame([pd.Series(r[1][:, 0], index=r[0]) for r in results])
+        scales = pd.DataFrame([pd.Series(r[1][:, 1], index=r[0]) for r in results])
+        vals.index = np.arange(len(results))
+        scales.index = vals.index
+    return vals, scales
+
+
 def parse_tpl_file(tpl_file):
     """ parse a pest template file to get the parameter names
 
@@ -286,7 +640,93 @@ def parse_tpl_file(tpl_file):
     return [p.strip() for p in list(par_names)]
 
 
-def write_input_files(pst):
+# parsed interface file names keyed on (parser name, file content digest)
+_io_names = {}
+_io_cache_key = ("pyemu interface file names", 1)
+
+
+def _file_digest(filename):
+    import hashlib
+    with open(filename,'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _parse_io_files(parser, files, num_workers=None, cache_file=None, logger=None,
+                    processes=False):
+    """ private helper to parse a list of template or instruction files with
+    parser, skipping files whose contents have already been parsed.  Files
+    are identified by a digest of their contents, so only new or changed files
+    are parsed.  If processes is True, the files are parsed in a pool of
+    processes instead of threads
+
+    """
+    for f in files:
+        assert os.path.exists(f),"interface file not found: "+str(f)
+    digests = _run_threaded(_file_digest, list(files), num_workers=num_workers)
+    keys = [(parser.__name__,d) for d in digests]
+    stored = {}
+    if cache_file is not None:
+        # the on-disk cache holds (digest, names) for each (parser, file path)
+        stored = read_cache(cache_file,_io_cache_key) or {}
+        for (name,_),(digest,names) in stored.items():
+            _io_names.setdefault((name,digest),names)
+    todo = {}
+    for f,k in zip(files,keys):
+        if k not in _io_names and k not in todo:
+            todo[k] = f
+    if len(todo) > 0:
+        if logger is not None:
+            logger.statement("parsing {0} of {1} {2} files".
+                             format(len(todo),len(files),parser.__name__))
+        results = _run_threaded(parser, list(todo.values()), num_workers=num_workers,
+                                logger=logger, label="interface files",
+                                processes=processes)
+        _io_names.update(zip(todo.keys(),results))
+    if cache_file is not None:
+        entries = {(parser.__name__,os.path.abspath(f)):(d,_io_names[k])
+                   for f,d,k in zip(files,digests,keys)}
+        if any(stored.get(p) != e for p,e in entries.items()):
+            stored.update(entries)
+            write_cache(cache_file,_io_cache_key,stored)
+    return [list(_io_names[k]) for k in keys]
+
+
+def parse_tpl_files(tpl_files, num_workers=None, cache_file=None, logger=None,
+                    processes=False):
+    """ parse many pest template files to get the parameter names in each.  Files
+    are parsed concurrently and the names are cached on the file contents so
+    unchanged files are not parsed again
+
+    Parameters
+    ----------
+    tpl_files : list
+        template file names
+    num_workers : int
+        number of workers to use.  If None, the number of cpus is used.
+        If 1, files are parsed serially.  Default is None
+    cache_file : str
+        optional on-disk cache of parsed names so that re-running setup
+        only parses new or changed files.  Default is None
+    logger : pyemu.Logger
+        optional logger for progress reporting
+    processes : bool
+        flag to parse the files in a pool of processes instead of threads.
+        This pays off for many large files, but scripts must then be
+        guarded with ``if __name__ == "__main__":`` on platforms that spawn
+        processes (e.g. Windows).  Default is False
+
+    Returns
+    -------
+    par_names : list
+        list of parameter name lists, one for each template file
+
+    """
+    return _parse_io_files(parse_tpl_file, tpl_files, num_workers=num_workers,
+                           cache_file=cache_file, logger=logger,
+                           processes=processes)
+
+
+def write_input_files(pst, num_workers=None):
     """write parameter values to a model input files using a template files with
     current parameter values (stored in Pst.parameter_data.parval1).
     This is a simple implementation of what PEST does.  It does not
@@ -296,15 +736,95 @@ def write_input_files(pst):
     ----------
     pst : (pyemu.Pst)
         a Pst instance
+    num_workers : int
+        number of threads to use to write the input files.  If None,
+        the number of cpus is used.  Default is None
 
     """
     par = pst.parameter_data
     par.loc[:,"parval1_trans"] = (par.parval1 * par.scale) + par.offset
-    for tpl_file,in_file in zip(pst.template_files,pst.input_files):
-        write_to_template(pst.parameter_data.parval1_trans,tpl_file,in_file)
+    parvals = pst.parameter_data.parval1_trans
+
+    def _write(files):
+        write_to_template(parvals,files[0],files[1])
+
+    _run_threaded(_write,list(zip(pst.template_files,pst.input_files)),
+                  num_workers=num_workers,label="input files written")
+
+
+# compiled template plans keyed by absolute template file name.  Each entry
+# holds the file_cache_key() of the template so edited templates are recompiled
+_tpl_plans = {}
+
+
+def compile_template(tpl_file):
+    """ compile a template file into a plan that can be filled with
+    parameter values without re-parsing the template.  Plans are cached
+    in memory and recompiled if the template file changes
+
+    Parameters
+    ----------
+    tpl_file : str
+        template file
+
+    Returns
+    -------
+    fmt : str
+        a %-style format string of the complete model input file with one
+        field (width and precision of the parameter space) per slot
+    names : numpy.ndarray
+        the unique (lowercase) parameter names in the template
+    slots : numpy.ndarray
+        the index into names of each field in fmt
+
+    """
+    key = file_cache_key(tpl_file)
+    cached = _tpl_plans.get(key[0],None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with open(tpl_file,'r') as f_tpl:
+        header = f_tpl.readline().strip().split()
+        assert header[0].lower() in ["ptf", "jtf"], \
+            "template file error: must start with [ptf,jtf], not:" + \
+            str(header[0])
+        assert len(header) == 2, \
+            "template file error: header line must have two entries: " + \
+            str(header)
+
+        marker = header[1]
+        assert len(marker) == 1, \
+            "template file error: marker must be a single character, not:" + \
+            str(marker)
+        pieces,slot_names = [],[]
+        for line in f_tpl:
+            if marker not in line:
+                pieces.append(line.replace('%','%%'))
+                continue
+            raw = line.rstrip().split(marker)
+            if len(raw) % 2 == 0:
+                raise Exception("template file error: unbalanced parameter " +
+                                "markers in {0} on line: {1}".\
+                                format(tpl_file,line.rstrip()))
+            for i,item in enumerate(raw):
+                if i % 2 == 0:
+                    pieces.append(item.replace('%','%%'))
+                    continue
+                # the parameter space includes the markers
+                w = len(item) + 2
+                d = 6 if w > 15 else 3
+                pieces.append("%{0}.{1}E".format(w,d))
+                slot_names.append(item.strip().lower())
+            pieces.append('\n')
+    slots,names = pd.factorize(np.array(slot_names,dtype=object))
+    plan = (''.join(pieces),np.asarray(names,dtype=object),slots)
+    _tpl_plans[key[0]] = (key,plan)
+    return plan
+
 
 def write_to_template(parvals,tpl_file,in_file):
-    """ write parameter values to model input files using template files
+    """ write parameter values to model input files using template files.
+    The template is compiled once (see compile_template()) and all
+    parameter spaces are filled with a single format operation
 
     Parameters
     ----------
@@ -316,47 +836,19 @@ def write_to_template(parvals,tpl_file,in_file):
         input file
 
     """
-    f_in = open(in_file,'w')
-    f_tpl = open(tpl_file,'r')
-    header = f_tpl.readline().strip().split()
-    assert header[0].lower() in ["ptf", "jtf"], \
-        "template file error: must start with [ptf,jtf], not:" + \
-        str(header[0])
-    assert len(header) == 2, \
-        "template file error: header line must have two entries: " + \
-        str(header)
-
-    marker = header[1]
-    assert len(marker) == 1, \
-        "template file error: marker must be a single character, not:" + \
-        str(marker)
-    for line in f_tpl:
-        if marker not in line:
-            f_in.write(line)
-        else:
-            line = line.rstrip()
-            par_names = line.lower().split(marker)[1::2]
-            par_names = [name.strip() for name in par_names]
-            start,end = get_marker_indices(marker,line)
-            assert len(par_names) == len(start)
-            new_line = line[:start[0]]
-            between = [line[e:s] for s,e in zip(start[1:],end[:-1])]
-            for i,name in enumerate(par_names):
-                s,e = start[i],end[i]
-                w = e - s
-                if w > 15:
-                    d = 6
-                else:
-                    d = 3
-                fmt = "{0:" + str(w)+"."+str(d)+"E}"
-                val_str = fmt.format(parvals[name])
-                new_line += val_str
-                if i != len(par_names) - 1:
-                    new_line += between[i]
-            new_line += line[end[-1]:]
-            f_in.write(new_line+'\n')
-    f_tpl.close()
-    f_in.close()
+    fmt,names,slots = compile_template(tpl_file)
+    if isinstance(parvals,pd.Series):
+        idx = parvals.index.get_indexer(names)
+        if np.any(idx < 0):
+            missing = names[idx < 0]
+            raise Exception("write_to_template() error: {0} parameters in {1} "
+                            "not found in parvals: {2}".\
+                            format(len(missing),tpl_file,','.join(missing[:10])))
+        vals = parvals.values[idx].astype(np.float64)
+    else:
+        vals = np.array([parvals[name] for name in names],dtype=np.float64)
+    with open(in_file,'w') as f_in:
+        f_in.write(fmt % tuple(vals[slots].tolist()))
 
 
 def get_marker_indices(marker,line):
@@ -419,6 +911,41 @@ def parse_ins_file(ins_file):
     return obs_names
 
 
+def parse_ins_files(ins_files, num_workers=None, cache_file=None, logger=None,
+                    processes=False):
+    """ parse many pest instruction files to get the observation names in each.
+    Files are parsed concurrently and the names are cached on the file contents
+    so unchanged files are not parsed again
+
+    Parameters
+    ----------
+    ins_files : list
+        instruction file names
+    num_workers : int
+        number of workers to use.  If None, the number of cpus is used.
+        If 1, files are parsed serially.  Default is None
+    cache_file : str
+        optional on-disk cache of parsed names so that re-running setup
+        only parses new or changed files.  Default is None
+    logger : pyemu.Logger
+        optional logger for progress reporting
+    processes : bool
+        flag to parse the files in a pool of processes instead of threads.
+        This pays off for many large files, but scripts must then be
+        guarded with ``if __name__ == "__main__":`` on platforms that spawn
+        processes (e.g. Windows).  Default is False
+
+    Returns
+    -------
+    obs_names : list
+        list of observation name lists, one for each instruction file
+
+    """
+    return _parse_io_files(parse_ins_file, ins_files, num_workers=num_workers,
+                           cache_file=cache_file, logger=logger,
+                           processes=processes)
+
+
 def parse_ins_string(string):
     """ split up an instruction file line to get the observation names
 
@@ -460,6 +987,396 @@ def parse_ins_string(string):
     return obs_names
 
 
+class InstructionFile(object):
+    """a compiled pest instruction file.  The instructions are parsed once
+    into an execution plan that can then be applied to any number of
+    model output files.  Supports line advance (l), primary and secondary
+    markers, whitespace (w), tab (t), fixed ([]), semi-fixed (()) and
+    non-fixed (!!) observations, dum observations and continuation (&)
+
+    Parameters
+    ----------
+    ins_filename : str
+        instruction file name
+
+    Note
+    ----
+    use compile_instructions() to get a cached instance
+
+    """
+    _blanks = " \t"
+
+    def __init__(self, ins_filename):
+        self.ins_filename = ins_filename
+        self.plan = []
+        self.obs_names = []
+        with open(ins_filename,'r') as f:
+            header = f.readline().strip().split()
+            if len(header) != 2 or header[0].lower() not in ["pif","jif"]:
+                raise Exception("instruction file error: header must be " +
+                                "'pif <marker>', not: {0}".format(' '.join(header)))
+            self.marker = header[1]
+            if len(self.marker) != 1:
+                raise Exception("instruction file error: marker must be a " +
+                                "single character, not:" + str(self.marker))
+            for iline,line in enumerate(f):
+                ops = self._compile_line(line,iline + 2)
+                if len(ops) > 0:
+                    self.plan.append([iline + 2,ops,None])
+        # lines of just a line advance, w and !obs! items (the vast majority)
+        # are precompiled into the whitespace-token positions to read
+        patterns = {}
+        for i,entry in enumerate(self.plan):
+            ops = entry[1]
+            if ops[0][0] != "l":
+                continue
+            if i + 1 < len(self.plan) and self.plan[i + 1][1][0][0] == "&":
+                continue
+            pattern = tuple([op[0] if op[0] != "free" else op[1] == "dum"
+                             for op in ops])
+            if pattern not in patterns:
+                if all([op[0] in ["w","free"] for op in ops[1:]]):
+                    patterns[pattern] = (self._token_reads(ops,True),
+                                         self._token_reads(ops,False))
+                else:
+                    patterns[pattern] = None
+            if patterns[pattern] is not None:
+                entry[2] = (ops[0][1],) + patterns[pattern]
+
+    def _error(self,msg,iline):
+        return Exception("InstructionFile error in {0}, instruction line {1}: {2}".\
+                         format(self.ins_filename,iline,msg))
+
+    @staticmethod
+    def _token_reads(ops,adjacent):
+        """ get the whitespace-token positions read by a line of w and !obs!
+        items.  adjacent is True if the output line starts with a
+        non-blank character (so the first w skips the first token)
+
+        Returns
+        -------
+        reads : list
+            token positions of the (non-dum) observations
+        need : int
+            the number of tokens the output line must have
+
+        """
+        k,need,reads = 0,0,[]
+        for op in ops[1:]:
+            if op[0] == "w":
+                if adjacent:
+                    k += 1
+                adjacent = True
+                need = max(need,k + 1)
+            else:
+                if op[1] != "dum":
+                    reads.append(k)
+                k += 1
+                adjacent = False
+                need = max(need,k)
+        return reads,need
+
+    def _tokenize(self,line,iline):
+        """split an instruction line into items, keeping markers (which can
+        contain spaces) whole"""
+        if self.marker not in line:
+            return [(False,item) for item in line.split()]
+        items = []
+        i,n = 0,len(line)
+        while i < n:
+            c = line[i]
+            if c in self._blanks or c in "\r\n":
+                i += 1
+            elif c == self.marker:
+                j = line.find(self.marker,i + 1)
+                if j < 0:
+                    raise self._error("unbalanced marker",iline)
+                items.append((True,line[i + 1:j]))
+                i = j + 1
+            else:
+                j = i
+                while j < n and line[j] not in self._blanks + "\r\n" + self.marker:
+                    j += 1
+                items.append((False,line[i:j]))
+                i = j
+        return items
+
+    def _compile_line(self,line,iline):
+        ops = []
+        items = self._tokenize(line,iline)
+        for i,(is_marker,item) in enumerate(items):
+            if is_marker:
+                if len(item) == 0:
+                    raise self._error("empty marker",iline)
+                ops.append(("pm" if i == 0 else "sm",item))
+                continue
+            low = item.lower()
+            c = low[0]
+            # the common items first
+            if c == '!' and len(low) > 2 and low[-1] == '!':
+                name = low[1:-1]
+                ops.append(("free",name))
+                if name != "dum":
+                    self.obs_names.append(name)
+            elif low == 'w':
+                ops.append(("w",))
+            elif i == 0 and c == '&':
+                ops.append(("&",))
+                if len(low) > 1:
+                    raise self._error("'&' must be a separate item",iline)
+            elif c == 'l' and low[1:].isdigit():
+                if i != 0:
+                    raise self._error("line advance must be the first item",iline)
+                ops.append(("l",int(low[1:])))
+            elif c == 't' and low[1:].isdigit():
+                ops.append(("t",int(low[1:])))
+            elif c in "[(":
+                close = ']' if c == '[' else ')'
+                j = low.find(close)
+                try:
+                    start,end = [int(v) for v in low[j + 1:].split(':')]
+                except Exception:
+                    raise self._error("bad column range in '{0}'".format(item),iline)
+                if j < 0 or start < 1 or end < start:
+                    raise self._error("bad observation item '{0}'".format(item),iline)
+                name = low[1:j]
+                ops.append(("fixed" if c == '[' else "semi",name,start,end))
+                self._add_name(name)
+            else:
+                raise self._error("unrecognized instruction '{0}'".format(item),iline)
+        if len(ops) > 0 and ops[0][0] not in ["l","pm","&"]:
+            raise self._error("instruction line must start with a line " +
+                              "advance, a primary marker or '&'",iline)
+        return ops
+
+    def _add_name(self,name):
+        if name != "dum":
+            self.obs_names.append(name)
+
+    @staticmethod
+    def _to_float(s):
+        return float(s.strip().replace('d','e').replace('D','E'))
+
+    def read_output_file(self,output_file):
+        """ apply the instructions to a model output file
+
+        Parameters
+        ----------
+        output_file : str
+            model output file name
+
+        Returns
+        -------
+        pandas.Series : pandas.Series
+            observation values indexed by observation name, in
+            instruction file order
+
+        """
+        with open(output_file,'r') as f:
+            lines = f.read().splitlines()
+        blanks = self._blanks
+        nlines = len(lines)
+        vals = []
+        li,cur = -1,-1
+        line = ''
+
+        def _fail(msg,iline):
+            return Exception(("InstructionFile error applying {0} to {1} " +
+                              "(instruction line {2}, output line {3}): {4}").\
+                             format(self.ins_filename,output_file,iline,li + 1,msg))
+
+        to_float = self._to_float
+        for iline,ops,fast in self.plan:
+            if fast is not None:
+                li += fast[0]
+                if li >= nlines:
+                    raise _fail("end of file reached",iline)
+                line = lines[li]
+                reads,need = fast[1] if len(line) > 0 and line[0] not in blanks \
+                    else fast[2]
+                tokens = line.split()
+                if len(tokens) < need:
+                    raise _fail("end of line reached",iline)
+                try:
+                    vals.extend([float(tokens[i]) for i in reads])
+                except ValueError:
+                    # fortran-style exponents or a bad value
+                    for i in reads:
+                        try:
+                            vals.append(to_float(tokens[i]))
+                        except Exception:
+                            raise _fail("error reading '{0}'".format(tokens[i]),iline)
+                continue
+            for iop,op in enumerate(ops):
+                code = op[0]
+                if code == "l":
+                    li += op[1]
+                    if li >= nlines:
+                        raise _fail("end of file reached",iline)
+                    line,cur = lines[li],-1
+                elif code == "pm":
+                    for j in range(li + 1,nlines):
+                        idx = lines[j].find(op[1])
+                        if idx >= 0:
+                            break
+                    else:
+                        raise _fail("primary marker '{0}' not found".format(op[1]),iline)
+                    li,line = j,lines[j]
+                    cur = idx + len(op[1]) - 1
+                elif code == "sm":
+                    idx = line.find(op[1],cur + 1)
+                    if idx < 0:
+                        raise _fail("secondary marker '{0}' not found".format(op[1]),iline)
+                    cur = idx + len(op[1]) - 1
+                elif code == "w":
+                    i,n = cur + 1,len(line)
+                    while i < n and line[i] not in blanks:
+                        i += 1
+                    while i < n and line[i] in blanks:
+                        i += 1
+                    if i >= n:
+                        raise _fail("end of line reached on 'w'",iline)
+                    cur = i - 1
+                elif code == "t":
+                    if op[1] > len(line):
+                        raise _fail("tab past end of line",iline)
+                    cur = op[1] - 1
+                elif code == "fixed":
+                    s = line[op[2] - 1:op[3]]
+                    cur = op[3] - 1
+                    if op[1] != "dum":
+                        try:
+                            vals.append(to_float(s))
+                        except Exception:
+                            raise _fail("error reading '{0}' for {1}".format(s,op[1]),iline)
+                elif code in ["semi","free"]:
+                    n = len(line)
+                    if code == "semi":
+                        i = op[2] - 1
+                        if i >= n:
+                            raise _fail("line too short for {0}".format(op[1]),iline)
+                        if line[i] in blanks:
+                            while i < n and line[i] in blanks:
+                                i += 1
+                            if i >= min(n,op[3]):
+                                raise _fail("no number in columns for {0}".\
+                                            format(op[1]),iline)
+                        else:
+                            while i > 0 and line[i - 1] not in blanks:
+                                i -= 1
+                    else:
+                        i = cur + 1
+                        while i < n and line[i] in blanks:
+                            i += 1
+                        if i >= n:
+                            raise _fail("end of line reached reading {0}".\
+                                        format(op[1]),iline)
+                    j = i
+                    while j < n and line[j] not in blanks:
+                        j += 1
+                    # a following secondary marker can terminate the number
+                    if iop + 1 < len(ops) and ops[iop + 1][0] == "sm":
+                        k = line.find(ops[iop + 1][1],i,j)
+                        if k > i:
+                            j = k
+                    s = line[i:j]
+                    cur = j - 1
+                    if op[1] != "dum":
+                        try:
+                            vals.append(to_float(s))
+                        except Exception:
+                            raise _fail("error reading '{0}' for {1}".format(s,op[1]),iline)
+        return pd.Series(vals,index=self.obs_names,dtype=np.float64)
+
+
+# compiled instruction files keyed by absolute file name.  Each entry
+# holds the file_cache_key() of the instruction file so edits are recompiled
+_ins_plans = {}
+
+
+def compile_instructions(ins_file):
+    """ get a compiled (and cached) InstructionFile instance.  The instance
+    is recompiled if the instruction file changes
+
+    Parameters
+    ----------
+    ins_file : str
+        instruction file name
+
+    Returns
+    -------
+    InstructionFile : InstructionFile
+
+    """
+    key = file_cache_key(ins_file)
+    cached = _ins_plans.get(key[0],None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    ins = InstructionFile(ins_file)
+    _ins_plans[key[0]] = (key,ins)
+    return ins
+
+
+def read_output_file(ins_file,out_file):
+    """ read a model output file with an instruction file
+
+    Parameters
+    ----------
+    ins_file : str
+        instruction file name
+    out_file : str
+        model output file name
+
+    Returns
+    -------
+    pandas.Series : pandas.Series
+        observation values indexed by observation name
+
+    """
+    return compile_instructions(ins_file).read_output_file(out_file)
+
+
+def process_output_files(pst,pst_path='.',num_workers=None,logger=None):
+    """ read all the model output files listed in a control file with
+    the native instruction engine
+
+    Parameters
+    ----------
+    pst : pyemu.Pst
+        a control file instance
+    pst_path : str
+        path to prepend to the instruction and output file names.
+        Default is '.'
+    num_workers : int
+        number of threads to use.  If None, the number of cpus is used
+    logger : pyemu.Logger
+        optional logger for progress reporting
+
+    Returns
+    -------
+    pandas.Series : pandas.Series
+        simulated values aligned with pst.obs_names.  Observations not
+        found in any instruction file are NaN
+
+    """
+    pairs = [(os.path.join(pst_path,i),os.path.join(pst_path,o)) for i,o
+             in zip(pst.instruction_files,pst.output_files)]
+    results = _run_threaded(lambda pair: read_output_file(*pair),pairs,
+                            num_workers=num_workers,logger=logger,
+                            label="output files read")
+    if len(results) == 0:
+        sim = pd.Series([],dtype=np.float64)
+    else:
+        sim = pd.concat(results)
+    sim = sim.loc[~sim.index.duplicated(keep="last")]
+    sim = sim.reindex(pst.obs_names)
+    missing = sim.index[sim.isnull()]
+    if len(missing) > 0:
+        warnings.warn("process_output_files(): {0} observations not read: {1}".\
+                      format(len(missing),','.join(missing[:10])),PyemuWarning)
+    return sim
+
+
 def populate_dataframe(index,columns, default_dict, dtype):
     """ helper function to populate a generic Pst dataframe attribute.  This
     function is called as part of constructing a generic Pst instance
@@ -575,86 +1492,83 @@ def pst_from_io_files(tpl_files,in_files,ins_files,out_files,pst_filename=None):
                               pst_filename=pst_filename)
 
 
-def try_run_inschek(pst):
-    """ attempt to run INSCHEK for each instruction file, model output
-    file pair in a pyemu.Pst.  If the run is successful, the INSCHEK written
-    .obf file is used to populate the pst.observation_data.obsval attribute
+def try_run_inschek(pst,num_workers=None,processes=False):
+    """ attempt to read each model output file in a pyemu.Pst with the
+    native instruction engine (see InstructionFile), falling back to
+    running INSCHEK if that fails.  If successful, the values read
+    are used to populate the pst.observation_data.obsval attribute
 
     Parameters
     ----------
     pst : (pyemu.Pst)
+    num_workers : int
+        number of workers to use to read the output files.  If None,
+        the number of cpus is used.  Default is None
+    processes : bool
+        flag to read the output files in a pool of processes instead of
+        threads.  Scripts must then be guarded with
+        ``if __name__ == "__main__":`` on platforms that spawn processes
+        (e.g. Windows).  Default is False
 
     """
-    for ins_file,out_file in zip(pst.instruction_files,pst.output_files):
-        df = _try_run_inschek(ins_file,out_file)
-        if df is not None:
-            pst.observation_data.loc[df.index, "obsval"] = df.obsval
+    pairs = list(zip(pst.instruction_files,pst.output_files))
+    dfs = _run_threaded(_read_obsvals,pairs,num_workers=num_workers,
+                        processes=processes)
+    dfs = [df for df in dfs if df is not None]
+    if len(dfs) > 0:
+        df = pd.concat(dfs)
+        pst.observation_data.loc[df.index, "obsval"] = df.obsval.values
 
 
-def try_process_ins_file(ins_file,out_file=None):
-    assert os.path.exists(ins_file),"instruction file {0} not found".format(ins_file)
+def _read_obsvals(pair):
+    ins_file,out_file = pair
     try:
-        obs_names = parse_ins_file(ins_file)
+        sim = read_output_file(ins_file,out_file)
+        return pd.DataFrame({"obsval":sim.values},index=sim.index)
     except Exception as e:
-        raise Exception("error parsing ins file {0} for obs names: {1}".format(ins_file,str(e)))
+        return _try_run_inschek(ins_file,out_file)
+
+
+def try_process_ins_file(ins_file,out_file=None):
+    """ try to read a model output file with the native instruction
+    engine (see InstructionFile)
+
+    Parameters
+    ----------
+    ins_file : str
+        instruction file name
+    out_file : str
+        model output file name. If None, ins_file without the .ins
+        extension is used
+
+    Returns
+    -------
+    pandas.DataFrame : pandas.DataFrame
+        dataframe with obsnme and obsval columns.  If the output file
+        can't be processed, only obsnme is populated
+
+    """
+    assert os.path.exists(ins_file),"instruction file {0} not found".format(ins_file)
+
+    def _names_only():
+        try:
+            obs_names = parse_ins_file(ins_file)
+        except Exception as e:
+            raise Exception("error parsing ins file {0} for obs names: {1}".format(ins_file,str(e)))
+        return pd.DataFrame({"obsnme":obs_names},index=obs_names)
 
     if out_file is None:
         out_file = ins_file.replace(".ins","")
     if not os.path.exists(out_file):
         print("out file {0} not found".format(out_file))
-        return pd.DataFrame({"obsnme":obs_names},index="obsnme")
+        return _names_only()
     try:
-        f_ins = open(ins_file,'r')
-        f_out = open(out_file,'r')
-
-        header = f_ins.readline().lower().strip().split()
-        assert header[0] == "pif"
-        marker = header[1]
-        icount,ocount = 1,0
-        obsnme,obsval = [],[]
-        for iline in f_ins:
-            iraw = iline.lower().strip().split()
-            if iraw[0][0] != 'l':
-                raise Exception("not support instruction:{0}".format(iraw[0]))
-            num_lines = int(iraw[0][1:])
-            for i in range(num_lines):
-                oline = f_out.readline().lower().strip()
-                ocount += 1
-            if '(' in oline:
-                raise Exception("semi-fixed obs index instructions not supported")
-            elif '[' in oline:
-                raise Exception("fixed obs index instructions not supported")
-            elif marker in oline:
-                raise Exception("marker-based file seeking not supported")
-            oraw = oline.strip().split()
-            if oline[0] in [' ','   ']:
-                oraw.insert(0,'')
-            oc = 0
-            for ir in iraw[1:]:
-                if ir == 'w':
-                    oc += 1
-                    if oc > len(oraw):
-                        raise Exception("out file line {0} too short".format(ocount))
-                elif '!' in ir:
-                    n = ir.replace('!','')
-                    try:
-                        v = float(oraw[oc])
-                    except Exception as e:
-                        raise Exception("error processing ins {0} for obs {1}, string: {2} on line {3} (ins line {4}):{5}".
-                                        format(ir,n,oline,ocount,icount,str(e)))
-                    obsnme.append(n)
-                    obsval.append(v)
-                    oc += 1
-
-        f_ins.close()
-        f_out.close()
-        df = pd.DataFrame({"obsnme":obsnme,"obsval":obsval},index=obsnme)
-
-        return df
+        sim = read_output_file(ins_file,out_file)
     except Exception as e:
         print("error processing ins file {0}: {1}".format(ins_file,str(e)))
-        return pd.DataFrame({"obsnme":obs_names},index=obs_names)
-
+        return _names_only()
+    return pd.DataFrame({"obsnme":sim.index.values,"obsval":sim.values},
+                        index=sim.index.values)
 
 
 def _try_run_inschek(ins_file,out_file,cwd='.'):
@@ -674,6 +1588,43 @@ def _try_run_inschek(ins_file,out_file,cwd='.'):
         return None
 
 
+def calc_phi_components(residuals, weights, group_codes, ngroups):
+    """vectorized calculation of the phi contribution of each group for
+    one or more residual vectors.  Group membership is passed as integer
+    codes so the reduction is a single bincount
+
+    Parameters
+    ----------
+    residuals : numpy.ndarray
+        residuals.  Either a vector of length nobs or an array of
+        shape (nreal, nobs)
+    weights : numpy.ndarray
+        weights, length nobs
+    group_codes : numpy.ndarray
+        integer group code (0 <= code < ngroups) of each observation, length nobs
+    ngroups : int
+        the number of groups
+
+    Returns
+    -------
+    phi : numpy.ndarray
+        array of shape (nreal, ngroups) of phi contributions
+
+    """
+    swr = (np.atleast_2d(residuals) * np.asarray(weights,dtype=float)) ** 2
+    nreal = swr.shape[0]
+    group_codes = np.asarray(group_codes,dtype=np.int64)
+    if swr.shape[1] != group_codes.shape[0]:
+        raise Exception("calc_phi_components() error: residuals have {0} "
+                        "columns but there are {1} group codes".\
+                        format(swr.shape[1],group_codes.shape[0]))
+    # offset the codes of each realization so one bincount does all of them
+    idx = group_codes[None,:] + ngroups * np.arange(nreal,dtype=np.int64)[:,None]
+    phi = np.bincount(idx.ravel(), weights=swr.ravel(),
+                      minlength=nreal * ngroups)
+    return phi.reshape(nreal, ngroups)
+
+
 def get_phi_comps_from_recfile(recfile):
     """read the phi components from a record file by iteration
 
@@ -690,25 +1641,25 @@ def get_phi_comps_from_recfile(recfile):
     """
     iiter = 1
     iters = {}
-    f = open(recfile,'r')
-    while True:
-        line = f.readline()
-        if line == '':
-            break
-        if "starting phi for this iteration" in line.lower() or \
-            "final phi" in line.lower():
+    with open(recfile,'r') as f:
+        lines = f.read().lower().splitlines()
+    nlines = len(lines)
+    i = 0
+    while i < nlines:
+        line = lines[i]
+        i += 1
+        if "starting phi for this iteration" in line or "final phi" in line:
             contributions = {}
-            while True:
-                line = f.readline()
-                if line == '':
-                    break
-                if "contribution to phi" not in line.lower():
+            while i < nlines:
+                line = lines[i]
+                i += 1
+                if "contribution to phi" not in line:
                     iters[iiter] = contributions
                     iiter += 1
                     break
                 raw = line.strip().split()
                 val = float(raw[-1])
-                group = raw[-3].lower().replace('\"', '')
+                group = raw[-3].replace('\"', '')
                 contributions[group] = val
     return iters
 
@@ -7,6 +7,7 @@ import numpy as np
 import pandas as pd
 from pyemu.la import LinearAnalysis
 from pyemu.mat import Cov, Matrix
+from pyemu.pst.pst_utils import _run_threaded
 
 class Schur(LinearAnalysis):
     """derived type for prior and posterior uncertainty and data-worth
@@ -73,6 +74,9 @@ class Schur(LinearAnalysis):
         ----
         returns a reference
 
+        if cache_dir was passed, the posterior parameter covariance matrix is
+        loaded from (or written to) the on-disk cache
+
         Example
         -------
         ``>>>import pyemu``
@@ -89,6 +93,12 @@ class Schur(LinearAnalysis):
             return self.__posterior_parameter
         else:
             self.clean()
+            entry = self._cache_entry("posterior_parameter",
+                                      [self.jco, self.obscov, self.parcov])
+            state = self._read_cache(entry)
+            if state is not None:
+                self.__posterior_parameter = state["posterior_parameter"]
+                return self.__posterior_parameter
             self.log("Schur's complement")
             try:
                 pinv = self.parcov.inv
@@ -107,6 +117,8 @@ class Schur(LinearAnalysis):
             self.__posterior_parameter = Cov(r.x, row_names=r.row_names,
                                              col_names=r.col_names)
             self.log("Schur's complement")
+            self._write_cache(entry, {"posterior_parameter":
+                                      self.__posterior_parameter})
             return self.__posterior_parameter
 
     @property
@@ -203,12 +215,7 @@ class Schur(LinearAnalysis):
         else:
             if self.predictions is not None:
                 self.log("propagating posterior to predictions")
-
-                post_cov = self.predictions.T *\
-                            self.posterior_parameter * self.predictions
-                self.__posterior_prediction = {n:v for n,v in
-                                          zip(post_cov.row_names,
-                                              np.diag(post_cov.x))}
+                self.__posterior_prediction = self.propagate(self.posterior_parameter)
                 self.log("propagating posterior to predictions")
             else:
                 self.__posterior_prediction = {}
@@ -251,15 +258,17 @@ class Schur(LinearAnalysis):
         ``>>>plt.show()``
 
         """
-        prior_mat = self.parcov.get(self.posterior_parameter.col_names)
-        if prior_mat.isdiagonal:
-            prior = prior_mat.x.flatten()
+        par_names = self.posterior_parameter.col_names
+        # just the diagonals - no need to copy out the full prior
+        if self.parcov.isdiagonal:
+            prior = self.parcov.x.flatten()
         else:
-            prior = np.diag(prior_mat.x)
+            prior = np.diag(self.parcov.x)
+        prior = pd.Series(prior,index=self.parcov.col_names).loc[par_names].values
         post = np.diag(self.posterior_parameter.x)
         if include_map:
             par_data = self.map_parameter_estimate
-            prior = pd.DataFrame(data=prior,index=prior_mat.col_names)
+            prior = pd.DataFrame(data=prior,index=par_names)
             islog = self.pst.parameter_data.partrans == "log"
             par_data.loc[islog,:] = np.log10(par_data.loc[islog,:])
             par_data.loc[:,"prior_stdev"] = prior
@@ -337,35 +346,93 @@ class Schur(LinearAnalysis):
             return df
         return pd.DataFrame(sum,index=self.prior_forecast.keys())
 
-    def __contribution_from_parameters(self, parameter_names):
-        """private method get the prior and posterior uncertainty reduction as a result of
-        some parameter becoming perfectly known
+    def __conditional_forecast_variances(self, case_parlists, num_workers=1):
+        """private method to get the prior and posterior forecast variances
+        conditional on perfect knowledge of each list of parameters in
+        case_parlists.  Conditioning the prior and posterior parameter
+        covariance matrices on the known parameters (k) is a partitioned
+        solve against the k-by-k block, so each case only needs a factorization
+        of that block and the products of the full matrices with the
+        predictions, which are formed once for all cases
 
         Parameters
         ----------
-        parameter_names : list
-            parameter that are perfectly known
+        case_parlists : list
+            list of lists of parameters that are perfectly known
+        num_workers : int
+            number of threads to use to evaluate the cases.  Default is 1
 
         Returns
         -------
-        dict : dict
-            dictionary of forecast name,  [prior uncertainty w/o parameter_names,
-                % posterior uncertainty w/o parameter names]
+        case_priors : numpy.ndarray
+            conditional prior forecast variances, one row per case and one
+            column per forecast (self.predictions.col_names)
+        case_posts : numpy.ndarray
+            conditional posterior forecast variances
 
         Note
         ----
-        this method is used by get_parameter_contribution() method - don't
-        call this method directly
+        equivalent to the prior_forecast and posterior_forecast of
+        get_conditional_instance() for each case
 
         """
-
-
-        #get the prior and posterior for the base case
-        bprior,bpost = self.prior_prediction, self.posterior_prediction
-        #get the prior and posterior for the conditioned case
-        la_cond = self.get_conditional_instance(parameter_names)
-        cprior,cpost = la_cond.prior_prediction, la_cond.posterior_prediction
-        return cprior,cpost
+        par_names = self.predictions.row_names
+        par_idx = {pname:i for i,pname in enumerate(par_names)}
+        case_idxs = []
+        for par_list in case_parlists:
+            if not isinstance(par_list, list):
+                par_list = [par_list]
+            idx = []
+            for name in par_list:
+                name = str(name).lower()
+                assert name in par_idx,\
+                    "contribution parameter " + name + " not found jco"
+                idx.append(par_idx[name])
+            idx = np.unique(idx)
+            if idx.shape[0] == len(par_names):
+                raise Exception("Schur.contribution_from_Parameters " +
+                                "atleast one parameter must remain uncertain")
+            case_idxs.append(idx)
+
+        y = self.predictions.x
+        stats = []
+        for cov in [self.parcov, self.posterior_parameter]:
+            if cov.isdiagonal:
+                c = cov.get(par_names).x.flatten()
+                cy = c[:,np.newaxis] * y
+            else:
+                c = cov.get(par_names).x
+                cy = np.dot(c, y)
+            stats.append((c, cy, (y * cy).sum(axis=0)))
+
+        def _case(ic):
+            k = case_idxs[ic]
+            yk = y[k,:]
+            case_vars = []
+            for c,cy,var in stats:
+                if c.ndim == 1:
+                    case_vars.append(var - (cy[k,:] * yk).sum(axis=0))
+                    continue
+                ckk = c[np.ix_(k,k)]
+                ckky = np.dot(ckk, yk)
+                # the (known) rows of cov * predictions with the known rows
+                # of the predictions zeroed
+                g = cy[k,:] - ckky
+                case_var = var - (yk * (cy[k,:] + g)).sum(axis=0)
+                try:
+                    h = np.linalg.solve(np.linalg.cholesky(ckk), g)
+                    case_vars.append(case_var - (h * h).sum(axis=0))
+                except np.linalg.LinAlgError:
+                    case_vars.append(case_var - (g * np.linalg.solve(ckk, g)).sum(axis=0))
+            return case_vars
+
+        results = _run_threaded(_case, list(range(len(case_idxs))),
+                                num_workers=num_workers, logger=self.logger,
+                                label="cases")
+        nfore = self.predictions.shape[1]
+        case_priors = np.array([r[0] for r in results]).reshape(-1, nfore)
+        case_posts = np.array([r[1] for r in results]).reshape(-1, nfore)
+        return case_priors, case_posts
 
     def get_conditional_instance(self, parameter_names):
         """ get a new Schur instance that includes conditional update from
@@ -417,7 +484,8 @@ class Schur(LinearAnalysis):
                         obscov=self.obscov, predictions=cond_preds,verbose=False)
         return la_cond
 
-    def get_par_contribution(self,parlist_dict=None,include_prior_results=False):
+    def get_par_contribution(self,parlist_dict=None,include_prior_results=False,
+                             num_workers=1):
         """get a dataframe the prior and posterior uncertainty
         reduction as a result of some parameter becoming perfectly known
 
@@ -432,6 +500,9 @@ class Schur(LinearAnalysis):
         include_prior_results : bool
             flag to return a multi-indexed dataframe with both conditional
             prior and posterior forecast uncertainty estimates.  Default is False
+        num_workers : int
+            number of threads to use to evaluate the entries in parlist_dict.
+            Default is 1
 
         Returns
         -------
@@ -472,20 +543,17 @@ class Schur(LinearAnalysis):
             results[(forecast,"prior")] = [pr]
             results[(forecast,"post")] = [pt]
             #results[(forecast,"percent_reduce")] = [reduce]
+        case_parlists = []
         for case_name,par_list in parlist_dict.items():
             if len(par_list) == 0:
                 continue
             names.append(case_name)
-            self.log("calculating contribution from: " + str(par_list))
-            case_prior,case_post = self.__contribution_from_parameters(par_list)
-            self.log("calculating contribution from: " + str(par_list))
-            for forecast in case_prior.keys():
-                pr = case_prior[forecast]
-                pt = case_post[forecast]
-                #reduce = 100.0 * ((pr - pt) / pr)
-                results[(forecast, "prior")].append(pr)
-                results[(forecast, "post")].append(pt)
-                #results[(forecast, "percent_reduce")].append(reduce)
+            case_parlists.append(par_list)
+        case_priors,case_posts = self.__conditional_forecast_variances(case_parlists,
+                                                                       num_workers=num_workers)
+        for i,forecast in enumerate(self.predictions.col_names):
+            results[(forecast, "prior")].extend(list(case_priors[:,i]))
+            results[(forecast, "post")].extend(list(case_posts[:,i]))
 
         df = pd.DataFrame(results,index=names)
         #base = df.loc["base",df.columns.get_level_values(1)=="post"]
@@ -498,7 +566,7 @@ class Schur(LinearAnalysis):
             df = df.xs("post", level=1, drop_level=True, axis=1)
             return df
 
-    def get_par_group_contribution(self, include_prior_results=False):
+    def get_par_group_contribution(self, include_prior_results=False, num_workers=1):
         """get the forecast uncertainty contribution from each parameter
         group.  Just some sugar for get_contribution_dataframe() - this method
         automatically constructs the parlist_dict argument where the keys are the
@@ -509,7 +577,8 @@ class Schur(LinearAnalysis):
         include_prior_results : bool
             flag to return a multi-indexed dataframe with both conditional
             prior and posterior forecast uncertainty estimates.  Default is False
-
+        num_workers : int
+            number of threads to use to evaluate the groups.  Default is 1
 
         Returns
         -------
@@ -529,7 +598,8 @@ class Schur(LinearAnalysis):
             #pargrp_dict[grp] = list(par.loc[idxs,"parnme"])
             pargrp_dict[grp] = [pname for pname in list(par.loc[idxs,"parnme"])
                                 if pname in self.jco.col_names and pname in self.parcov.row_names]
-        return self.get_par_contribution(pargrp_dict,include_prior_results=include_prior_results)
+        return self.get_par_contribution(pargrp_dict,include_prior_results=include_prior_results,
+                                         num_workers=num_workers)
 
     def get_added_obs_importance(self,obslist_dict=None,base_obslist=None,
                                  reset_zero_weight=False):
@@ -582,6 +652,30 @@ class Schur(LinearAnalysis):
 
         """
 
+        obslist_dict,base_obslist,org = self.__added_obs_setup(obslist_dict,
+                                                               base_obslist,
+                                                               reset_zero_weight)
+        names,case_obslists = self.__added_obs_cases(obslist_dict,base_obslist)
+        self.log("calculating importance of observations by adding")
+        base_post,case_posts = self.__added_obs_posterior(base_obslist,
+                                                          case_obslists)
+        self.log("calculating importance of observations by adding")
+        df = pd.DataFrame(np.vstack([base_post,case_posts]),index=["base"] + names,
+                          columns=self.predictions.col_names)
+
+        if org is not None:
+            self.reset_obscov(org[0])
+            self.reset_pst(org[1])
+
+        return df
+
+    def __added_obs_setup(self,obslist_dict,base_obslist,reset_zero_weight):
+        """private method to prepare the arguments of the added observation
+        importance methods, resetting zero weights if requested.  Returns
+        the obslist_dict and base_obslist to use and the original obscov
+        and pst (or None if weights were not reset) to restore afterward
+
+        """
         if obslist_dict is not None:
             if type(obslist_dict) == list:
                 obslist_dict = dict(zip(obslist_dict,obslist_dict))
@@ -609,7 +703,7 @@ class Schur(LinearAnalysis):
         if base_obslist is None and obslist_dict is None and reset:
             onames = [name for name in self.pst.zero_weight_obs_names
                       if name in self.jco.obs_names and name in self.obscov.row_names]
-            obs.loc[onames,"weight"] = weight
+            self.pst._set_values("observation_data",onames,"weight",weight)
 
         # if needed reset the zero-weight obs in base_obslist
         if base_obslist is not None and reset:
@@ -647,7 +741,7 @@ class Schur(LinearAnalysis):
             obs.index = obs.obsnme
             onames = [name for name in self.pst.zero_weight_obs_names
                       if name in self.jco.obs_names and name in self.obscov.row_names]
-            obs.loc[onames,"weight"] = weight
+            self.pst._set_values("observation_data",onames,"weight",weight)
 
         if obslist_dict is None:
             obslist_dict = {name:name for name in self.pst.nnz_obs_names if name\
@@ -659,52 +753,176 @@ class Schur(LinearAnalysis):
             self.reset_obscov(self.pst)
             self.log("resetting self.obscov")
 
-        results = {}
-        names = ["base"]
+        org = None
+        if reset:
+            org = (org_obscov,org_pst)
+        return obslist_dict,base_obslist,org
+
+    def __added_obs_cases(self,obslist_dict,base_obslist):
+        """private method to get the case names and the lists of observation
+        names each case adds to base_obslist
 
-        if base_obslist is None or len(base_obslist) == 0:
+        """
+        if len(base_obslist) == 0:
             self.logger.statement("no base observation passed, 'base' case"+
                                   " is just the prior of the forecasts")
-            for forecast,pr in self.prior_forecast.items():
-                results[forecast] = [pr]
-            # reset base obslist for use later
-            base_obslist = []
-
-        else:
-            base_posterior = self.get(par_names=self.jco.par_names,
-                                      obs_names=base_obslist).posterior_forecast
-            for forecast,pt in base_posterior.items():
-                results[forecast] = [pt]
 
+        names = []
+        case_obslists = []
+        sbase_obslist = set(base_obslist)
         for case_name,obslist in obslist_dict.items():
             names.append(case_name)
             if not isinstance(obslist,list):
                 obslist = [obslist]
-            self.log("calculating importance of observations by adding: " +
-                     str(obslist) + '\n')
             # this case is the combination of the base obs plus whatever unique
             # obs names in obslist
-            case_obslist = list(base_obslist)
-            dedup_obslist = [oname for oname in obslist if oname not in case_obslist]
-            case_obslist.extend(dedup_obslist)
-            #print(self.pst.observation_data.loc[case_obslist,:])
-            case_post = self.get(par_names=self.jco.par_names,
-                                 obs_names=case_obslist).posterior_forecast
-            for forecast,pt in case_post.items():
-                results[forecast].append(pt)
-            self.log("calculating importance of observations by adding: " +
-                     str(obslist) + '\n')
-        df = pd.DataFrame(results,index=names)
+            case_obslists.append([oname for oname in dict.fromkeys(obslist)
+                                  if oname not in sbase_obslist])
+        return names,case_obslists
+
+    def __added_obs_posterior(self,base_obslist,case_obslists):
+        """private method to get the posterior forecast variances from adding
+        each list of observations in case_obslists to base_obslist.  The base
+        posterior parameter covariance is formed once and each case is a
+        rank-k update of it (see Schur.__rank_k_update()).  The update
+        assumes the noise of the added observations is independent
+        of the base observations, so for a non-diagonal obscov each case is
+        recalculated in full
 
+        Parameters
+        ----------
+        base_obslist : list
+            observation names in the base case.  If empty, the base is the
+            prior parameter covariance matrix
+        case_obslists : list
+            list of lists of observation names to add to base_obslist.  Names
+            should not be repeated in base_obslist
 
-        if reset:
-            self.reset_obscov(org_obscov)
-            self.reset_pst(org_pst)
+        Returns
+        -------
+        base_post : numpy.ndarray
+            the base forecast variances
+        case_posts : numpy.ndarray
+            the forecast variances for each case, shape (len(case_obslists),
+            number of forecasts)
 
-        return df
+        """
+        par_names = self.jco.par_names
+        if not self.obscov.isdiagonal:
+            base_post = self.prior_forecast
+            if len(base_obslist) > 0:
+                base_post = self.get(par_names=par_names,
+                                     obs_names=base_obslist).posterior_forecast
+            case_posts = []
+            for obslist in case_obslists:
+                case_post = self.get(par_names=par_names,
+                                     obs_names=base_obslist + obslist).posterior_forecast
+                case_posts.append([case_post[n] for n in self.predictions.col_names])
+            return np.array([base_post[n] for n in self.predictions.col_names]),\
+                   np.array(case_posts)
+        if len(base_obslist) == 0:
+            post = self.parcov.get(par_names).as_2d
+        else:
+            post = self.get(par_names=par_names,
+                            obs_names=base_obslist).posterior_parameter.x
+        return self.__rank_k_update(post,case_obslists)
+
+    def __rank_k_update(self,post,case_obslists,downdate=False,num_workers=1,
+                        chunk_size=1000,max_cond=1.0e4):
+        """private method to get the forecast variances from adding (or
+        removing) each list of observations in case_obslists to (or from)
+        the information in the posterior parameter covariance matrix post
+        with a Sherman-Morrison-Woodbury rank-k update of post, which is only
+        evaluated for the forecasts:
+
+            s^T P s -/+ z^T (I +/- U P U^T)^-1 z,  z = U P s
+
+        where U is the weight-scaled jacobian rows of the observations being
+        added (removed), P is post and s is a forecast sensitivity vector.
+        The scaled form is well-conditioned even with the tiny weights of
+        zero-weight observations.  Only valid for a diagonal obscov
+
+        Parameters
+        ----------
+        post : numpy.ndarray
+            the posterior parameter covariance matrix, aligned with
+            jco.par_names
+        case_obslists : list
+            list of lists of observation names to add (remove)
+        downdate : bool
+            flag to remove the observations instead of adding them.  Default
+            is False
+        num_workers : int
+            number of threads to evaluate the cases with.  Default is 1
+        chunk_size : int
+            the approximate number of observations to form U P for at once.
+            Default is 1000
+        max_cond : float
+            the largest condition number of (I - U P U^T) to accept for a
+            downdate.  Default is 1.0e+4
+
+        Returns
+        -------
+        base_post : numpy.ndarray
+            the forecast variances from post
+        case_posts : numpy.ndarray
+            the forecast variances for each case, shape (len(case_obslists),
+            number of forecasts).  Rows of poorly-conditioned downdates are
+            NaN
+
+        """
+        par_names = self.jco.par_names
+        s = self.predictions.get(row_names=par_names).x
+        ps = np.dot(post,s)
+        base_post = (s * ps).sum(axis=0)
+        case_posts = np.zeros((len(case_obslists),s.shape[1])) + base_post
+        obs_var = pd.Series(self.obscov.x.flatten(),index=self.obscov.row_names)
+        sign = -1.0 if downdate else 1.0
+
+        icase = 0
+        while icase < len(case_obslists):
+            # gather the next chunk of cases
+            chunk_names,chunk_cases = {},[]
+            while icase < len(case_obslists) and \
+                    (len(chunk_names) < chunk_size or len(chunk_cases) == 0):
+                if len(case_obslists[icase]) > 0:
+                    for oname in case_obslists[icase]:
+                        chunk_names.setdefault(oname,len(chunk_names))
+                    chunk_cases.append(icase)
+                icase += 1
+            if len(chunk_cases) == 0:
+                continue
+            onames = list(chunk_names.keys())
+            w = 1.0 / np.sqrt(obs_var.loc[onames].values)
+            u = self.jco.get(row_names=onames,col_names=par_names).x * w[:,np.newaxis]
+            up = np.dot(u,post)
+            ups = np.dot(u,ps)
+
+            def _update(ic):
+                idx = [chunk_names[oname] for oname in case_obslists[ic]]
+                z = ups[idx,:]
+                a = np.eye(len(idx)) + sign * np.dot(up[idx,:],u[idx,:].T)
+                if downdate:
+                    # (I - U P U^T) should be positive definite
+                    if not np.all(np.isfinite(a)) or np.linalg.cond(a) > max_cond:
+                        return None
+                    try:
+                        np.linalg.cholesky(a)
+                    except np.linalg.LinAlgError:
+                        return None
+                return (z * np.linalg.solve(a,z)).sum(axis=0)
+
+            deltas = _run_threaded(_update,chunk_cases,num_workers=num_workers,
+                                   logger=self.logger,label="cases")
+            for ic,delta in zip(chunk_cases,deltas):
+                if delta is None:
+                    case_posts[ic,:] = np.nan
+                else:
+                    case_posts[ic,:] -= sign * delta
+        return base_post,case_posts
 
     def get_removed_obs_importance(self,obslist_dict=None,
-                                   reset_zero_weight=False):
+                                   reset_zero_weight=False,num_workers=1):
         """get a dataframe the posterior uncertainty
         as a result of losing some observations
 
@@ -720,6 +938,8 @@ class Schur(LinearAnalysis):
             If the value of reset_zero_weights can be cast to a float,
             then that value will be assigned to zero weight obs.  Otherwise,
             zero weight obs will be given a weight of 1.0
+        num_workers : int
+            number of threads to evaluate the cases with.  Default is 1
 
         Returns
         -------
@@ -734,6 +954,11 @@ class Schur(LinearAnalysis):
         all observations listed in obslist_dict with zero
         weights will be dropped unless reset_zero_weight is set
 
+        the posterior with all the non-zero weight observations is formed
+        once and each case is a rank-k downdate of it.  Cases where the
+        downdate is poorly conditioned, and all cases for a non-diagonal
+        obscov, are recalculated in full
+
         Example
         -------
         ``>>>import pyemu``
@@ -772,7 +997,7 @@ class Schur(LinearAnalysis):
             obs = self.pst.observation_data
             onames = [name for name in self.pst.zero_weight_obs_names
                       if name in self.jco.obs_names and name in self.obscov.row_names]
-            obs.loc[onames,"weight"] = weight
+            self.pst._set_values("observation_data",onames,"weight",weight)
 
         if obslist_dict is None:
             obslist_dict = dict(zip(self.pst.nnz_obs_names,
@@ -797,36 +1022,48 @@ class Schur(LinearAnalysis):
             self.reset_obscov(self.pst)
             self.log("resetting self.obscov")
 
-        results = {}
-        names = ["base"]
-        for forecast,pt in self.posterior_forecast.items():
-            results[forecast] = [pt]
+        names = ["base"] + list(obslist_dict.keys())
         for case_name,obslist in obslist_dict.items():
-            if not isinstance(obslist,list):
-                obslist = [obslist]
-            names.append(case_name)
-            self.log("calculating importance of observations by removing: " +
-                     str(obslist) + '\n')
             # check for missing names
             missing_onames = [oname for oname in obslist if oname not in self.jco.obs_names]
             if len(missing_onames) > 0:
                 raise Exception("case {0} has observation names ".format(case_name) + \
                                 "not found: " + ','.join(missing_onames))
-            # find the set difference between obslist and jco obs names
-            #diff_onames = [oname for oname in self.jco.obs_names if oname not in obslist]
-            diff_onames = [oname for oname in self.nnz_obs_names if oname not in obslist and oname not in self.forecast_names]
 
-
-            # calculate the increase in forecast variance by not using the obs
-            # in obslist
-            case_post = self.get(par_names=self.jco.par_names,
-                                 obs_names=diff_onames).posterior_forecast
-
-            for forecast,pt in case_post.items():
-                results[forecast].append(pt)
-        df = pd.DataFrame(results,index=names)
-        self.log("calculating importance of observations by removing: " +
-                     str(obslist) + '\n')
+        self.log("calculating importance of observations by removing")
+        par_names = self.jco.par_names
+        forecast_names = set(self.forecast_names)
+        full_onames = [oname for oname in self.nnz_obs_names if oname not in forecast_names]
+        sfull_onames = set(full_onames)
+        case_obslists = [[oname for oname in dict.fromkeys(obslist) if oname in sfull_onames]
+                         for obslist in obslist_dict.values()]
+        if self.obscov.isdiagonal:
+            post = self.get(par_names=par_names,obs_names=full_onames).posterior_parameter.x
+            _,case_posts = self.__rank_k_update(post,case_obslists,downdate=True,
+                                                num_workers=num_workers)
+        else:
+            case_posts = np.zeros((len(case_obslists),self.predictions.shape[1])) + np.nan
+
+        # the full calculation for the cases the downdate can't handle
+        redo = list(np.where(np.isnan(case_posts).any(axis=1))[0])
+        if len(redo) > 0:
+            self.logger.statement("recalculating {0} cases in full".format(len(redo)))
+
+            def _full(ic):
+                # the set difference between the case obs and the nonzero obs names
+                sobslist = set(case_obslists[ic])
+                diff_onames = [oname for oname in full_onames if oname not in sobslist]
+                case_post = self.get(par_names=par_names,
+                                     obs_names=diff_onames).posterior_forecast
+                return [case_post[n] for n in self.predictions.col_names]
+
+            case_posts[redo,:] = _run_threaded(_full,redo,num_workers=num_workers,
+                                               logger=self.logger,label="cases")
+        base_post = self.posterior_forecast
+        base_post = [base_post[n] for n in self.predictions.col_names]
+        df = pd.DataFrame(np.vstack([base_post,case_posts]),index=names,
+                          columns=self.predictions.col_names)
+        self.log("calculating importance of observations by removing")
 
         if reset:
             self.reset_obscov(org_obscov)
@@ -921,6 +1158,150 @@ class Schur(LinearAnalysis):
 
 
 
+        if not self.obscov.isdiagonal:
+            return self.__next_most_important_added_obs_full(forecast,niter,obslist_dict,
+                                                             base_obslist,reset_zero_weight)
+
+        obslist_dict,base_obslist,org = self.__added_obs_setup(obslist_dict,
+                                                               base_obslist,
+                                                               reset_zero_weight)
+        names,case_obslists = self.__added_obs_cases(obslist_dict,base_obslist)
+        self.log("greedy search for the next most important added obs")
+        picks = self.__greedy_added_obs(forecast,base_obslist,case_obslists,niter)
+        self.log("greedy search for the next most important added obs")
+        if org is not None:
+            self.reset_obscov(org[0])
+            self.reset_pst(org[1])
+
+        best_case, best_results = [],[]
+        init_base = picks[0][2]
+        for ic,iter_best_result,iter_base_result in picks:
+            iter_best_name = "base" if ic is None else names[ic]
+            diff_percent_init = 100.0 * (init_base -
+                                              iter_best_result) / init_base
+            diff_percent_iter = 100.0 * (iter_base_result -
+                                              iter_best_result) / iter_base_result
+            best_results.append([iter_best_name,iter_best_result,
+                                 diff_percent_iter,diff_percent_init])
+            best_case.append(iter_best_name)
+        columns = ["best_obs",forecast+"_variance",
+                   "unc_reduce_iter_base","unc_reduce_initial_base"]
+        return pd.DataFrame(best_results,index=best_case,columns=columns)
+
+    def __greedy_added_obs(self,forecast,base_obslist,case_obslists,niter,
+                           chunk_size=1000):
+        """private method for the greedy search of next_most_important_added_obs().
+        The posterior parameter covariance matrix (P) is carried forward
+        through the iterations: the variance reduction of every remaining
+        case is scored in a batch from the projections U P s and U P U^T of
+        the weight-scaled candidate jacobian rows (U), then the winning case
+        is applied to P (and to the projections) with a rank-k update.
+
+        Parameters
+        ----------
+        forecast : str
+            the forecast to rank the cases with
+        base_obslist : list
+            observation names in the base case.  If empty, the base is the
+            prior parameter covariance matrix
+        case_obslists : list
+            list of lists of observation names in each case
+        niter : int
+            number of cases to pick
+        chunk_size : int
+            the number of candidate observations to form U P for at once.
+            Default is 1000
+
+        Returns
+        -------
+        picks : list
+            list of (case index, forecast variance, forecast variance before
+            this pick) tuples, one per iteration.  The case index is None
+            if no remaining case reduces the forecast variance
+
+        """
+        par_names = self.jco.par_names
+        if len(base_obslist) == 0:
+            post = self.parcov.get(par_names).as_2d.copy()
+        else:
+            post = self.get(par_names=par_names,
+                            obs_names=base_obslist).posterior_parameter.x.copy()
+        s = self.predictions.get(row_names=par_names,col_names=[forecast]).x[:,0]
+        var = float(np.dot(s,np.dot(post,s)))
+
+        onames = list(dict.fromkeys([oname for obslist in case_obslists
+                                     for oname in obslist]))
+        name_idx = {oname:i for i,oname in enumerate(onames)}
+        cases = [np.array([name_idx[oname] for oname in obslist],dtype=int)
+                 for obslist in case_obslists]
+        picks = []
+        if len(onames) == 0:
+            return [(None,var,var)]
+        obs_var = pd.Series(self.obscov.x.flatten(),index=self.obscov.row_names)
+        w = 1.0 / np.sqrt(obs_var.loc[onames].values)
+        u = self.jco.get(row_names=onames,col_names=par_names).x * w[:,np.newaxis]
+
+        # the projections of the candidates on the current posterior: U P s,
+        # diag(U P U^T) and the U P U^T blocks of the multi-obs cases
+        ups = np.dot(u,np.dot(post,s))
+        upu = np.zeros(len(onames))
+        multi = [ic for ic,idx in enumerate(cases) if len(idx) > 1]
+        blocks = {}
+        for i in range(0,len(onames),chunk_size):
+            up = np.dot(u[i:i+chunk_size,:],post)
+            upu[i:i+chunk_size] = (up * u[i:i+chunk_size,:]).sum(axis=1)
+        for ic in multi:
+            up = np.dot(u[cases[ic],:],post)
+            blocks[ic] = np.dot(up,u[cases[ic],:].T)
+
+        single = np.array([ic for ic,idx in enumerate(cases) if len(idx) == 1],dtype=int)
+        single_idx = np.array([cases[ic][0] for ic in single],dtype=int)
+        used = np.zeros(len(onames),dtype=bool)
+        active = np.array([len(idx) > 0 for idx in cases],dtype=bool)
+        for iiter in range(niter):
+            # score the remaining cases
+            reduction = np.zeros(len(cases))
+            z = ups[single_idx]
+            reduction[single] = np.where(used[single_idx],0.0,
+                                         z * z / (1.0 + upu[single_idx]))
+            for ic in multi:
+                keep = ~used[cases[ic]]
+                if not active[ic] or not keep.any():
+                    continue
+                z = ups[cases[ic][keep]]
+                a = np.eye(keep.sum()) + blocks[ic][np.ix_(keep,keep)]
+                reduction[ic] = np.dot(z,np.linalg.solve(a,z))
+            reduction[~active] = 0.0
+            best = int(np.argmax(reduction))
+            if reduction[best] <= 0.0:
+                picks.append((None,var,var))
+                break
+            picks.append((best,var - reduction[best],var))
+            var -= reduction[best]
+
+            # apply the winning case to the posterior and the projections
+            widx = cases[best][~used[cases[best]]]
+            b = np.dot(post,u[widx,:].T)
+            a = np.eye(len(widx)) + np.dot(u[widx,:],b)
+            ub = np.dot(u,b)
+            a_inv_bt = np.linalg.solve(a,b.T)
+            post -= np.dot(b,a_inv_bt)
+            ups -= np.dot(ub,np.dot(a_inv_bt,s))
+            a_inv_ubt = np.linalg.solve(a,ub.T)
+            upu -= (ub * a_inv_ubt.T).sum(axis=1)
+            for ic in multi:
+                blocks[ic] -= np.dot(ub[cases[ic],:],a_inv_ubt[:,cases[ic]])
+            used[widx] = True
+            active[best] = False
+        return picks
+
+    def __next_most_important_added_obs_full(self,forecast,niter,obslist_dict,
+                                             base_obslist,reset_zero_weight):
+        """private method for next_most_important_added_obs() with a
+        non-diagonal obscov: get_added_obs_importance() is called with the
+        augmented base_obslist on each iteration
+
+        """
         if base_obslist:
             obs_being_used = list(base_obslist)
         else:
@@ -966,7 +1347,8 @@ class Schur(LinearAnalysis):
                    "unc_reduce_iter_base","unc_reduce_initial_base"]
         return pd.DataFrame(best_results,index=best_case,columns=columns)
 
-    def next_most_par_contribution(self,niter=3,forecast=None,parlist_dict=None):
+    def next_most_par_contribution(self,niter=3,forecast=None,parlist_dict=None,
+                                   num_workers=1):
         """find the largest parameter(s) contribution for prior and posterior
         forecast  by sequentially evaluating the contribution of parameters in
         parlist_dict.  The largest contributing parameters from each iteration are
@@ -982,6 +1364,9 @@ class Schur(LinearAnalysis):
             a nested dictionary-list of groups of parameters
             that are to be treated as perfectly known.  key values become
             row labels in dataframe
+        num_workers : int
+            number of threads to use to evaluate the entries in parlist_dict.
+            Default is 1
 
         Returns
         -------
@@ -994,24 +1379,33 @@ class Schur(LinearAnalysis):
         if forecast is None:
             assert len(self.forecasts) == 1,"forecast arg list one and only one" +\
                                             " forecast"
-        elif forecast not in self.prediction_arg:
+            forecast = self.predictions.col_names[0]
+        elif forecast not in self.predictions.col_names:
             raise Exception("forecast {0} not found".format(forecast))
-        org_parcov = self.parcov.get(row_names=self.parcov.row_names)
         if parlist_dict is None:
             parlist_dict = dict(zip(self.pst.adj_par_names,self.pst.adj_par_names))
+        else:
+            parlist_dict = dict(parlist_dict)
+        ifore = self.predictions.col_names.index(forecast)
 
         base_prior,base_post = self.prior_forecast,self.posterior_forecast
         iter_results = [base_post[forecast].copy()]
         iter_names = ["base"]
+        known = []
         for iiter in range(niter):
-            iter_contrib = {forecast:[base_post[forecast]]}
-            iter_case_names = ["base"]
             self.log("next most par iteration {0}".format(iiter+1))
-
-            for case,parlist in parlist_dict.items():
-                iter_case_names.append(case)
-                la_cond = self.get_conditional_instance(parlist)
-                iter_contrib[forecast].append(la_cond.posterior_forecast[forecast])
+            iter_case_names = list(parlist_dict.keys())
+            case_parlists = []
+            for case in iter_case_names:
+                parlist = parlist_dict[case]
+                if not isinstance(parlist, list):
+                    parlist = [parlist]
+                # the best cases from the previous iterations are known
+                case_parlists.append(known + parlist)
+            _,case_posts = self.__conditional_forecast_variances(case_parlists,
+                                                                 num_workers=num_workers)
+            iter_contrib = {forecast:[base_post[forecast]] + list(case_posts[:,ifore])}
+            iter_case_names.insert(0,"base")
             df = pd.DataFrame(iter_contrib,index=iter_case_names)
             df.sort_values(by=forecast,inplace=True)
             iter_best = df.index[0]
@@ -1021,10 +1415,7 @@ class Schur(LinearAnalysis):
                 break
             iter_results.append(df.loc[iter_best,forecast])
             iter_names.append(iter_best)
-            self.reset_parcov(self.parcov.condition_on(parlist_dict.pop(iter_best)))
+            known = case_parlists[iter_case_names.index(iter_best) - 1]
+            parlist_dict.pop(iter_best)
 
-        self.reset_parcov(org_parcov)
         return pd.DataFrame(iter_results,index=iter_names)
-
-
-
@@ -839,38 +839,21 @@ def zero_order_tikhonov(pst, parbounds=True,par_groups=None,
     if par_groups is None:
         par_groups = pst.par_groups
 
-    pilbl, obgnme, weight, equation = [], [], [], []
-    for idx, row in pst.parameter_data.iterrows():
-        pt = row["partrans"].lower()
-        try:
-            pt = pt.decode()
-        except:
-            pass
-        if pt not in ["tied", "fixed"] and\
-            row["pargp"] in par_groups:
-            pilbl.append(row["parnme"])
-            weight.append(1.0)
-            ogp_name = "regul"+row["pargp"]
-            obgnme.append(ogp_name[:12])
-            parnme = row["parnme"]
-            parval1 = row["parval1"]
-            if pt == "log":
-                parnme = "log(" + parnme + ")"
-                parval1 = np.log10(parval1)
-            eq = "1.0 * " + parnme + " ={0:15.6E}".format(parval1)
-            equation.append(eq)
-
-    if reset:
-        pst.prior_information = pd.DataFrame({"pilbl": pilbl,
-                                               "equation": equation,
-                                               "obgnme": obgnme,
-                                               "weight": weight})
-    else:
-        pi = pd.DataFrame({"pilbl": pilbl,
-                          "equation": equation,
-                          "obgnme": obgnme,
-                          "weight": weight})
-        pst.prior_information = pst.prior_information.append(pi)
+    par = pst.parameter_data
+    try:
+        partrans = par.partrans.apply(lambda x: x.decode()).str.lower()
+    except:
+        partrans = par.partrans.str.lower()
+    keep = (~partrans.isin(["tied", "fixed"]) & par.pargp.isin(par_groups)).values
+    par = par.loc[keep, :]
+    islog = (partrans.values[keep] == "log")
+    rhs = par.parval1.values.astype(float)
+    rhs[islog] = np.log10(rhs[islog])
+    obgnme = ("regul" + par.pargp.astype(str)).str[:12].values
+    pi = pyemu.PriorInformation(par.parnme.values, scipy.sparse.identity(par.shape[0]),
+                                par.parnme.values, rhs, weight=1.0,
+                                obgnme=list(obgnme), log=islog)
+    pst.set_prior_information(pi, reset=reset)
     if parbounds:
         regweight_from_parbound(pst)
     if pst.control_data.pestmode == "estimation":
@@ -890,19 +873,25 @@ def regweight_from_parbound(pst):
     """
 
     pst.parameter_data.index = pst.parameter_data.parnme
-    pst.prior_information.index = pst.prior_information.pilbl
-    for idx, parnme in enumerate(pst.prior_information.pilbl):
-        if parnme in pst.parameter_data.index:
-            row = pst.parameter_data.loc[parnme, :]
-            lbnd,ubnd = row["parlbnd"], row["parubnd"]
-            if row["partrans"].lower() == "log":
-                weight = 1.0 / (np.log10(ubnd) - np.log10(lbnd))
-            else:
-                weight = 1.0 / (ubnd - lbnd)
-            pst.prior_information.loc[parnme, "weight"] = weight
-        else:
-            print("prior information name does not correspond" +\
-                  " to a parameter: " + str(parnme))
+    par = pst.parameter_data
+    islog = par.partrans.str.lower() == "log"
+    lbnd, ubnd = par.parlbnd.copy(), par.parubnd.copy()
+    lbnd.loc[islog] = np.log10(lbnd.loc[islog].astype(float))
+    ubnd.loc[islog] = np.log10(ubnd.loc[islog].astype(float))
+    weights = 1.0 / (ubnd - lbnd)
+
+    pending = "_prior_arrays" in pst.__dict__
+    if pending:
+        pilbl = pst.prior_arrays.pilbl
+    else:
+        pst.prior_information.index = pst.prior_information.pilbl
+        pilbl = pst.prior_information.pilbl.values
+    found = pd.Index(pilbl).isin(weights.index)
+    for parnme in np.asarray(pilbl)[~found]:
+        print("prior information name does not correspond" +\
+              " to a parameter: " + str(parnme))
+    pst._set_values("prior_arrays" if pending else "prior_information",
+                    found,"weight",weights.loc[pilbl[found]].values)
 
 
 def first_order_pearson_tikhonov(pst,cov,reset=True,abs_drop_tol=1.0e-3):
@@ -943,43 +932,37 @@ def first_order_pearson_tikhonov(pst,cov,reset=True,abs_drop_tol=1.0e-3):
         ptrans = pst.parameter_data.partrans.apply(lambda x:x.decode()).to_dict()
     except:
         ptrans = pst.parameter_data.partrans.to_dict()
-    pi_num = pst.prior_information.shape[0] + 1
-    pilbl, obgnme, weight, equation = [], [], [], []
+    pi_num = pst.nprior + 1
     sadj_names = set(pst.adj_par_names)
     print("processing")
-    for i,iname in enumerate(cc_mat.row_names):
-        if iname not in sadj_names:
-            continue
-        for j,jname in enumerate(cc_mat.row_names[i+1:]):
-            if jname not in sadj_names:
-                continue
-            #print(i,iname,i+j+1,jname)
-            cc = cc_mat.x[i,j+i+1]
-            if cc < abs_drop_tol:
-                continue
-            pilbl.append("pcc_{0}".format(pi_num))
-            iiname = str(iname)
-            if str(ptrans[iname]) == "log":
-                iiname = "log("+iname+")"
-            jjname = str(jname)
-            if str(ptrans[jname]) == "log":
-                jjname = "log("+jname+")"
-            equation.append("1.0 * {0} - 1.0 * {1} = 0.0".\
-                            format(iiname,jjname))
-            weight.append(cc)
-            obgnme.append("regul_cc")
-            pi_num += 1
-    df = pd.DataFrame({"pilbl": pilbl,"equation": equation,
-                       "obgnme": obgnme,"weight": weight})
-    df.index = df.pilbl
-    if reset:
-        pst.prior_information = df
-    else:
-        pst.prior_information = pst.prior_information.append(df)
+    names = cc_mat.row_names
+    is_adj = np.array([n in sadj_names for n in names], dtype=bool)
+    # upper triangle pairs of adjustable pars that pass the drop tolerance,
+    # one row at a time to keep the memory footprint down
+    ii, jj, cc = [np.zeros(0, dtype=int)], [np.zeros(0, dtype=int)], [np.zeros(0)]
+    for i in np.where(is_adj)[0]:
+        row = cc_mat.x[i, i + 1:]
+        j = np.where(is_adj[i + 1:] & ~(row < abs_drop_tol))[0]
+        ii.append(np.zeros(j.shape[0], dtype=int) + i)
+        jj.append(j + i + 1)
+        cc.append(row[j])
+    ii, jj, cc = np.concatenate(ii), np.concatenate(jj), np.concatenate(cc)
+    npi = ii.shape[0]
+    rows = np.arange(npi)
+    coef = scipy.sparse.coo_matrix((np.concatenate([np.ones(npi), -np.ones(npi)]),
+                                    (np.concatenate([rows, rows]),
+                                     np.concatenate([ii, jj]))),
+                                   shape=(npi, len(names)))
+    islog = np.array([str(ptrans[n]) == "log" for n in names], dtype=bool)
+    pilbl = ["pcc_{0}".format(i) for i in range(pi_num, pi_num + npi)]
+    pi = pyemu.PriorInformation(pilbl, coef, names, 0.0, weight=cc,
+                                obgnme="regul_cc", log=islog)
+    pst.set_prior_information(pi, reset=reset)
 
     if pst.control_data.pestmode == "estimation":
         pst.control_data.pestmode = "regularization"
 
+
 def simple_tpl_from_pars(parnames, tplfilename='model.input.tpl'):
     """
     Make a template file just assuming a list of parameter names the values of which should be
@@ -1298,7 +1281,8 @@ def parse_dir_for_io_files(d):
     return tpl_files,in_files,ins_files,out_files
 
 
-def pst_from_io_files(tpl_files,in_files,ins_files,out_files,pst_filename=None):
+def pst_from_io_files(tpl_files,in_files,ins_files,out_files,pst_filename=None,
+                      num_workers=None,cache_file=None,processes=False):
     """generate a Pst instance from the model io files.  If 'inschek'
     is available (either in the current directory or registered
     with the system variables) and the model output files are available
@@ -1319,6 +1303,19 @@ def pst_from_io_files(tpl_files,in_files,ins_files,out_files,pst_filename=None):
     pst_filename : str
         name of file to write the control file to.  If None,
         control file is not written.  Default is None
+    num_workers : int
+        number of workers to use to parse the template and instruction
+        files and read the model output files.  If None, the number of
+        cpus is used.  Default is None
+    cache_file : str
+        optional on-disk cache of the names parsed from each template and
+        instruction file.  Re-running with the same cache_file only parses
+        new or changed files.  Default is None
+    processes : bool
+        flag to use a pool of processes instead of threads for the parsing
+        and reading.  Scripts must then be guarded with
+        ``if __name__ == "__main__":`` on platforms that spawn processes
+        (e.g. Windows).  Default is False
 
     Returns
     -------
@@ -1345,9 +1342,9 @@ def pst_from_io_files(tpl_files,in_files,ins_files,out_files,pst_filename=None):
 
     for tpl_file in tpl_files:
         assert os.path.exists(tpl_file),"template file not found: "+str(tpl_file)
-        #new_names = [name for name in pyemu.pst_utils.parse_tpl_file(tpl_file) if name not in par_names]
-        #par_names.extend(new_names)
-        new_names = pyemu.pst_utils.parse_tpl_file(tpl_file)
+    for new_names in pyemu.pst_utils.parse_tpl_files(tpl_files,num_workers=num_workers,
+                                                     cache_file=cache_file,
+                                                     processes=processes):
         par_names.update(new_names)
 
     if not isinstance(ins_files,list):
@@ -1360,7 +1357,10 @@ def pst_from_io_files(tpl_files,in_files,ins_files,out_files,pst_filename=None):
     obs_names = []
     for ins_file in ins_files:
         assert os.path.exists(ins_file),"instruction file not found: "+str(ins_file)
-        obs_names.extend(pyemu.pst_utils.parse_ins_file(ins_file))
+    for new_names in pyemu.pst_utils.parse_ins_files(ins_files,num_workers=num_workers,
+                                                     cache_file=cache_file,
+                                                     processes=processes):
+        obs_names.extend(new_names)
 
     new_pst = pyemu.pst_utils.generic_pst(list(par_names),list(obs_names))
 
@@ -1370,7 +1370,8 @@ def pst_from_io_files(tpl_files,in_files,ins_files,out_files,pst_filename=None):
     new_pst.output_files = out_files
 
     #try to run inschek to find the observtion values
-    pyemu.pst_utils.try_run_inschek(new_pst)
+    pyemu.pst_utils.try_run_inschek(new_pst,num_workers=num_workers,
+                                    processes=processes)
 
     if pst_filename:
         new_pst.write(pst_filename,update_regul=True)
@@ -2834,7 +2835,8 @@ class PstFromFlopyModel(object):
             df.index = df.obsnme
             for col in df.columns:
                 if col in obs.columns:
-                    obs.loc[df.obsnme,col] = df.loc[:,col]
+                    pst._set_values("observation_data",df.obsnme,col,
+                                    df.loc[:,col])
 
         self.pst_name = self.m.name+".pst"
         pst.model_command = ["python forward_run.py"]
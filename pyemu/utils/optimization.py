@@ -33,7 +33,8 @@ def add_pi_obj_func(pst,obj_func_dict=None,out_pst_name=None):
     else:
         assert pilbl not in pst.prior_information.index
         # append by enlargement
-        pst.prior_information.loc[pilbl,:] = pi_df.loc[pilbl,:]
+        pst._set_values("prior_information",pilbl,slice(None),
+                        pi_df.loc[pilbl,:])
 
     if out_pst_name is not None:
         pst.write(out_pst_name)